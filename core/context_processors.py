@@ -1,30 +1,20 @@
-from usuarios.models import Empresa, UserEmpresa
-
 def empresas_context(request):
     if not request.user.is_authenticated:
         return {}
 
-    if request.user.is_superuser:
-        return {
-            "empresas_todas": Empresa.objects.all()
-        }
-    else:
-        return {
-            "empresas_todas": Empresa.objects.filter(userempresa__user=request.user)
-        }
-    
+    return {
+        "empresas_todas": getattr(request, "empresas_disponiveis", []),
+    }
+
 
 def empresas_disponiveis(request):
     if not request.user.is_authenticated:
         return {}
 
-    # SUPERUSER → Todas as empresas
-    if request.user.is_superuser:
-        empresas = Empresa.objects.all()
-    else:
-        empresas = Empresa.objects.filter(userempresa__user=request.user)
+    # Preenchido por EmpresaAtivaMiddleware (todas as empresas para superusuários)
+    empresas = getattr(request, "empresas_disponiveis", [])
 
     return {
         "empresas_disponiveis": empresas,
-        "empresas_qtd": empresas.count(),
+        "empresas_qtd": len(empresas),
     }
@@ -16,21 +16,18 @@ def permissao_necessaria(attr):
                 messages.error(request, "Selecione uma empresa para continuar.")
                 return redirect("selecionar_empresa")
 
-            user_empresa = request.user.userempresa_set.filter(
-                empresa=request.empresa_ativa
-            ).first()
-
             # Superuser ignora restrições
             if request.user.is_superuser:
                 return view_func(request, *args, **kwargs)
 
+            # Permissões resolvidas por EmpresaAtivaMiddleware (None = sem vínculo)
+            role = request.user_role
+
             # Usuário não pertence à empresa ativa
-            if not user_empresa:
+            if role is None:
                 messages.error(request, "Você não tem acesso a esta empresa.")
                 return redirect("selecionar_empresa")
 
-            role = user_empresa.role
-
             if not getattr(role, attr, False):
                 messages.error(request, "Você não tem permissão para acessar esta área.")
                 return redirect("home")
@@ -0,0 +1,84 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import processos
+from core.services.cessao_xml import arquivos_nfe_zip, parse_nfes
+
+
+_MODELO = '''<?xml version="1.0" encoding="UTF-8"?>
+<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00"><NFe><infNFe Id="NFe{chave}" versao="4.00">
+  <ide><cUF>35</cUF><nNF>{numero}</nNF><dhEmi>2026-10-01T10:00:00-03:00</dhEmi></ide>
+  <emit><CNPJ>{cedente}</CNPJ><xNome>Cedente {cedente}</xNome><enderEmit><xLgr>Rua A</xLgr><nro>1</nro></enderEmit></emit>
+  <dest><CNPJ>{sacado}</CNPJ><xNome>Sacado {sacado}</xNome><enderDest><xLgr>Rua B</xLgr><nro>2</nro></enderDest></dest>
+  {itens}
+  <total><ICMSTot><vProd>{total}</vProd><vNF>{total}</vNF></ICMSTot></total>
+  <cobr><fat><nFat>{numero}</nFat><vOrig>{total}</vOrig></fat>{duplicatas}</cobr>
+</infNFe></NFe><protNFe versao="4.00"><infProt><chNFe>{chave}</chNFe><cStat>100</cStat></infProt></protNFe></nfeProc>'''
+
+
+def _nfe_sintetica(i: int, itens: int) -> bytes:
+    """NF-e 4.00 com `itens` produtos e três duplicatas (corpus determinístico)."""
+    valor_item = 100 + i % 900
+    total = valor_item * itens
+    return _MODELO.format(
+        chave=f'{i:044d}',
+        numero=i,
+        cedente=f'{10_000_000_000_000 + i % 50:014d}',
+        sacado=f'{20_000_000_000_000 + i % 400:014d}',
+        itens=''.join(
+            f'<det nItem="{n}"><prod><cProd>{n}</cProd><xProd>Produto {n}</xProd><NCM>00000000</NCM>'
+            f'<qCom>1.0000</qCom><vUnCom>{valor_item}.00</vUnCom><vProd>{valor_item}.00</vProd></prod>'
+            f'<imposto><ICMS><ICMS00><orig>0</orig><vICMS>0.00</vICMS></ICMS00></ICMS></imposto></det>'
+            for n in range(1, itens + 1)
+        ),
+        total=f'{total}.00',
+        duplicatas=''.join(
+            f'<dup><nDup>00{p}</nDup><dVenc>2026-1{p}-15</dVenc><vDup>{total / 3:.2f}</vDup></dup>'
+            for p in range(3)
+        ),
+    ).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o parser de NF-e da cessão em notas/s, sequencial e em paralelo. '
+        'Usa os XMLs/ZIPs informados ou um corpus sintético de NF-e 4.00.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivos', nargs='*', help='XMLs de NF-e ou ZIPs com XMLs')
+        parser.add_argument('--notas', type=int, default=5000, help='Notas do corpus sintético (sem arquivos)')
+        parser.add_argument('--itens', type=int, default=10, help='Itens por nota sintética')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['arquivos']:
+            corpus = []
+            for arquivo in options['arquivos']:
+                conteudo = Path(arquivo).read_bytes()
+                corpus.extend(arquivos_nfe_zip(conteudo) if arquivo.lower().endswith('.zip') else [(arquivo, conteudo)])
+        else:
+            corpus = [(f'nfe{i}.xml', _nfe_sintetica(i, options['itens'])) for i in range(options['notas'])]
+
+        if not corpus:
+            raise CommandError('Nenhuma NF-e para medir.')
+
+        self.stdout.write(
+            f'{len(corpus)} notas, {sum(len(x) for _, x in corpus) / 1e6:.1f} MB; '
+            f'pool compartilhado com {processos.tamanho_pool()} processo(s) (teto de workers)'
+        )
+
+        for workers in options['workers']:
+            tempos = []
+            for _ in range(options['repeticoes']):
+                t0 = time.perf_counter()
+                resultados = parse_nfes(corpus, workers=workers)
+                tempos.append(time.perf_counter() - t0)
+            erros = sum(1 for _, resultado, _ in resultados if resultado is None)
+            self.stdout.write(
+                f'  workers={workers:<3} {len(corpus) / min(tempos):10.0f} notas/s '
+                f'(melhor {min(tempos) * 1000:.0f} ms, {erros} erro(s))'
+            )
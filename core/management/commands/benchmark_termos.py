@@ -0,0 +1,59 @@
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from docxtpl import DocxTemplate
+
+from core.services.docx_templates import estatisticas_render, limpar_cache_templates, renderizar_docx
+
+
+def _contexto(n_titulos: int) -> dict:
+    titulo = {
+        'sacado_nome': 'Sacado Benchmark', 'sacado_doc': '33.333.333/0001-33', 'valor': 'R$ 1.000,00',
+        'vencimento': '2026-12-31', 'tipo': 'Duplicata', 'numero': '1',
+    }
+    return {
+        'cedente_nome': 'Cedente Benchmark', 'cedente_doc': '22.222.222/0001-22',
+        'sacado_nome': 'Sacado Benchmark', 'sacado_doc': '33.333.333/0001-33',
+        'titulos': [dict(titulo, numero=str(i)) for i in range(n_titulos)],
+        'valor_total': f'R$ {n_titulos * 1000:,.2f}', 'data_atual': '01/01/2026',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compara o render de termos com DocxTemplate lido do disco x template em cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('templates', nargs='*', help='Arquivos .docx (default: doc_templates/*.docx)')
+        parser.add_argument('--documentos', type=int, default=30)
+        parser.add_argument('--titulos', type=int, default=20)
+
+    def handle(self, *args, **options):
+        templates = options['templates'] or sorted(
+            str(p) for p in settings.DOC_TEMPLATE_DIR.glob('*.docx') if not p.name.startswith('~$')
+        )
+        context = _contexto(options['titulos'])
+        n = options['documentos']
+
+        limpar_cache_templates()
+        for caminho in templates:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                doc = DocxTemplate(caminho)
+                doc.render(context)
+                doc.save(BytesIO())
+            disco = (time.perf_counter() - t0) / n
+
+            t0 = time.perf_counter()
+            for _ in range(n):
+                renderizar_docx(caminho, context)
+            em_cache = (time.perf_counter() - t0) / n
+
+            self.stdout.write(
+                f'{caminho}: disco {disco * 1000:.1f} ms/doc, cache {em_cache * 1000:.1f} ms/doc '
+                f'({disco / em_cache:.1f}x)'
+            )
+
+        for nome, e in estatisticas_render().items():
+            self.stdout.write(f"  {nome}: {e['renders']} renders, média {e['media_ms']:.1f} ms, máx {e['max_ms']:.1f} ms")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.services.cache import metricas_cache, zerar_metricas_cache
+
+
+class Command(BaseCommand):
+    help = 'Mostra acertos/faltas do cache por namespace (somados entre todos os processos).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zerar', action='store_true', help='Zera os contadores após exibir')
+
+    def handle(self, *args, **options):
+        metricas = metricas_cache()
+        if not metricas:
+            self.stdout.write('Nenhuma métrica registrada.')
+
+        for namespace, m in metricas.items():
+            taxa = f"{m['taxa_acerto']:.1%}" if m['taxa_acerto'] is not None else '-'
+            self.stdout.write(f"{namespace:<30} acertos={m['acertos']:<8} faltas={m['faltas']:<8} taxa={taxa}")
+
+        if options['zerar']:
+            zerar_metricas_cache()
+            self.stdout.write(self.style.SUCCESS('Contadores zerados.'))
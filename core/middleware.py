@@ -1,35 +1,34 @@
+from core.services.acesso import empresas_disponiveis, permissoes
+
+
 class EmpresaAtivaMiddleware:
     """
-    Armazena na request a empresa ativa do usuário
+    Armazena na request a empresa ativa do usuário, as empresas que ele pode
+    selecionar e suas permissões na empresa ativa (request.user_role).
+    Tudo vem do cache de core/services/acesso.py.
     """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        from usuarios.models import Empresa, UserEmpresa
-
         request.empresa_ativa = None
+        request.empresas_disponiveis = []
+        request.user_role = None
 
         if request.user.is_authenticated:
-            empresa_id = request.session.get("empresa_ativa")
+            empresas = empresas_disponiveis(request.user)
+            request.empresas_disponiveis = empresas
 
+            empresa_id = request.session.get("empresa_ativa")
             if empresa_id:
-                try:
-                    request.empresa_ativa = Empresa.objects.get(id=empresa_id)
-                except Empresa.DoesNotExist:
-                    request.empresa_ativa = None
-
-            # Se ainda não há empresa na sessão, inicializa com a primeira disponível
-            if request.empresa_ativa is None:
-                if request.user.is_superuser:
-                    primeira = Empresa.objects.first()
-                else:
-                    primeira = Empresa.objects.filter(
-                        userempresa__user=request.user
-                    ).first()
-
-                if primeira:
-                    request.empresa_ativa = primeira
-                    request.session["empresa_ativa"] = primeira.id
+                request.empresa_ativa = next((e for e in empresas if str(e.id) == str(empresa_id)), None)
+
+            # Sem empresa na sessão (ou sem acesso a ela): a primeira disponível
+            if request.empresa_ativa is None and empresas:
+                request.empresa_ativa = empresas[0]
+                request.session["empresa_ativa"] = empresas[0].id
+
+            if request.empresa_ativa is not None:
+                request.user_role = permissoes(request.user, request.empresa_ativa.id)
 
         return self.get_response(request)
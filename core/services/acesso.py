@@ -0,0 +1,118 @@
+"""
+Acesso do Usuário às Empresas
+
+Resolve, para cada requisição autenticada, as empresas disponíveis ao
+usuário e as permissões da role dele na empresa ativa — sem consultas ao
+banco em regime estável. Os dois resultados ficam no cache:
+
+- empresas disponíveis por usuário
+- permissões por (usuário, empresa)
+
+As entradas ficam na camada de cache (core/services/cache.py), com versões
+por namespace, por empresa e por usuário incrementadas por core/signals.py
+quando Empresa, EmpresaRole ou UserEmpresa mudam.
+"""
+
+from django.conf import settings
+from django.db import models
+
+from .cache import incrementar_versao, invalidar_namespace, memoizar
+
+
+ACESSO_CACHE_TIMEOUT = getattr(settings, 'ACESSO_CACHE_TIMEOUT', 3600)
+
+
+def _escopo_usuario(user_id) -> str:
+    return f'acesso:usuario:{user_id}'
+
+
+def invalidar_empresas():
+    """Empresa criada, alterada ou excluída: afeta a lista de todos os usuários."""
+    invalidar_namespace('acesso:empresas')
+
+
+def invalidar_empresa(empresa_id):
+    """Roles ou vínculos da empresa mudaram."""
+    invalidar_namespace('acesso:permissoes', empresa_id)
+
+
+def invalidar_usuario(user_id):
+    """Vínculos do usuário mudaram."""
+    incrementar_versao(_escopo_usuario(user_id))
+
+
+def _campos_permissao():
+    from usuarios.models import EmpresaRole
+
+    return [
+        f.name for f in EmpresaRole._meta.get_fields()
+        if isinstance(f, models.BooleanField) and f.name.startswith('pode_')
+    ]
+
+
+class Permissoes:
+    """
+    Permissões resolvidas do usuário na empresa ativa (request.user_role).
+    Expõe os flags pode_* de EmpresaRole como atributos; flags desconhecidos
+    valem False.
+    """
+
+    def __init__(self, empresa_id, role_id=None, role_nome='', flags=None):
+        self.empresa_id = empresa_id
+        self.role_id = role_id
+        self.role_nome = role_nome
+        self.flags = dict(flags or {})
+
+    def __getattr__(self, nome):
+        if nome.startswith('pode_'):
+            return self.__dict__.get('flags', {}).get(nome, False)
+        raise AttributeError(nome)
+
+    def __repr__(self):
+        return f'Permissoes(empresa={self.empresa_id}, role={self.role_nome!r})'
+
+
+def empresas_disponiveis(user) -> list:
+    """Empresas que o usuário pode selecionar (todas, para superusuários)."""
+    from usuarios.models import Empresa
+
+    def _carregar():
+        qs = Empresa.objects.all() if user.is_superuser else Empresa.objects.filter(userempresa__user=user)
+        return list(qs.order_by('id'))
+
+    # is_superuser na chave: promover ou rebaixar o usuário troca a lista na hora
+    return memoizar(
+        'acesso:empresas', [user.pk, int(user.is_superuser)], _carregar,
+        escopos=[_escopo_usuario(user.pk)], timeout=ACESSO_CACHE_TIMEOUT,
+    )
+
+
+def permissoes(user, empresa_id) -> Permissoes | None:
+    """
+    Permissões do usuário na empresa, ou None se ele não tem vínculo com ela.
+    Superusuários recebem todos os flags.
+    """
+    from usuarios.models import UserEmpresa
+
+    if user.is_superuser:
+        return Permissoes(empresa_id, role_nome='Superusuário', flags={c: True for c in _campos_permissao()})
+
+    def _carregar():
+        vinculo = UserEmpresa.objects.select_related('role').filter(user=user, empresa_id=empresa_id).first()
+        if not vinculo:
+            return {'vinculado': False}
+        return {
+            'vinculado': True,
+            'role_id': vinculo.role_id,
+            'role_nome': vinculo.role.nome,
+            'flags': {c: getattr(vinculo.role, c) for c in _campos_permissao()},
+        }
+
+    dados = memoizar(
+        'acesso:permissoes', [user.pk], _carregar,
+        empresa_id=empresa_id, escopos=[_escopo_usuario(user.pk)], timeout=ACESSO_CACHE_TIMEOUT,
+    )
+
+    if not dados['vinculado']:
+        return None
+    return Permissoes(empresa_id, dados['role_id'], dados['role_nome'], dados['flags'])
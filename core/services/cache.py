@@ -0,0 +1,198 @@
+"""
+Camada de Cache da Aplicação
+
+Construída sobre o cache default do Django — Redis em produção (compartilhado
+pelos processos do gunicorn e pelos workers do Celery), LocMemCache nos testes.
+
+- Namespaces por empresa: chaves '<namespace>:e<empresa_id>:v<versões>:<partes>'
+- Invalidação versionada: invalidar_namespace() incrementa um contador de
+  versão; entradas antigas deixam de ser lidas e expiram sozinhas, sem
+  varredura de chaves
+- Proteção contra stampede: numa falta, só quem obtém o lock recalcula; os
+  demais aguardam o valor por até CACHE_LOCK_ESPERA segundos
+- Métricas de acertos/faltas por namespace, acumuladas no processo e somadas
+  no cache compartilhado a cada CACHE_METRICAS_INTERVALO segundos
+"""
+
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+CACHE_LOCK_TIMEOUT = getattr(settings, 'CACHE_LOCK_TIMEOUT', 30)
+CACHE_LOCK_ESPERA = getattr(settings, 'CACHE_LOCK_ESPERA', 5)
+CACHE_METRICAS_INTERVALO = getattr(settings, 'CACHE_METRICAS_INTERVALO', 30)
+
+_AUSENTE = object()
+_CHAVE_NAMESPACES_METRICAS = 'metricas:namespaces'
+
+
+# ============================================================
+# VERSÕES
+# ============================================================
+
+def _versao_inicial() -> int:
+    # Baseada no relógio: se o cache descartar a versão, a nova nunca
+    # coincide com uma anterior e entradas antigas não voltam a valer.
+    return time.time_ns() // 1_000_000
+
+
+def versoes(*escopos) -> list[int]:
+    """Versão atual de cada escopo (criada na primeira leitura), numa ida ao cache."""
+    chaves = [f'versao:{e}' for e in escopos]
+    atuais = cache.get_many(chaves)
+    faltantes = {c: _versao_inicial() for c in chaves if c not in atuais}
+    if faltantes:
+        cache.set_many(faltantes, None)
+        atuais.update(faltantes)
+    return [atuais[c] for c in chaves]
+
+
+def incrementar_versao(escopo):
+    """Invalida todas as chaves que embutem a versão do escopo."""
+    chave = f'versao:{escopo}'
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, _versao_inicial(), None)
+
+
+def escopo_namespace(namespace, empresa_id=None) -> str:
+    return namespace if empresa_id is None else f'{namespace}:e{empresa_id}'
+
+
+def invalidar_namespace(namespace, empresa_id=None):
+    """Invalida o namespace inteiro (de uma empresa, se informada)."""
+    incrementar_versao(escopo_namespace(namespace, empresa_id))
+
+
+def chave(namespace, *partes, empresa_id=None, escopos=()) -> str:
+    """
+    Chave versionada. Além da versão do namespace (da empresa), pode embutir
+    versões de outros escopos — ex. 'acesso:usuario:<id>' — para que mais de
+    um tipo de alteração invalide a mesma entrada.
+    """
+    base = escopo_namespace(namespace, empresa_id)
+    versao = '.'.join(str(v) for v in versoes(base, *escopos))
+    return ':'.join([base, f'v{versao}', *(str(p) for p in partes)])
+
+
+# ============================================================
+# MEMOIZAÇÃO
+# ============================================================
+
+def memoizar(namespace, partes, calcular, *, empresa_id=None, escopos=(), timeout=DEFAULT_TIMEOUT):
+    """
+    Valor em cache de calcular() ou, numa falta, calcula e grava.
+
+    Args:
+        namespace: Agrupa as chaves para invalidação e métricas ('fundos:listagem')
+        partes: Identificam o valor dentro do namespace (ex. [user.pk])
+        calcular: Função sem argumentos que produz o valor (pode ser None)
+        empresa_id: Separa o namespace por empresa
+        escopos: Escopos de versão adicionais (ver chave())
+        timeout: Validade em segundos (default: TIMEOUT do cache)
+    """
+    k = chave(namespace, *partes, empresa_id=empresa_id, escopos=escopos)
+
+    valor = cache.get(k, _AUSENTE)
+    if valor is not _AUSENTE:
+        _registrar(namespace, 'acertos')
+        return valor
+    _registrar(namespace, 'faltas')
+
+    lock = f'{k}:lock'
+    dono = cache.add(lock, 1, CACHE_LOCK_TIMEOUT)
+    if not dono:
+        limite = time.monotonic() + CACHE_LOCK_ESPERA
+        while time.monotonic() < limite:
+            time.sleep(0.05)
+            valor = cache.get(k, _AUSENTE)
+            if valor is not _AUSENTE:
+                return valor
+        # Quem detém o lock demorou demais: calcula por conta própria
+
+    try:
+        valor = calcular()
+        cache.set(k, valor, timeout)
+    finally:
+        if dono:
+            cache.delete(lock)
+    return valor
+
+
+# ============================================================
+# MÉTRICAS
+# ============================================================
+
+_metricas = Counter()
+_metricas_lock = threading.Lock()
+_metricas_envio = time.monotonic()
+
+
+def _registrar(namespace, tipo):
+    global _metricas_envio
+
+    with _metricas_lock:
+        _metricas[(namespace, tipo)] += 1
+        if time.monotonic() - _metricas_envio < CACHE_METRICAS_INTERVALO:
+            return
+        _metricas_envio = time.monotonic()
+    enviar_metricas()
+
+
+def enviar_metricas():
+    """Soma os contadores do processo aos compartilhados e zera os locais."""
+    with _metricas_lock:
+        pendentes = dict(_metricas)
+        _metricas.clear()
+    if not pendentes:
+        return
+
+    namespaces = cache.get(_CHAVE_NAMESPACES_METRICAS) or set()
+    novos = {ns for ns, _ in pendentes} - namespaces
+    if novos:
+        cache.set(_CHAVE_NAMESPACES_METRICAS, namespaces | novos, None)
+
+    for (namespace, tipo), n in pendentes.items():
+        k = f'metricas:{namespace}:{tipo}'
+        try:
+            cache.incr(k, n)
+        except ValueError:
+            if not cache.add(k, n, None):
+                cache.incr(k, n)
+
+
+def metricas_cache() -> dict:
+    """
+    Returns:
+        {namespace: {'acertos', 'faltas', 'taxa_acerto'}} somando todos os
+        processos (inclui os contadores ainda não enviados deste processo)
+    """
+    enviar_metricas()
+    namespaces = sorted(cache.get(_CHAVE_NAMESPACES_METRICAS) or ())
+    valores = cache.get_many([f'metricas:{ns}:{t}' for ns in namespaces for t in ('acertos', 'faltas')])
+
+    resultado = {}
+    for ns in namespaces:
+        acertos = valores.get(f'metricas:{ns}:acertos', 0)
+        faltas = valores.get(f'metricas:{ns}:faltas', 0)
+        total = acertos + faltas
+        resultado[ns] = {
+            'acertos': acertos,
+            'faltas': faltas,
+            'taxa_acerto': acertos / total if total else None,
+        }
+    return resultado
+
+
+def zerar_metricas_cache():
+    with _metricas_lock:
+        _metricas.clear()
+    namespaces = cache.get(_CHAVE_NAMESPACES_METRICAS) or ()
+    cache.delete_many([f'metricas:{ns}:{t}' for ns in namespaces for t in ('acertos', 'faltas')])
+    cache.delete(_CHAVE_NAMESPACES_METRICAS)
@@ -1,7 +1,7 @@
-from io import BytesIO
 from decimal import Decimal
 from datetime import datetime
-from docxtpl import DocxTemplate
+
+from core.services.docx_templates import renderizar_docx
 
 
 # -------------------------------------------------
@@ -28,18 +28,10 @@ def _digits(v: str) -> str:
 
 
 # -------------------------------------------------
-# Render principal
+# Contexto comum aos termos
 # -------------------------------------------------
 
-def render_termo_cessao_docx(
-    template_path: str,
-    *,
-    partes,
-    titulos,
-    dados_operacao: dict
-) -> bytes:
-
-    doc = DocxTemplate(template_path)
+def _contexto_termo(partes, titulos, dados_operacao: dict) -> dict:
 
     # =============================
     # Títulos → tabela
@@ -110,17 +102,24 @@ def render_termo_cessao_docx(
         "valor_total": _fmt_money(total),
     })
 
-    # =============================
-    # Render
-    # =============================
+    return context
 
-    doc.render(context)
 
-    buf = BytesIO()
-    doc.save(buf)
-    buf.seek(0)
+# -------------------------------------------------
+# Render principal
+# -------------------------------------------------
+# Templates vêm do cache do processo (core/services/docx_templates.py):
+# carregados uma vez e recarregados quando o arquivo muda.
+
+def render_termo_cessao_docx(
+    template_path: str,
+    *,
+    partes,
+    titulos,
+    dados_operacao: dict
+) -> bytes:
 
-    return buf.read()
+    return renderizar_docx(template_path, _contexto_termo(partes, titulos, dados_operacao))
 
 
 def render_termo_confirmacao_docx(
@@ -133,85 +132,4 @@ def render_termo_confirmacao_docx(
     """
     Renderiza o termo de confirmação usando exatamente a mesma lógica do termo de cessão
     """
-    doc = DocxTemplate(template_path)
-
-    # =============================
-    # Títulos → tabela
-    # =============================
-
-    total = sum(t.valor for t in titulos)
-
-    tabela = []
-    for t in titulos:
-        tabela.append({
-            "sacado_nome": t.sacado_nome,
-            "sacado_doc": _fmt_doc(t.sacado_doc),
-            "valor": _fmt_money(t.valor),
-            "vencimento": t.vencimento_iso,
-            "tipo": t.tipo_credito,
-            "numero": t.numero_titulo,
-        })
-
-    # =============================
-    # Base context — dados_operacao
-    # =============================
-
-    context = dict(dados_operacao)   # <<< pega TODOS campos do form
-
-    # =============================
-    # Data atual (quando clicou gerar)
-    # =============================
-    
-    context["data_atual"] = datetime.now().strftime("%d/%m/%Y")
-
-    # =============================
-    # Formata campos conhecidos
-    # =============================
-
-    if context.get("preco_aquisicao"):
-        context["preco_aquisicao"] = _fmt_money(context["preco_aquisicao"])
-
-    # datas → string bonita
-    for campo_data in [
-        "data_aquisicao",
-        "data_contrato"
-    ]:
-        if context.get(campo_data):
-            context[campo_data] = context[campo_data].strftime("%d/%m/%Y")
-
-    # docs - formatação automática dos novos campos
-    campos_doc = [
-        "cessionario_doc", "emitente_cnpj", "cessionario_cnpj", 
-        "emitente_cpf", "cessionario_cpf", "testemunha1_cpf", "testemunha2_cpf",
-        "sacado_cnpj", "sacado_cpf"
-    ]
-    
-    for campo in campos_doc:
-        if context.get(campo):
-            context[campo] = _fmt_doc(_digits(context[campo]))
-
-    # =============================
-    # Partes fixas
-    # =============================
-
-    context.update({
-        "cedente_nome": partes.cedente_nome,
-        "cedente_doc": _fmt_doc(partes.cedente_doc),
-        "sacado_nome": partes.sacado_nome,
-        "sacado_doc": _fmt_doc(partes.sacado_doc),
-
-        "titulos": tabela,
-        "valor_total": _fmt_money(total),
-    })
-
-    # =============================
-    # Render
-    # =============================
-
-    doc.render(context)
-
-    buf = BytesIO()
-    doc.save(buf)
-    buf.seek(0)
-
-    return buf.read()
+    return renderizar_docx(template_path, _contexto_termo(partes, titulos, dados_operacao))
@@ -0,0 +1,174 @@
+"""
+Termos de Cessão em Lote
+
+Recebe várias NF-e de uma vez (XMLs soltos ou ZIPs), agrupa as duplicatas
+por (cedente, sacado) — um termo por par — e renderiza os termos no pool de
+processos compartilhado (core.services.processos). O ZIP é gerado em
+streaming: cada termo entra no arquivo assim que fica pronto e os bytes já
+escritos são devolvidos ao cliente, sem montar o ZIP em memória.
+"""
+
+import io
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from core.services import processos
+from core.services.cessao_doc import render_termo_cessao_docx
+from core.services.cessao_xml import PartesCessao, TituloCessao, arquivos_nfe_zip, parse_nfes
+
+
+CESSAO_LOTE_WORKERS = getattr(settings, 'CESSAO_LOTE_WORKERS', None)
+
+
+@dataclass(frozen=True)
+class GrupoTermo:
+    partes: PartesCessao
+    titulos: tuple[TituloCessao, ...]
+    notas: tuple[str, ...]
+
+    @property
+    def nome_arquivo(self) -> str:
+        return f"termo_cessao_{self.partes.cedente_doc or 'cedente'}_{self.partes.sacado_doc or 'sacado'}.docx"
+
+
+def ler_nfes(arquivos) -> tuple[list, list]:
+    """
+    Args:
+        arquivos: iterável de (nome, bytes); ZIPs são expandidos nos seus .xml
+
+    Returns:
+        (parseados, erros): [(nome, ParseResult)] e [(nome, mensagem)]
+    """
+    xmls, erros = [], []
+    for nome, conteudo in arquivos:
+        if not nome.lower().endswith('.zip'):
+            xmls.append((nome, conteudo))
+            continue
+        try:
+            xmls.extend((f'{nome}/{interno}', xml) for interno, xml in arquivos_nfe_zip(conteudo))
+        except ValueError as e:
+            erros.append((nome, str(e)))
+
+    parseados = []
+    for nome, resultado, erro in parse_nfes(xmls):
+        if resultado is None:
+            erros.append((nome, erro))
+        else:
+            parseados.append((nome, resultado))
+    return parseados, erros
+
+
+def agrupar_por_partes(parseados) -> list[GrupoTermo]:
+    """Um grupo por (cedente, sacado), na ordem em que o par aparece."""
+    grupos = {}
+    for _, resultado in parseados:
+        chave = (resultado.partes.cedente_doc, resultado.partes.sacado_doc)
+        partes, titulos, notas = grupos.setdefault(chave, (resultado.partes, [], []))
+        titulos.extend(resultado.titulos)
+        if resultado.partes.numero_nota:
+            notas.append(resultado.partes.numero_nota)
+
+    return [GrupoTermo(partes, tuple(titulos), tuple(notas)) for partes, titulos, notas in grupos.values()]
+
+
+def _renderizar_grupo(template_path: str, grupo: GrupoTermo, dados_operacao: dict) -> tuple[bytes | None, str]:
+    """Executado nos processos do pool. Retorna (docx, erro)."""
+    dados = dict(dados_operacao)
+    # Campos do emitente em branco no formulário vêm da própria NF-e
+    dados['emitente_razao_social'] = dados.get('emitente_razao_social') or grupo.partes.cedente_nome
+    dados['emitente_cnpj'] = dados.get('emitente_cnpj') or grupo.partes.cedente_doc
+    try:
+        docx = render_termo_cessao_docx(
+            template_path, partes=grupo.partes, titulos=grupo.titulos, dados_operacao=dados,
+        )
+        return docx, ''
+    except Exception as e:
+        return None, str(e)
+
+
+def _renderizar_conforme_terminam(grupos, template_path, dados_operacao, workers: int):
+    """
+    Gera (grupo, docx, erro) na ordem em que os renders terminam, no pool de
+    processos compartilhado. No máximo 2 × workers grupos ficam em voo.
+    """
+    if workers <= 1 or not processos.pool_disponivel():
+        for grupo in grupos:
+            yield grupo, *_renderizar_grupo(template_path, grupo, dados_operacao)
+        return
+
+    pendentes = iter(grupos)
+    em_voo = {}
+
+    def _submeter():
+        for grupo in pendentes:
+            try:
+                futuro = processos.submeter(_renderizar_grupo, template_path, grupo, dados_operacao)
+            except Exception as e:
+                futuro = Future()
+                futuro.set_exception(e)
+            em_voo[futuro] = grupo
+            if len(em_voo) >= 2 * workers:
+                break
+
+    _submeter()
+    while em_voo:
+        prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+        for futuro in prontos:
+            grupo = em_voo.pop(futuro)
+            try:
+                yield grupo, *futuro.result()
+            except Exception as e:
+                # Falha do pool (BrokenProcessPool, pickling), não do render: só este grupo se perde
+                yield grupo, None, f'Falha no processo de render: {e!r}'
+        _submeter()
+
+
+class _SaidaStreaming(io.RawIOBase):
+    """Destino não posicionável do ZipFile: acumula os bytes até serem drenados."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._partes.append(bytes(b))
+        return len(b)
+
+    def drenar(self) -> bytes:
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def gerar_termos_zip(
+    grupos: list[GrupoTermo],
+    template_path: str,
+    dados_operacao: dict,
+    erros=(),
+    workers: int | None = None,
+):
+    """
+    Gerador de bytes do ZIP com um termo por grupo (para StreamingHttpResponse).
+    NF-e ilegíveis (`erros`) e falhas de render vão para erros.txt no ZIP.
+    """
+    workers = min(workers or CESSAO_LOTE_WORKERS or processos.tamanho_pool(), len(grupos))
+    erros = list(erros)
+
+    saida = _SaidaStreaming()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for grupo, docx, erro in _renderizar_conforme_terminam(grupos, template_path, dados_operacao, workers):
+            if erro:
+                erros.append((grupo.nome_arquivo, erro))
+                continue
+            zf.writestr(grupo.nome_arquivo, docx)
+            yield saida.drenar()
+
+        if erros:
+            zf.writestr('erros.txt', '\n'.join(f'{nome}: {erro}' for nome, erro in erros))
+
+    yield saida.drenar()
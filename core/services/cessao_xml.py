@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
+import io
 import re
 import xml.etree.ElementTree as ET
-from typing import Any
+import zipfile
+from functools import lru_cache
+from types import SimpleNamespace
+
+from django.conf import settings
+
+from core.services import processos
+
+
+NFE_PARSE_WORKERS = getattr(settings, "NFE_PARSE_WORKERS", None)
+NFE_PARSE_MIN_PARALELO = getattr(settings, "NFE_PARSE_MIN_PARALELO", 500)
 
 
 # ============================================================
@@ -50,86 +63,48 @@ def _to_decimal(value: str | None) -> Decimal:
         return Decimal("0")
 
 
-def _find_first_text(elem: ET.Element, paths: list[str], ns: dict[str, str]) -> str:
-    """
-    Procura o primeiro texto existente em uma lista de XPaths (relativos ao elem).
-    Retorna "" se não achar.
-    """
-    for p in paths:
-        found = elem.find(p, ns)
-        if found is not None and (found.text or "").strip():
-            return (found.text or "").strip()
-    return ""
+def _namespace(tag: str) -> str:
+    """'{http://www.portalfiscal.inf.br/nfe}infNFe' → 'http://www.portalfiscal.inf.br/nfe'"""
+    return tag[1:tag.index("}")] if tag[:1] == "{" else ""
 
 
-def _all(elem: ET.Element, path: str, ns: dict[str, str]) -> list[ET.Element]:
-    return list(elem.findall(path, ns))
+_TAGS_NFE = (
+    "infNFe", "ide", "emit", "dest", "cobr", "det", "prod", "dup",
+    "nNF", "dhEmi", "dEmi", "xNome", "CNPJ", "CPF", "vProd", "nDup", "dVenc", "vDup",
+)
 
 
-def _safe_find(elem: ET.Element, tag_name: str, ns: dict[str, str]) -> ET.Element | None:
-    """
-    Busca elemento tentando primeiro sem namespace, depois com namespace se disponível.
-    """
-    # Primeiro tenta sem namespace
-    found = elem.find(tag_name)
-    if found is not None:
-        return found
-    
-    # Se tem namespace available, tenta com prefixo
-    if ns and 'nfe' in ns:
-        found = elem.find(f"nfe:{tag_name}", ns)
-        if found is not None:
-            return found
-    
-    return None
-
-
-def _safe_findall(elem: ET.Element, tag_name: str, ns: dict[str, str]) -> list[ET.Element]:
-    """
-    Busca todos os elementos tentando primeiro sem namespace, depois com namespace se disponível.
-    """
-    # Primeiro tenta sem namespace
-    found = elem.findall(tag_name)
-    if found:
-        return found
-    
-    # Se tem namespace available, tenta com prefixo
-    if ns and 'nfe' in ns:
-        found = elem.findall(f"nfe:{tag_name}", ns)
-        if found:
-            return found
-    
-    return []
-
-
-def _safe_find_text(elem: ET.Element, tag_name: str, ns: dict[str, str]) -> str:
-    """
-    Busca texto de um elemento tentando primeiro sem namespace, depois com namespace.
-    """
-    found = _safe_find(elem, tag_name, ns)
+@lru_cache(maxsize=8)
+def _tags(namespace: str) -> SimpleNamespace:
+    """Nomes qualificados ('{ns}tag') das tags usadas pelo parser, por namespace."""
+    prefixo = f"{{{namespace}}}" if namespace else ""
+    return SimpleNamespace(**{t: prefixo + t for t in _TAGS_NFE})
+
+
+def _texto(elem: ET.Element, tag: str) -> str:
+    found = elem.find(tag)
     if found is not None and found.text:
         return found.text.strip()
     return ""
 
 
-def _infer_namespace(root: ET.Element) -> dict[str, str]:
+def _localizar_infnfe(root: ET.Element) -> tuple[ET.Element | None, SimpleNamespace | None]:
     """
-    NF-e normalmente usa namespace como:
-      {http://www.portalfiscal.inf.br/nfe}
-    Este helper tenta capturar e retornar um dict pro ElementTree.
+    Acha infNFe (root, nfeProc/NFe/infNFe, NFe/infNFe...) e devolve as tags
+    no namespace dele. Normalmente o namespace do root já resolve; a
+    varredura da árvore só acontece quando root e infNFe divergem.
     """
-    # Primeiro, tenta pela tag do root
-    m = re.match(r"\{(.+)\}", root.tag)
-    if m:
-        return {"nfe": m.group(1)}
-    
-    # Se não encontrou, procura recursivamente por elementos com namespace
-    for elem in root.iter():
-        m = re.match(r"\{(.+)\}", elem.tag)
-        if m:
-            return {"nfe": m.group(1)}
-    
-    return {}
+    q = _tags(_namespace(root.tag))
+    if root.tag == q.infNFe:
+        return root, q
+
+    infnfe = root.find(f".//{q.infNFe}")
+    if infnfe is None:
+        infnfe = next((e for e in root.iter() if e.tag.rpartition("}")[2] == "infNFe"), None)
+    if infnfe is None:
+        return None, None
+
+    return infnfe, _tags(_namespace(infnfe.tag))
 
 
 @dataclass(frozen=True)
@@ -174,66 +149,61 @@ def parse_nfe_xml(xml_bytes: bytes) -> ParseResult:
     Não salva nada em disco. Só retorna dados.
     """
     root = ET.fromstring(xml_bytes)
-    ns = _infer_namespace(root)
-
-    # Achar o nó infNFe (pode estar em nfeProc/NFe/infNFe etc.)
-    infnfe = root.find(".//infNFe")
-    if infnfe is None and ns and 'nfe' in ns:
-        infnfe = root.find(".//nfe:infNFe", ns)
+    infnfe, q = _localizar_infnfe(root)
 
     if infnfe is None:
         raise ValueError("XML não contém infNFe (não parece ser uma NF-e válida).")
 
-    # nós principais usando funções seguras
-    emit = _safe_find(infnfe, "emit", ns)
-    dest = _safe_find(infnfe, "dest", ns)
-    ide = _safe_find(infnfe, "ide", ns)
-    cobr = _safe_find(infnfe, "cobr", ns)
+    # nós principais (tags já qualificadas com o namespace da nota)
+    emit = infnfe.find(q.emit)
+    dest = infnfe.find(q.dest)
+    ide = infnfe.find(q.ide)
+    cobr = infnfe.find(q.cobr)
 
     if emit is None or dest is None:
         raise ValueError("XML NF-e sem tags emit/dest.")
 
-    cedente_nome = _safe_find_text(emit, "xNome", ns)
-    cedente_cnpj = _digits(_safe_find_text(emit, "CNPJ", ns))
+    cedente_nome = _texto(emit, q.xNome)
+    cedente_cnpj = _digits(_texto(emit, q.CNPJ))
 
-    sacado_nome = _safe_find_text(dest, "xNome", ns)
+    sacado_nome = _texto(dest, q.xNome)
     # Tenta CNPJ primeiro, depois CPF
-    sacado_doc = (_digits(_safe_find_text(dest, "CNPJ", ns)) or 
-                  _digits(_safe_find_text(dest, "CPF", ns)))
+    sacado_doc = (_digits(_texto(dest, q.CNPJ)) or 
+                  _digits(_texto(dest, q.CPF)))
 
     numero_nota = ""
     data_emissao = ""
     if ide is not None:
-        numero_nota = _safe_find_text(ide, "nNF", ns)
+        numero_nota = _texto(ide, q.nNF)
         # dhEmi é comum, mas algumas versões usam dEmi
-        data_emissao = (_safe_find_text(ide, "dhEmi", ns) or 
-                       _safe_find_text(ide, "dEmi", ns))
+        data_emissao = (_texto(ide, q.dhEmi) or 
+                       _texto(ide, q.dEmi))
         data_emissao = data_emissao.strip()
 
     # Total por produtos (fallback)
     # somar det/prod/vProd
-    det_nodes = _safe_findall(infnfe, "det", ns)
+    det_nodes = infnfe.findall(q.det)
     soma_vprod = Decimal("0")
     for det in det_nodes:
-        prod = _safe_find(det, "prod", ns)
+        prod = det.find(q.prod)
         if prod is None:
             continue
-        vprod = _safe_find_text(prod, "vProd", ns)
+        vprod = _texto(prod, q.vProd)
         soma_vprod += _to_decimal(vprod)
 
     # Duplicatas (cobr/dup)
     dup_nodes: list[ET.Element] = []
     if cobr is not None:
-        dup_nodes = _safe_findall(cobr, "dup", ns)
+        dup_nodes = cobr.findall(q.dup)
 
     titulos: list[TituloCessao] = []
 
     if dup_nodes:
         for dup in dup_nodes:
-            d_venc = _safe_find_text(dup, "dVenc", ns)
+            d_venc = _texto(dup, q.dVenc)
             # valor da duplicata pode ser vDup; se não existir, deixa 0 e a tela decide
-            v_dup = _to_decimal(_safe_find_text(dup, "vDup", ns))
-            n_dup = _safe_find_text(dup, "nDup", ns)
+            v_dup = _to_decimal(_texto(dup, q.vDup))
+            n_dup = _texto(dup, q.nDup)
 
             titulos.append(
                 TituloCessao(
@@ -287,6 +257,93 @@ def parse_nfe_xml(xml_bytes: bytes) -> ParseResult:
     return ParseResult(partes=partes, titulos=titulos, total=total)
 
 
+# ============================================================
+# Várias notas (lista de XMLs ou ZIP)
+# ============================================================
+
+def parse_nfe_seguro(xml_bytes: bytes) -> tuple[ParseResult | None, str]:
+    """parse_nfe_xml que devolve (resultado, erro) em vez de levantar exceção."""
+    try:
+        return parse_nfe_xml(xml_bytes), ""
+    except (ET.ParseError, ValueError) as e:
+        return None, str(e)
+
+
+def arquivos_nfe_zip(zip_bytes: bytes) -> list[tuple[str, bytes]]:
+    """(nome, bytes) dos .xml de um ZIP, na ordem do arquivo."""
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(zip_bytes))
+    except zipfile.BadZipFile:
+        raise ValueError("O arquivo enviado não é um ZIP válido.")
+
+    with zf:
+        return [
+            (name, zf.read(name)) for name in zf.namelist()
+            if name.lower().endswith(".xml") and not name.startswith("__MACOSX")
+        ]
+
+
+def _parse_bloco(xmls: list[bytes]) -> list[tuple[ParseResult | None, str]]:
+    """Executado nos processos do pool: um bloco de notas por ida e volta."""
+    return [parse_nfe_seguro(xml_bytes) for xml_bytes in xmls]
+
+
+def _parse_em_blocos(xmls: list[bytes], workers: int) -> list[tuple[ParseResult | None, str]]:
+    """
+    Parseia em blocos no pool compartilhado, com no máximo `workers` blocos em
+    voo. Um bloco perdido por falha do pool (BrokenProcessPool) é parseado
+    aqui mesmo, sequencialmente.
+    """
+    # Blocos grandes: uma ida e volta ao processo filho por bloco, não por nota
+    tamanho = max(1, len(xmls) // (workers * 4))
+    em_voo = deque()
+    resultados = []
+
+    def _coletar():
+        bloco, futuro = em_voo.popleft()
+        try:
+            resultados.extend(futuro.result())
+        except Exception:
+            resultados.extend(_parse_bloco(bloco))
+
+    for i in range(0, len(xmls), tamanho):
+        if len(em_voo) >= workers:
+            _coletar()
+        bloco = xmls[i:i + tamanho]
+        try:
+            futuro = processos.submeter(_parse_bloco, bloco)
+        except Exception as e:
+            futuro = Future()
+            futuro.set_exception(e)
+        em_voo.append((bloco, futuro))
+    while em_voo:
+        _coletar()
+    return resultados
+
+
+def parse_nfes(entrada, workers: int | None = None) -> list[tuple[str, ParseResult | None, str]]:
+    """
+    Parseia várias NF-e — um ZIP (bytes) ou uma lista de (nome, bytes) — e
+    devolve (nome, resultado, erro) por nota, na ordem de entrada.
+
+    Lotes com NFE_PARSE_MIN_PARALELO notas ou mais são divididos em blocos
+    e parseados no pool de processos compartilhado (core.services.processos),
+    com até `workers` blocos simultâneos (default: NFE_PARSE_WORKERS ou o
+    tamanho do pool, que também limita o paralelismo).
+    """
+    arquivos = arquivos_nfe_zip(entrada) if isinstance(entrada, (bytes, bytearray)) else list(entrada)
+    xmls = [xml_bytes for _, xml_bytes in arquivos]
+    workers = workers or NFE_PARSE_WORKERS or processos.tamanho_pool()
+
+    # Notas são pequenas: abaixo do limiar o envio aos processos custa mais que o parsing
+    if workers <= 1 or len(xmls) < NFE_PARSE_MIN_PARALELO or not processos.pool_disponivel():
+        resultados = map(parse_nfe_seguro, xmls)
+    else:
+        resultados = _parse_em_blocos(xmls, workers)
+
+    return [(nome, resultado, erro) for (nome, _), (resultado, erro) in zip(arquivos, resultados)]
+
+
 # ============================================================
 # Utilitário opcional para sua view
 # ============================================================
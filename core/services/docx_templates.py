@@ -0,0 +1,160 @@
+"""
+Cache de Templates DOCX
+
+DocxTemplate(caminho) descompacta e interpreta o .docx a cada documento, e
+o render repete sobre o mesmo XML a limpeza de tags (patch_xml) e a
+compilação Jinja — a maior parte do tempo de um termo.
+
+Aqui cada template de doc_templates/ é carregado uma vez por processo:
+- o Document interpretado fica em memória e cada render usa uma cópia
+  profunda (árvores lxml, sem ler nem descompactar o arquivo)
+- patch_xml e a compilação Jinja são memoizados pelo XML de origem, que é
+  idêntico em todas as cópias do template
+- a entrada é recarregada quando o mtime do arquivo muda
+
+renderizar_docx() registra a latência de cada render (log e
+estatisticas_render()).
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+
+
+logger = logging.getLogger(__name__)
+
+
+class _AmbienteJinja(Environment):
+    """Environment cujo from_string reaproveita templates já compilados."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._compilados = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals or template_class:
+            return super().from_string(source, globals, template_class)
+        template = self._compilados.get(source)
+        if template is None:
+            template = self._compilados[source] = super().from_string(source)
+        return template
+
+
+@dataclass
+class _Entrada:
+    caminho: str
+    mtime: int
+    documento: object
+    jinja_envs: dict = field(default_factory=dict)
+    xml_patcheado: dict = field(default_factory=dict)
+
+    def jinja_env(self, autoescape: bool) -> _AmbienteJinja:
+        # Um ambiente (e seus compilados) por valor de autoescape: o docxtpl
+        # liga env.autoescape num render com escape, e o compilado depende dele
+        env = self.jinja_envs.get(autoescape)
+        if env is None:
+            env = self.jinja_envs.setdefault(autoescape, _AmbienteJinja(autoescape=autoescape))
+        return env
+
+
+class _DocxTemplateEmCache(DocxTemplate):
+    """DocxTemplate sobre uma cópia do Document em cache."""
+
+    def __init__(self, entrada: _Entrada):
+        super().__init__(entrada.caminho)
+        self._entrada = entrada
+        self.docx = copy.deepcopy(entrada.documento)
+
+    def init_docx(self, reload: bool = True):
+        if self.is_rendered and reload:
+            self.docx = copy.deepcopy(self._entrada.documento)
+            self.is_rendered = False
+
+    def patch_xml(self, src_xml):
+        patcheados = self._entrada.xml_patcheado
+        xml = patcheados.get(src_xml)
+        if xml is None:
+            xml = patcheados[src_xml] = super().patch_xml(src_xml)
+        return xml
+
+    def render(self, context, jinja_env=None, autoescape=False):
+        super().render(context, jinja_env or self._entrada.jinja_env(autoescape), autoescape)
+
+
+_templates: dict[str, _Entrada] = {}
+_templates_lock = threading.Lock()
+
+_latencias: dict[str, dict] = {}
+_latencias_lock = threading.Lock()
+
+
+def obter_template(caminho) -> DocxTemplate:
+    """DocxTemplate pronto para render, a partir do cache do processo."""
+    caminho = os.path.abspath(caminho)
+    mtime = os.stat(caminho).st_mtime_ns
+
+    entrada = _templates.get(caminho)
+    if entrada is None or entrada.mtime != mtime:
+        with _templates_lock:
+            entrada = _templates.get(caminho)
+            if entrada is None or entrada.mtime != mtime:
+                entrada = _templates[caminho] = _Entrada(caminho, mtime, Document(caminho))
+                logger.info(f"[DOCX] Template carregado: {caminho}")
+
+    return _DocxTemplateEmCache(entrada)
+
+
+def limpar_cache_templates():
+    with _templates_lock:
+        _templates.clear()
+
+
+def renderizar_docx(caminho, context: dict) -> bytes:
+    """Renderiza o template com o contexto e retorna o .docx em bytes."""
+    inicio = time.perf_counter()
+
+    doc = obter_template(caminho)
+    doc.render(context)
+    buf = BytesIO()
+    doc.save(buf)
+
+    ms = (time.perf_counter() - inicio) * 1000
+    _registrar_latencia(os.path.basename(caminho), ms)
+    logger.info(f"[DOCX] {os.path.basename(caminho)} renderizado em {ms:.1f} ms")
+
+    return buf.getvalue()
+
+
+def _registrar_latencia(nome, ms):
+    with _latencias_lock:
+        e = _latencias.setdefault(nome, {'renders': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'ultimo_ms': 0.0})
+        e['renders'] += 1
+        e['total_ms'] += ms
+        e['max_ms'] = max(e['max_ms'], ms)
+        e['ultimo_ms'] = ms
+
+
+def estatisticas_render() -> dict:
+    """
+    Returns:
+        {nome_template: {'renders', 'media_ms', 'max_ms', 'ultimo_ms'}}
+        deste processo
+    """
+    with _latencias_lock:
+        return {
+            nome: {
+                'renders': e['renders'],
+                'media_ms': e['total_ms'] / e['renders'],
+                'max_ms': e['max_ms'],
+                'ultimo_ms': e['ultimo_ms'],
+            }
+            for nome, e in _latencias.items()
+        }
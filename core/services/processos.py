@@ -0,0 +1,81 @@
+"""
+Pool de Processos Compartilhado
+
+O trabalho CPU-bound (render de termos em lote, parsing de NF-e e de
+informes mensais) roda num único ProcessPoolExecutor por processo, criado no
+primeiro uso e reaproveitado entre requisições — subir um pool por
+requisição custava, dentro do worker do gunicorn, o spawn de N
+interpretadores com o Django a cada chamada.
+
+Um pool quebrado (BrokenProcessPool: filho morto pelo OOM killer, p.ex.) é
+descartado e substituído no próximo submeter().
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+PROCESSOS_POOL_WORKERS = getattr(settings, 'PROCESSOS_POOL_WORKERS', None)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def pool_disponivel() -> bool:
+    """Processos daemon (ex.: workers prefork do Celery) não podem criar filhos."""
+    return not multiprocessing.current_process().daemon
+
+
+def tamanho_pool() -> int:
+    return PROCESSOS_POOL_WORKERS or multiprocessing.cpu_count()
+
+
+def _obter_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn': os filhos não herdam conexões nem threads do processo web
+            _pool = ProcessPoolExecutor(
+                max_workers=tamanho_pool(), mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _descartar(pool: ProcessPoolExecutor):
+    global _pool
+
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def submeter(fn, *args) -> Future:
+    """
+    Submete fn(*args) ao pool do processo. Se o pool quebrou, cria outro e
+    tenta de novo uma vez; o BrokenProcessPool de tarefas já em voo chega
+    pelo result() do futuro.
+    """
+    pool = _obter_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning("[POOL] Pool de processos quebrado; recriando")
+        _descartar(pool)
+        return _obter_pool().submit(fn, *args)
+
+
+def encerrar_pool():
+    """Encerra o pool do processo (o próximo submeter() cria outro)."""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        _descartar(pool)
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from usuarios.models import Empresa, EmpresaRole, UserEmpresa
+
+from .services.acesso import invalidar_empresa, invalidar_empresas, invalidar_usuario
+
+
+@receiver([post_save, post_delete], sender=Empresa)
+def invalidar_acesso_empresa(sender, instance, **kwargs):
+    invalidar_empresas()
+    invalidar_empresa(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=EmpresaRole)
+def invalidar_acesso_role(sender, instance, **kwargs):
+    invalidar_empresa(instance.empresa_id)
+
+
+@receiver([post_save, post_delete], sender=UserEmpresa)
+def invalidar_acesso_vinculo(sender, instance, **kwargs):
+    invalidar_empresa(instance.empresa_id)
+    invalidar_usuario(instance.user_id)
@@ -1,3 +1,397 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from docxtpl import DocxTemplate
+
+from fundos.models import Fundo, Recebiveis
+from usuarios.models import Empresa, EmpresaRole, UserEmpresa
+from .services import cessao_lote, cessao_xml, docx_templates, processos
+from .services.acesso import empresas_disponiveis
+from .services.cache import chave, invalidar_namespace, memoizar, metricas_cache, zerar_metricas_cache
+
+
+class CacheAplicacaoTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        zerar_metricas_cache()
+
+    def test_namespace_por_empresa_e_invalidacao_versionada(self):
+        chamadas = []
+
+        def calcular(valor):
+            chamadas.append(valor)
+            return valor
+
+        self.assertEqual(memoizar('teste', ['x'], lambda: calcular('a1'), empresa_id=1), 'a1')
+        self.assertEqual(memoizar('teste', ['x'], lambda: calcular('b1'), empresa_id=2), 'b1')
+        self.assertEqual(memoizar('teste', ['x'], lambda: calcular('a2'), empresa_id=1), 'a1')
+
+        invalidar_namespace('teste', 1)
+        self.assertEqual(memoizar('teste', ['x'], lambda: calcular('a3'), empresa_id=1), 'a3')
+        self.assertEqual(memoizar('teste', ['x'], lambda: calcular('b2'), empresa_id=2), 'b1')
+        self.assertEqual(chamadas, ['a1', 'b1', 'a3'])
+
+        # None também é memoizado
+        self.assertIsNone(memoizar('teste', ['nulo'], lambda: calcular(None)))
+        self.assertIsNone(memoizar('teste', ['nulo'], lambda: calcular('outro')))
+
+        self.assertEqual(metricas_cache()['teste'], {'acertos': 3, 'faltas': 4, 'taxa_acerto': 3 / 7})
+
+    def test_stampede_recalcula_uma_vez(self):
+        liberar = threading.Event()
+        chamadas = []
+
+        def lento():
+            chamadas.append(1)
+            liberar.wait(5)
+            return 'valor'
+
+        # Registra quem entrou no laço de espera pelo lock
+        esperando = set()
+
+        def _dormir(segundos):
+            esperando.add(threading.get_ident())
+            time.sleep(segundos)
+
+        relogio = SimpleNamespace(monotonic=time.monotonic, time=time.time, time_ns=time.time_ns, sleep=_dormir)
+
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(memoizar('teste', ['lento'], lento)))
+            for _ in range(4)
+        ]
+        with mock.patch('core.services.cache.time', relogio):
+            for t in threads:
+                t.start()
+
+            # Só libera o cálculo com o lock tomado e as outras três threads aguardando
+            limite = time.monotonic() + 3
+            while len(esperando) < 3 and time.monotonic() < limite:
+                time.sleep(0.01)
+            self.assertEqual(len(esperando), 3)
+            self.assertIsNotNone(cache.get(f"{chave('teste', 'lento')}:lock"))
+
+            liberar.set()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(resultados, ['valor'] * 4)
+        self.assertEqual(len(chamadas), 1)
+
+
+class AcessoEmpresaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.empresa = Empresa.objects.create(nome='Empresa', cnpj='00000000000100')
+        self.role = EmpresaRole.objects.create(empresa=self.empresa, nome='Analista', pode_ver_informes=True)
+        self.user = get_user_model().objects.create_user('analista', 'analista@teste.com', 'senha')
+        UserEmpresa.objects.create(user=self.user, empresa=self.empresa, role=self.role)
+        self.client.force_login(self.user)
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('fundos:series_informes'))
+        acesso = [q['sql'] for q in ctx.captured_queries if 'usuarios_' in q['sql'] and 'customuser' not in q['sql']]
+        return resp, acesso
+
+    def test_sem_consultas_em_regime_estavel_e_invalidacao_por_role(self):
+        resp, acesso = self._get()
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(acesso)
+
+        resp, acesso = self._get()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(acesso, [])
+
+        self.role.pode_ver_informes = False
+        self.role.save()
+        resp, _ = self._get()
+        self.assertEqual(resp.status_code, 403)
+
+    def test_remocao_do_vinculo(self):
+        self._get()
+        UserEmpresa.objects.filter(user=self.user).delete()  # queryset.delete() dispara post_delete
+        resp, _ = self._get()
+        self.assertEqual(resp.status_code, 403)
+
+    def test_empresas_disponiveis_acompanham_superusuario(self):
+        outra = Empresa.objects.create(nome='Outra', cnpj='00000000000200')
+        self.assertEqual(empresas_disponiveis(self.user), [self.empresa])
+
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertEqual(set(empresas_disponiveis(self.user)), {self.empresa, outra})
+
+        self.user.is_superuser = False
+        self.user.save()
+        self.assertEqual(empresas_disponiveis(self.user), [self.empresa])
+
+
+class DocxTemplatesCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        docx_templates.limpar_cache_templates()
+        self.addCleanup(docx_templates.limpar_cache_templates)
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.caminho = os.path.join(tmp, 'termo.docx')
+        shutil.copy(settings.DOC_TEMPLATE_DIR / 'termo_cessao.docx', self.caminho)
+        self.context = {
+            'cedente_nome': 'Cedente X', 'valor_total': 'R$ 10,00',
+            'titulos': [{'sacado_nome': f'Sacado {i}', 'numero': str(i)} for i in range(5)],
+        }
+
+    def _document_xml(self, docx_bytes):
+        return zipfile.ZipFile(BytesIO(docx_bytes)).read('word/document.xml')
+
+    def test_render_igual_ao_docxtemplate_e_carrega_uma_vez(self):
+        esperado = DocxTemplate(self.caminho)
+        esperado.render(self.context)
+        buf = BytesIO()
+        esperado.save(buf)
+
+        with mock.patch.object(docx_templates, 'Document', wraps=docx_templates.Document) as carregar:
+            gerados = [docx_templates.renderizar_docx(self.caminho, self.context) for _ in range(3)]
+
+        self.assertEqual(carregar.call_count, 1)
+        for gerado in gerados:
+            self.assertEqual(self._document_xml(gerado), self._document_xml(buf.getvalue()))
+        self.assertEqual(docx_templates.estatisticas_render()['termo.docx']['renders'], 3)
+
+    def test_autoescape_nao_vaza_para_outros_renders(self):
+        def _render(doc, context, **kwargs):
+            doc.render(context, **kwargs)
+            buf = BytesIO()
+            doc.save(buf)
+            return self._document_xml(buf.getvalue())
+
+        escapado = {**self.context, 'emitente_razao_social': 'Cedente & Filhos'}
+        ja_escapado = {**self.context, 'emitente_razao_social': 'Cedente &amp; Filhos'}
+
+        com_escape = _render(docx_templates.obter_template(self.caminho), escapado, autoescape=True)
+        sem_escape = _render(docx_templates.obter_template(self.caminho), ja_escapado)
+
+        self.assertEqual(com_escape, _render(DocxTemplate(self.caminho), escapado, autoescape=True))
+        self.assertEqual(sem_escape, _render(DocxTemplate(self.caminho), ja_escapado))
+
+    def test_recarrega_quando_mtime_muda(self):
+        with mock.patch.object(docx_templates, 'Document', wraps=docx_templates.Document) as carregar:
+            docx_templates.obter_template(self.caminho)
+            docx_templates.obter_template(self.caminho)
+            st = os.stat(self.caminho)
+            os.utime(self.caminho, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            docx_templates.obter_template(self.caminho)
+
+        self.assertEqual(carregar.call_count, 2)
+
+
+def _nfe_xml(numero, cedente_cnpj='22222222000122', sacado_cnpj='33333333000133', duplicatas=(('001', '100.00'),)):
+    dups = ''.join(
+        f'<dup><nDup>{n}</nDup><dVenc>2026-12-31</dVenc><vDup>{v}</vDup></dup>' for n, v in duplicatas
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe"><NFe><infNFe>
+  <ide><nNF>{numero}</nNF><dhEmi>2026-10-01T10:00:00-03:00</dhEmi></ide>
+  <emit><CNPJ>{cedente_cnpj}</CNPJ><xNome>Cedente {cedente_cnpj}</xNome></emit>
+  <dest><CNPJ>{sacado_cnpj}</CNPJ><xNome>Sacado {sacado_cnpj}</xNome></dest>
+  <cobr>{dups}</cobr>
+</infNFe></NFe></nfeProc>""".encode()
+
+
+class NfeParserTests(SimpleTestCase):
+
+    def test_namespace_resolvido_e_sem_namespace(self):
+        com_ns = cessao_xml.parse_nfe_xml(_nfe_xml('10', duplicatas=(('001', '1.234,56'), ('002', '10.00'))))
+        sem_ns = cessao_xml.parse_nfe_xml(_nfe_xml('10', duplicatas=(('001', '1.234,56'), ('002', '10.00'))).replace(
+            b' xmlns="http://www.portalfiscal.inf.br/nfe"', b''))
+
+        self.assertEqual(com_ns, sem_ns)
+        self.assertEqual(com_ns.partes.cedente_doc, '22222222000122')
+        self.assertEqual(com_ns.partes.numero_nota, '10')
+        self.assertEqual([t.numero_titulo for t in com_ns.titulos], ['001', '002'])
+        self.assertEqual(com_ns.total, Decimal('1244.56'))
+
+    def test_zip_e_lista_em_paralelo_na_ordem_de_entrada(self):
+        arquivos = [(f'nfe{i}.xml', _nfe_xml(str(i))) for i in range(6)] + [('ruim.xml', b'<nfe')]
+        buf = BytesIO()
+        with zipfile.ZipFile(buf, 'w') as zf:
+            for nome, xml in arquivos:
+                zf.writestr(nome, xml)
+
+        sequencial = cessao_xml.parse_nfes(buf.getvalue(), workers=1)
+        with mock.patch.object(cessao_xml, 'NFE_PARSE_MIN_PARALELO', 0), \
+                mock.patch.object(processos, 'submeter', wraps=processos.submeter) as submeter:
+            paralelo = cessao_xml.parse_nfes(arquivos, workers=2)
+
+        self.assertTrue(submeter.called)
+
+        self.assertEqual(sequencial, paralelo)
+        self.assertEqual([nome for nome, _, _ in paralelo], [nome for nome, _ in arquivos])
+        self.assertEqual([r.partes.numero_nota for _, r, _ in paralelo[:6]], [str(i) for i in range(6)])
+        self.assertIsNone(paralelo[6][1])
+        self.assertTrue(paralelo[6][2])
+
+
+    @mock.patch.object(cessao_xml, 'NFE_PARSE_MIN_PARALELO', 0)
+    def test_bloco_perdido_pelo_pool_e_parseado_sequencialmente(self):
+        arquivos = [(f'nfe{i}.xml', _nfe_xml(str(i))) for i in range(16)]
+        submetidos = []
+
+        def _submeter(fn, bloco):
+            submetidos.append(bloco)
+            futuro = Future()
+            if len(submetidos) == 2:
+                futuro.set_exception(BrokenProcessPool('filho morto'))
+            else:
+                futuro.set_result(fn(bloco))
+            return futuro
+
+        with mock.patch.object(processos, 'submeter', side_effect=_submeter):
+            paralelo = cessao_xml.parse_nfes(arquivos, workers=2)
+
+        self.assertEqual(len(submetidos), 8)
+        self.assertEqual(paralelo, cessao_xml.parse_nfes(arquivos, workers=1))
+
+
+class CessaoLoteTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@teste.com', 'senha')
+        self.client.force_login(self.user)
+
+    def _dados_operacao(self):
+        return {
+            'data_aquisicao': '2026-10-01', 'preco_aquisicao': '950.00',
+            'banco_aquisicao': 'Banco', 'agencia_aquisicao': '0001', 'conta_aquisicao': '123',
+            'banco_fundo': 'Banco', 'agencia_fundo': '0001', 'conta_fundo': '456',
+            'data_contrato': '2026-10-01',
+        }
+
+    def test_agrupa_por_cedente_e_sacado(self):
+        parseados, erros = cessao_lote.ler_nfes([
+            ('a.xml', _nfe_xml('1', duplicatas=(('001', '100.00'), ('002', '50.00')))),
+            ('b.xml', _nfe_xml('2')),
+            ('c.xml', _nfe_xml('3', sacado_cnpj='44444444000144')),
+            ('d.xml', b'<nao-e-nfe/>'),
+        ])
+        grupos = cessao_lote.agrupar_por_partes(parseados)
+
+        self.assertEqual([nome for nome, _ in erros], ['d.xml'])
+        self.assertEqual([(len(g.titulos), g.notas) for g in grupos], [(3, ('1', '2')), (1, ('3',))])
+
+        zip_bytes = b''.join(cessao_lote.gerar_termos_zip(
+            grupos, str(settings.DOC_TEMPLATE_DIR / 'termo_cessao.docx'), {}, erros=erros, workers=2,
+        ))
+        nomes = zipfile.ZipFile(BytesIO(zip_bytes)).namelist()
+        self.assertEqual(sorted(nomes), sorted([g.nome_arquivo for g in grupos] + ['erros.txt']))
+
+    def test_falha_do_pool_vai_para_erros_txt(self):
+        grupos = cessao_lote.agrupar_por_partes([
+            (f'{i}.xml', cessao_xml.parse_nfe_xml(_nfe_xml(str(i), sacado_cnpj=f'3333333300013{i}')))
+            for i in range(3)
+        ])
+        submeter = processos.submeter
+
+        def _submeter(fn, template_path, grupo, dados):
+            if grupo is grupos[1]:
+                quebrado = Future()
+                quebrado.set_exception(BrokenProcessPool('filho morto'))
+                return quebrado
+            return submeter(fn, template_path, grupo, dados)
+
+        with mock.patch.object(processos, 'submeter', side_effect=_submeter):
+            zip_bytes = b''.join(cessao_lote.gerar_termos_zip(
+                grupos, str(settings.DOC_TEMPLATE_DIR / 'termo_cessao.docx'), {}, workers=2,
+            ))
+
+        zf = zipfile.ZipFile(BytesIO(zip_bytes))
+        self.assertEqual(
+            sorted(zf.namelist()), sorted([grupos[0].nome_arquivo, grupos[2].nome_arquivo, 'erros.txt']),
+        )
+        self.assertIn(f'{grupos[1].nome_arquivo}: Falha no processo de render', zf.read('erros.txt').decode())
+
+    @mock.patch.object(cessao_lote, 'CESSAO_LOTE_WORKERS', 1)
+    def test_view_devolve_zip_em_streaming(self):
+        arquivos = [
+            SimpleUploadedFile(f'nfe{i}.xml', _nfe_xml(str(i), sacado_cnpj=f'3333333300013{i}'))
+            for i in range(3)
+        ]
+        resp = self.client.post(reverse('workflow_cessao_lote'), {**self._dados_operacao(), 'xml_lote': arquivos})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        zf = zipfile.ZipFile(BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(len(zf.namelist()), 3)
+        self.assertTrue(all(zf.read(n).startswith(b'PK') for n in zf.namelist()))
+
+
+class PoolProcessosTests(SimpleTestCase):
+
+    def test_pool_reaproveitado_e_recriado_quando_quebra(self):
+        self.assertEqual(processos.submeter(pow, 2, 3).result(), 8)
+        pool = processos._pool
+        self.assertEqual(processos.submeter(pow, 2, 4).result(), 16)
+        self.assertIs(processos._pool, pool)
+
+        with self.assertRaises(BrokenProcessPool):
+            processos.submeter(os._exit, 1).result()
+        self.assertEqual(processos.submeter(pow, 2, 5).result(), 32)
+        self.assertIsNot(processos._pool, pool)
+
+
+class CessaoGerarTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@teste.com', 'senha')
+        self.client.force_login(self.user)
+        self.fundo = Fundo.objects.create(
+            empresa=Empresa.objects.create(nome='Empresa', cnpj='00000000000100'),
+            cnpj='11111111000111', razao_social='Fundo', tipo_fundo='FIDC', data_constituicao=date(2020, 1, 1),
+        )
+
+    def _post(self, numeros):
+        dados = {
+            'acao': 'gerar', 'form-TOTAL_FORMS': len(numeros), 'form-INITIAL_FORMS': 0,
+            'data_aquisicao': '2026-10-01', 'preco_aquisicao': '950.00',
+            'banco_aquisicao': 'Banco', 'agencia_aquisicao': '0001', 'conta_aquisicao': '123',
+            'banco_fundo': 'Banco', 'agencia_fundo': '0001', 'conta_fundo': '456',
+            'data_contrato': '2026-10-01', 'emitente_razao_social': 'Cedente',
+        }
+        for i, numero in enumerate(numeros):
+            dados.update({
+                f'form-{i}-numero': numero, f'form-{i}-sacado_nome': 'Sacado',
+                f'form-{i}-sacado_doc': '33.333.333/0001-33', f'form-{i}-valor': '100.00',
+                f'form-{i}-vencimento': '2026-12-31', f'form-{i}-tipo': 'Duplicata',
+            })
+        return self.client.post(reverse('workflow_cessao'), dados)
+
+    def test_gerar_informa_inseridos_e_ignorados(self):
+        resp = self._post(['1', '2'])
+        self.assertEqual((resp['X-Recebiveis-Inseridos'], resp['X-Recebiveis-Ignorados']), ('2', '0'))
+
+        resp = self._post(['2', '3'])
+        self.assertEqual((resp['X-Recebiveis-Inseridos'], resp['X-Recebiveis-Ignorados']), ('1', '1'))
+        self.assertEqual(Recebiveis.objects.filter(fundo=self.fundo).count(), 3)
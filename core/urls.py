@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .views_cessao import workflow_cessao_view
+from .views_cessao import workflow_cessao_lote_view, workflow_cessao_view
 
 
 urlpatterns = [
@@ -14,5 +14,6 @@ urlpatterns = [
 
     path("trocar-empresa/", views.trocar_empresa, name="trocar_empresa"),
     
-    path('workflow-cessao/', workflow_cessao_view, name='workflow_cessao')
+    path('workflow-cessao/', workflow_cessao_view, name='workflow_cessao'),
+    path('workflow-cessao/lote/', workflow_cessao_lote_view, name='workflow_cessao_lote'),
 ]
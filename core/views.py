@@ -102,10 +102,7 @@ def trocar_empresa(request):
         return redirect(request.META.get("HTTP_REFERER", "home"))
 
     # Usuários normais: só empresas vinculadas
-    pertence = UserEmpresa.objects.filter(
-        user=request.user,
-        empresa_id=empresa_id
-    ).exists()
+    pertence = any(str(e.id) == str(empresa_id) for e in request.empresas_disponiveis)
 
     if pertence:
         request.session["empresa_ativa"] = empresa_id
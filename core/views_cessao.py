@@ -1,6 +1,7 @@
 from decimal import Decimal
-from django.shortcuts import render
-from django.http import HttpResponse
+from django.shortcuts import redirect, render
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
@@ -12,8 +13,10 @@ from core.forms_cessao import (
 
 from core.services.cessao_xml import parse_nfe_uploaded_file
 from core.services.cessao_doc import render_termo_cessao_docx, render_termo_confirmacao_docx
+from core.services.cessao_lote import agrupar_por_partes, gerar_termos_zip, ler_nfes
 
 from fundos.models import Recebiveis, Fundo
+from fundos.services.recebiveis import inserir_recebiveis_novos
 
 
 TEMPLATE_HTML = "workflow_cessao_cpv.html"
@@ -114,11 +117,9 @@ def workflow_cessao_view(request):
                     "titulos_formset": titulos_formset, 
                 })
 
-            # ---------- salvar recebíveis ----------
-            for t in titulos_validos:
-
-                Recebiveis.objects.create(
-                    fundo=fundo,
+            # ---------- salvar recebíveis (uma transação, já cadastrados são ignorados) ----------
+            gravacao = inserir_recebiveis_novos(fundo, [
+                Recebiveis(
                     cedente_cnpj=_digits(t["sacado_doc"]),
                     cedente_nome=t["sacado_nome"],
                     sacado_cpf_cnpj=_digits(t["sacado_doc"]),
@@ -130,6 +131,13 @@ def workflow_cessao_view(request):
                     valor_cessao=t["valor"],
                     status="A_ENVIAR"
                 )
+                for t in titulos_validos
+            ])
+
+            messages.success(
+                request,
+                f"{gravacao['inseridos']} título(s) cadastrado(s), {gravacao['ignorados']} já existente(s) ignorado(s)."
+            )
 
             # ---------- doc ----------
             class T:
@@ -163,7 +171,11 @@ def workflow_cessao_view(request):
             return HttpResponse(
                 doc_bytes,
                 content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                headers={"Content-Disposition": 'attachment; filename="termo_cessao.docx"'}
+                headers={
+                    "Content-Disposition": 'attachment; filename="termo_cessao.docx"',
+                    "X-Recebiveis-Inseridos": str(gravacao["inseridos"]),
+                    "X-Recebiveis-Ignorados": str(gravacao["ignorados"]),
+                }
             )
 
         # =====================================================
@@ -240,5 +252,42 @@ def workflow_cessao_view(request):
     })
 
 
+@login_required
+@require_POST
+def workflow_cessao_lote_view(request):
+    """
+    Várias NF-e → um ZIP com um termo de cessão por (cedente, sacado).
+    Os dados da operação vêm do mesmo formulário do termo individual.
+    """
+    arquivos = request.FILES.getlist("xml_lote")
+
+    if not arquivos:
+        messages.error(request, "Selecione os XMLs das NF-e.")
+        return redirect("workflow_cessao")
+
+    cessao_form = CessaoForm(request.POST)
+
+    if not cessao_form.is_valid():
+        messages.error(request, "Corrija os campos.")
+        return render(request, TEMPLATE_HTML, {
+            "cessao_form": cessao_form,
+            "titulos_formset": TituloCessaoFormSet(),
+        })
+
+    parseados, erros = ler_nfes((f.name, f.read()) for f in arquivos)
+
+    if not parseados:
+        messages.error(request, "Nenhuma NF-e válida entre os arquivos enviados.")
+        return redirect("workflow_cessao")
+
+    grupos = agrupar_por_partes(parseados)
+
+    return StreamingHttpResponse(
+        gerar_termos_zip(grupos, TEMPLATE_DOCX, cessao_form.cleaned_data, erros=erros),
+        content_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="termos_cessao.zip"'}
+    )
+
+
 def _digits(v):
     return "".join(c for c in str(v or "") if c.isdigit())
@@ -18,14 +18,14 @@ app.autodiscover_tasks()
 app.conf.beat_schedule = {
     # Calcular cotas todos os dias às 23h
     # 'calcular-cotas-diarias-23h': {  # DESATIVADO
-    #     'task': 'fundos.tasks.calcular_cotas_diarias',
+    #     'task': 'fundos.tasks.fechar_cotas_diarias',
     #     'schedule': crontab(hour=23, minute=0),
     # },
     
-    # Efetivar movimentações todos os dias às 8h
+    # Efetivar movimentações às 8h em dias de semana (feriados tratados na task)
     'efetivar-movimentacoes-8h': {
         'task': 'fundos.tasks.efetivar_movimentacoes_pendentes',
-        'schedule': crontab(hour=8, minute=0),
+        'schedule': crontab(hour=8, minute=0, day_of_week='mon-fri'),
     },
     
     # Enviar cotas para ANBIMA às 9h
@@ -34,6 +34,18 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=9, minute=0),
     },
     
+    # Come-cotas: a task só executa no último dia útil de maio/novembro
+    'come-cotas-semestral-20h': {
+        'task': 'fundos.tasks.executar_come_cotas_semestral',
+        'schedule': crontab(hour=20, minute=0, day_of_month='20-31', month_of_year='5,11'),
+    },
+    
+    # Importações de informes interrompidas (worker morto) saem de PROCESSANDO
+    'reciclar-importacoes-travadas-15min': {
+        'task': 'fundos.tasks.reciclar_importacoes_travadas',
+        'schedule': crontab(minute='*/15'),
+    },
+    
     # Verificar inadimplência a cada 1 hora
     # 'verificar-inadimplencia-1h': {  # DESATIVADO
     #     'task': 'fundos.tasks.verificar_inadimplencia',
@@ -106,12 +106,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+# Cache compartilhado entre gunicorn e Celery: Redis (mesmo servidor do broker, banco 1).
+# Com CACHE_URL=locmem:// usa cache em memória do processo (testes: fidc_gestao.settings_test).
+CACHE_URL = os.getenv('CACHE_URL', 'redis://localhost:6379/1')
+
+if CACHE_URL.startswith('locmem://'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "fidc-gestao",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "KEY_PREFIX": "fidc",
+        }
     }
-}
+
+# Camada de cache (core/services/cache.py): lock anti-stampede (s), espera por quem
+# detém o lock (s) e intervalo de envio das métricas de acerto/falta (s)
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', 30))
+CACHE_LOCK_ESPERA = float(os.getenv('CACHE_LOCK_ESPERA', 5))
+CACHE_METRICAS_INTERVALO = int(os.getenv('CACHE_METRICAS_INTERVALO', 30))
 
 from django.contrib.messages import constants as messages
 
@@ -202,6 +221,57 @@ CELERY_BROKER_CONNECTION_RETRY = True
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_BROKER_CONNECTION_MAX_RETRIES = 10
 
+# Importação de informes numa fila própria, consumida por um worker sem prefork (ver README):
+#   celery -A fidc_gestao worker -Q importacao -P threads -c 2
+# Filhos do prefork são daemon e não podem criar o pool de parsing (que cai para sequencial).
+# Sem esse worker as importações ficam em PENDENTE até reciclar_importacoes_travadas.
+CELERY_TASK_ROUTES = {
+    'fundos.tasks.importar_lote_zip_task': {'queue': 'importacao'},
+}
+
 # Logs
 CELERY_WORKER_LOG_FORMAT = '[%(asctime)s: %(levelname)s/%(processName)s] %(message)s'
-CELERY_WORKER_TASK_LOG_FORMAT = '[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s'
\ No newline at end of file
+CELERY_WORKER_TASK_LOG_FORMAT = '[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s'
+
+# Fechamento de cotas: máximo de fundos calculados em paralelo por banco
+COTAS_MAX_PARALELO_POR_BANCO = int(os.getenv('COTAS_MAX_PARALELO_POR_BANCO', 8))
+# Tentativas (com backoff exponencial) de obter um slot antes de desistir do fundo
+COTAS_SLOT_MAX_TENTATIVAS = int(os.getenv('COTAS_SLOT_MAX_TENTATIVAS', 20))
+# Limite de tempo do fechamento de um fundo (segundos); o slot expira logo após o limite
+COTAS_FUNDO_TIME_LIMIT = int(os.getenv('COTAS_FUNDO_TIME_LIMIT', 5 * 60))
+
+# Calendário de dias úteis: feriados nacionais ANBIMA (AAAA-MM-DD;descrição)
+FERIADOS_ARQUIVO = os.getenv('FERIADOS_ARQUIVO', str(BASE_DIR / 'fundos' / 'data' / 'feriados_anbima.csv'))
+
+# Parser do Informe Mensal XML: 'etree' (árvore completa) ou 'lxml' (streaming)
+INFORME_XML_PARSER = os.getenv('INFORME_XML_PARSER', 'etree')
+
+# Importação em lote de informes: parsing simultâneo no pool compartilhado (default: PROCESSOS_POOL_WORKERS)
+# e informes por transação
+INFORME_IMPORT_WORKERS = int(os.getenv('INFORME_IMPORT_WORKERS', 0)) or None
+INFORME_IMPORT_LOTE_DB = int(os.getenv('INFORME_IMPORT_LOTE_DB', 12))
+# Importação (pendente ou em andamento) sem progresso há mais que isso (s) é dada como interrompida
+INFORME_IMPORT_TIMEOUT = int(os.getenv('INFORME_IMPORT_TIMEOUT', CELERY_TASK_TIME_LIMIT + 5 * 60))
+
+# Cessão: parsing de NF-e em lote — blocos simultâneos no pool compartilhado (default e teto: PROCESSOS_POOL_WORKERS)
+# e mínimo de notas para paralelizar
+NFE_PARSE_WORKERS = int(os.getenv('NFE_PARSE_WORKERS', 0)) or None
+NFE_PARSE_MIN_PARALELO = int(os.getenv('NFE_PARSE_MIN_PARALELO', 500))
+
+# Cessão: recebíveis por INSERT no bulk_create
+RECEBIVEIS_BULK_BATCH_SIZE = int(os.getenv('RECEBIVEIS_BULK_BATCH_SIZE', 500))
+
+# Pool de processos compartilhado por requisições CPU-bound: tamanho (default: núcleos)
+PROCESSOS_POOL_WORKERS = int(os.getenv('PROCESSOS_POOL_WORKERS', 0)) or None
+
+# Termos de cessão em lote: renders em voo por requisição (default: tamanho do pool)
+CESSAO_LOTE_WORKERS = int(os.getenv('CESSAO_LOTE_WORKERS', 0)) or None
+
+# Arquivo dos XMLs originais dos informes: blobs gzip endereçados por SHA-256 (fora de MEDIA_ROOT)
+INFORME_XML_ARQUIVO_DIR = os.getenv('INFORME_XML_ARQUIVO_DIR', str(BASE_DIR / 'arquivo_xml'))
+
+# listar_fundos: validade (s) da listagem em cache por empresa; invalidada ao salvar/excluir Fundo
+LISTAGEM_FUNDOS_CACHE_TIMEOUT = int(os.getenv('LISTAGEM_FUNDOS_CACHE_TIMEOUT', 3600))
+
+# Empresas disponíveis e permissões por usuário: validade (s) no cache; invalidadas por sinais
+ACESSO_CACHE_TIMEOUT = int(os.getenv('ACESSO_CACHE_TIMEOUT', 3600))
@@ -0,0 +1,17 @@
+"""
+Settings dos testes: as de produção com cache em memória do processo,
+qualquer que seja o runner (manage.py test, pytest-django, call_command).
+
+    python manage.py test --settings=fidc_gestao.settings_test
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+CACHE_URL = 'locmem://'
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fidc-gestao",
+    }
+}
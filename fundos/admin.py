@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Fundo, Cotista, MovimentacaoCota, CotaHistorico, Ativo, Recebiveis, InformeMensal, InformeMensalCedente, InformeMensalCarteira
+from django.http import JsonResponse
+from .models import Fundo, Cotista, MovimentacaoCota, PosicaoCotista, LoteCotista, ExecucaoComeCotas, CotaHistorico, Ativo, Recebiveis, InformeMensal, InformeMensalCedente, InformeMensalCarteira, ImportacaoInformeLote, InformeMetrica
 
 @admin.register(Fundo)
 class FundoAdmin(admin.ModelAdmin):
@@ -21,6 +22,26 @@ class MovimentacaoCotaAdmin(admin.ModelAdmin):
     search_fields = ('fundo__razao_social', 'cotista__nome_razao_social')
     date_hierarchy = 'data_cotizacao'
 
+@admin.register(PosicaoCotista)
+class PosicaoCotistaAdmin(admin.ModelAdmin):
+    list_display = ('fundo', 'cotista', 'quantidade_cotas', 'custo_total', 'data_atualizacao')
+    list_filter = ('fundo',)
+    search_fields = ('fundo__razao_social', 'cotista__nome_razao_social', 'cotista__cpf_cnpj')
+    readonly_fields = ('id', 'data_atualizacao')
+
+@admin.register(LoteCotista)
+class LoteCotistaAdmin(admin.ModelAdmin):
+    list_display = ('fundo', 'cotista', 'sequencia', 'data_aplicacao', 'valor_cota_aquisicao', 'quantidade_inicial', 'quantidade_saldo')
+    list_filter = ('fundo',)
+    search_fields = ('cotista__nome_razao_social', 'cotista__cpf_cnpj')
+    raw_id_fields = ('movimentacao',)
+
+@admin.register(ExecucaoComeCotas)
+class ExecucaoComeCotasAdmin(admin.ModelAdmin):
+    list_display = ('fundo', 'semestre', 'data_referencia', 'valor_cota', 'quantidade_cotistas', 'ir_total', 'data_execucao')
+    list_filter = ('semestre', 'fundo')
+    readonly_fields = ('id', 'data_execucao')
+
 @admin.register(CotaHistorico)
 class CotaHistoricoAdmin(admin.ModelAdmin):
     list_display = ('fundo', 'data_referencia', 'valor_cota', 'patrimonio_liquido', 'quantidade_cotas')
@@ -61,12 +82,27 @@ class InformeMensalAdmin(admin.ModelAdmin):
     readonly_fields = ('id', 'criado_em', 'atualizado_em', 'criado_por')
     date_hierarchy = 'competencia'
     inlines = [InformeMensalCarteiraInline, InformeMensalCedenteInline]
+    actions = ['baixar_dados_brutos']
 
     def competencia_display(self, obj):
         return obj.competencia_display
     competencia_display.short_description = 'Competência'
     competencia_display.admin_order_field = 'competencia'
 
+    @admin.action(description='Baixar dados brutos (JSON)')
+    def baixar_dados_brutos(self, request, queryset):
+        from .services.importar_informe import dados_brutos_informe
+
+        response = JsonResponse(
+            {
+                f"{informe.fundo.cnpj}_{informe.competencia:%Y-%m}": dados_brutos_informe(informe)
+                for informe in queryset.select_related('fundo')
+            },
+            json_dumps_params={'ensure_ascii': False},
+        )
+        response['Content-Disposition'] = 'attachment; filename="informes_dados_brutos.json"'
+        return response
+
 
 @admin.register(InformeMensalCarteira)
 class InformeMensalCarteiraAdmin(admin.ModelAdmin):
@@ -79,3 +115,17 @@ class InformeMensalCarteiraAdmin(admin.ModelAdmin):
 class InformeMensalCedenteAdmin(admin.ModelAdmin):
     list_display = ('informe', 'nr_pf_pj_cedent', 'pr_cedent')
     search_fields = ('nr_pf_pj_cedent', 'informe__fundo__razao_social')
+
+
+@admin.register(ImportacaoInformeLote)
+class ImportacaoInformeLoteAdmin(admin.ModelAdmin):
+    list_display = ('empresa', 'fundo', 'arquivo_nome', 'status', 'processados', 'total', 'criado_por', 'criado_em')
+    list_filter = ('status', 'empresa', 'fundo')
+    readonly_fields = ('id', 'resultados', 'criado_em', 'atualizado_em')
+
+
+@admin.register(InformeMetrica)
+class InformeMetricaAdmin(admin.ModelAdmin):
+    list_display = ('fundo', 'competencia', 'metrica', 'valor')
+    list_filter = ('metrica', 'fundo')
+    raw_id_fields = ('informe',)
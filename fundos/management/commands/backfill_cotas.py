@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fundos.services.cota import recalcular_cotas_periodo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as cotas de um fundo para um intervalo de datas em uma única passada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fundo_id', help='UUID do fundo')
+        parser.add_argument('data_inicio', type=date.fromisoformat, help='AAAA-MM-DD')
+        parser.add_argument('data_fim', type=date.fromisoformat, help='AAAA-MM-DD (inclusive)')
+
+    def handle(self, *args, **options):
+        try:
+            resultado = recalcular_cotas_periodo(
+                options['fundo_id'],
+                options['data_inicio'],
+                options['data_fim'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['dias_recalculados']} dia(s) recalculado(s), "
+            f"{resultado['registros_gravados']} registro(s) gravado(s) "
+            f"({resultado['data_inicio']} → {resultado['data_fim']})."
+        ))
@@ -0,0 +1,77 @@
+import resource
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fundos.services.informe_xml import parse_informe_mensal
+
+
+_MODELO = '''<?xml version="1.0" encoding="UTF-8"?>
+<DOC_ARQ>
+  <CAB_INFORM><VERSAO>6.0</VERSAO><DT_COMPT>01/2026</DT_COMPT><NR_CNPJ_ADM>11222333000144</NR_CNPJ_ADM>
+    <NR_CNPJ_FUNDO>55666777000188</NR_CNPJ_FUNDO><NM_CLASSE>FIDC Benchmark</NM_CLASSE></CAB_INFORM>
+  <LISTA_INFORM>
+    <APLIC_ATIVO><VL_DISPONIB>1.000,00</VL_DISPONIB><VL_CARTEIRA>12.000.000,00</VL_CARTEIRA>
+      <DICRED><VL_DICRED>11.000.000,00</VL_DICRED></DICRED>
+      <LISTA_CEDENT>{cedentes}</LISTA_CEDENT>
+    </APLIC_ATIVO>
+    <CART_SEGMT><VL_IND>100,00</VL_IND><SEGMT_FINANC><VL_FINANC_MMARKET>3,25</VL_FINANC_MMARKET></SEGMT_FINANC></CART_SEGMT>
+    <PASSIV><VL_SOM_PASSIV>10,00</VL_SOM_PASSIV><PASSIV_VALORES/></PASSIV>
+    <PATRLIQ><VL_PATRIM_LIQ>12.000.000,00</VL_PATRIM_LIQ></PATRLIQ>
+    <COMPMT_DICRED_SEM_AQUIS><VL_PRAZO_VENC_30>1,00</VL_PRAZO_VENC_30></COMPMT_DICRED_SEM_AQUIS>
+    <OUTRAS_INFORM>
+      <NUM_COTISTAS><QT_TOTAL_COTISTAS>12</QT_TOTAL_COTISTAS></NUM_COTISTAS>
+      <LIQUIDEZ><VL_ATIV_LIQDEZ_30>10,00</VL_ATIV_LIQDEZ_30></LIQUIDEZ>
+      <RES_INF_PRST_SCR><VLR_TOTAL_DIR_CRD_DEVD><AA>1,00</AA><D>2,00</D></VLR_TOTAL_DIR_CRD_DEVD></RES_INF_PRST_SCR>
+    </OUTRAS_INFORM>
+  </LISTA_INFORM>
+</DOC_ARQ>'''
+
+
+def _informe_sintetico(n_cedentes: int) -> bytes:
+    cedentes = ''.join(
+        f'<CEDENT><NR_PF_PJ_CEDENT>{i:014d}</NR_PF_PJ_CEDENT><PR_CEDENT>0,{i % 100:02d}</PR_CEDENT></CEDENT>'
+        for i in range(1, n_cedentes + 1)
+    )
+    return _MODELO.format(cedentes=cedentes).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara os backends do parser do Informe Mensal (etree x lxml) em tempo '
+        'e memória. Usa os arquivos informados ou um informe sintético grande.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivos', nargs='*', help='XMLs de Informe Mensal')
+        parser.add_argument('--cedentes', type=int, default=200_000,
+                            help='Cedentes do informe sintético (sem arquivos)')
+        parser.add_argument('--repeticoes', type=int, default=3)
+        parser.add_argument('--backend', choices=['etree', 'lxml'],
+                            help='Mede só um backend (para isolar o pico de memória)')
+
+    def handle(self, *args, **options):
+        if options['arquivos']:
+            documentos = [(a, Path(a).read_bytes()) for a in options['arquivos']]
+        else:
+            documentos = [(f"sintético ({options['cedentes']} cedentes)", _informe_sintetico(options['cedentes']))]
+
+        for nome, xml_bytes in documentos:
+            self.stdout.write(f'{nome}: {len(xml_bytes) / 1e6:.1f} MB')
+            resultados = {}
+            for backend in [options['backend']] if options['backend'] else ['etree', 'lxml']:
+                tempos = []
+                for _ in range(options['repeticoes']):
+                    t0 = time.perf_counter()
+                    resultados[backend] = parse_informe_mensal(xml_bytes, backend=backend)
+                    tempos.append(time.perf_counter() - t0)
+                self.stdout.write(f'  {backend:<5} melhor {min(tempos) * 1000:8.1f} ms')
+
+            if len(resultados) == 2 and resultados['etree'] != resultados['lxml']:
+                raise CommandError(f'{nome}: backends retornaram resultados diferentes')
+
+        # Pico de memória só é comparável rodando um backend por processo (--backend)
+        self.stdout.write(
+            f'Pico de memória do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB'
+        )
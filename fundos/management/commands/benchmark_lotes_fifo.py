@@ -0,0 +1,100 @@
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from fundos.models import (
+    Cotista, Fundo, LoteCotista, MovimentacaoCota, PosicaoCotista, StatusMovimentacao,
+)
+from fundos.services.lotes import calcular_impostos_lotes, consumir_lotes_fifo
+from usuarios.models import Empresa
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark do consumo FIFO de lotes: cria um cotista sintético com N lotes, '
+        'executa resgates pequenos e mede o custo por resgate. Nada é persistido.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lotes', type=int, default=10_000)
+        parser.add_argument('--resgates', type=int, default=200)
+        parser.add_argument('--cotas-por-resgate', type=Decimal, default=Decimal('15'))
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._executar(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _executar(self, options):
+        n_lotes = options['lotes']
+        sufixo = uuid.uuid4().hex[:8]
+
+        empresa = Empresa.objects.create(nome=f'Benchmark {sufixo}', cnpj=f'BENCH{sufixo}')
+        fundo = Fundo.objects.create(
+            empresa=empresa, cnpj=sufixo.zfill(14), razao_social='Fundo Benchmark',
+            tipo_fundo='FIDC', data_constituicao=date(2015, 1, 1),
+        )
+        cotista = Cotista.objects.create(
+            cpf_cnpj=sufixo.zfill(11), tipo_pessoa='PF', nome_razao_social='Cotista Benchmark',
+        )
+
+        inicio = date(2015, 1, 2)
+        movimentacoes = [
+            MovimentacaoCota(
+                tipo_movimentacao='APLICACAO', fundo=fundo, cotista=cotista,
+                data_cotizacao=inicio + timedelta(days=i // 5),
+                data_liquidacao=inicio + timedelta(days=i // 5),
+                valor_financeiro=Decimal('10.00'), valor_cota=Decimal('1.000000'),
+                quantidade_cotas=Decimal('10'), status=StatusMovimentacao.CONFIRMADO,
+            )
+            for i in range(n_lotes)
+        ]
+        MovimentacaoCota.objects.bulk_create(movimentacoes, batch_size=1000)
+        LoteCotista.objects.bulk_create(
+            [
+                LoteCotista(
+                    fundo=fundo, cotista=cotista, movimentacao=mov, sequencia=i + 1,
+                    data_aplicacao=mov.data_cotizacao, valor_cota_aquisicao=mov.valor_cota,
+                    quantidade_inicial=mov.quantidade_cotas, quantidade_saldo=mov.quantidade_cotas,
+                )
+                for i, mov in enumerate(movimentacoes)
+            ],
+            batch_size=1000,
+        )
+        PosicaoCotista.objects.create(
+            fundo=fundo, cotista=cotista, ultimo_lote=n_lotes,
+            quantidade_cotas=Decimal('10') * n_lotes, custo_total=Decimal('10.00') * n_lotes,
+        )
+
+        self.stdout.write(f'{n_lotes} lotes sintéticos criados. Executando resgates...')
+
+        data_resgate = inicio + timedelta(days=n_lotes // 5 + 30)
+        tempos = []
+        consultas = []
+        for _ in range(options['resgates']):
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                consumos, _ = consumir_lotes_fifo(fundo.id, cotista.id, options['cotas_por_resgate'])
+                calcular_impostos_lotes(consumos, Decimal('1.50'), data_resgate)
+                tempos.append(time.perf_counter() - t0)
+            consultas.append(len(ctx.captured_queries))
+
+        tempos.sort()
+        media_ms = sum(tempos) / len(tempos) * 1000
+        p95_ms = tempos[int(len(tempos) * 0.95) - 1] * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(tempos)} resgates | média {media_ms:.2f} ms | p95 {p95_ms:.2f} ms | '
+            f'{max(consultas)} consultas por resgate (máx)'
+        ))
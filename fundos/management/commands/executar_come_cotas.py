@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fundos.services.come_cotas import executar_come_cotas
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa o come-cotas semestral por cotista. Fundos já executados no '
+        'semestre são pulados, então o comando pode ser repetido para retomar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('data_referencia', type=date.fromisoformat, help='AAAA-MM-DD')
+        parser.add_argument('--fundo', action='append', dest='fundos', help='UUID do fundo (repetível)')
+
+    def handle(self, *args, **options):
+        resultado = executar_come_cotas(options['data_referencia'], options['fundos'])
+
+        for r in resultado['resultados']:
+            self.stdout.write(
+                f"{r['fundo_id']} {r['semestre']}: {r['status']} "
+                f"({r['cotistas']} cotistas, IR R$ {r['ir_total']:,.2f})"
+            )
+        for e in resultado['erros']:
+            self.stderr.write(self.style.ERROR(f"{e['fundo_id']}: {e['mensagem']}"))
+
+        if resultado['erros']:
+            raise CommandError(f"{len(resultado['erros'])} fundo(s) com erro")
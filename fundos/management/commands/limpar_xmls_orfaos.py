@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from fundos.models import InformeMensal
+from fundos.services.arquivo_xml import remover_orfaos
+
+
+class Command(BaseCommand):
+    help = 'Remove do arquivo de XMLs os blobs não referenciados por nenhum InformeMensal.arquivo_sha256.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idade-minima', type=int, default=3600,
+            help='Mantém blobs gravados há menos de N segundos (default: 3600)',
+        )
+        parser.add_argument('--simular', action='store_true', help='Só lista o que seria removido')
+
+    def handle(self, *args, **options):
+        referenciados = set(
+            InformeMensal.objects.exclude(arquivo_sha256='').values_list('arquivo_sha256', flat=True).distinct()
+        )
+        removidos = remover_orfaos(referenciados, options['idade_minima'], options['simular'])
+
+        for caminho in removidos:
+            self.stdout.write(caminho)
+        acao = 'seriam removido(s)' if options['simular'] else 'removido(s)'
+        self.stdout.write(self.style.SUCCESS(f"{len(removidos)} arquivo(s) órfão(s) {acao}."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from fundos.services.posicao import reconstruir_posicoes
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói PosicaoCotista e LoteCotista a partir do histórico de movimentações confirmadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fundo', dest='fundo_id', help='UUID do fundo (default: todos)')
+
+    def handle(self, *args, **options):
+        total = reconstruir_posicoes(options.get('fundo_id'))
+        self.stdout.write(self.style.SUCCESS(f"{total} posição(ões) e respectivos lotes FIFO reconstruídos."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from fundos.models import InformeMensal
+from fundos.services.metricas_informe import sincronizar_metricas
+
+
+class Command(BaseCommand):
+    help = 'Regrava InformeMetrica a partir dos informes mensais já importados (backfill).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fundo', dest='fundo_id', help='UUID do fundo (default: todos)')
+
+    def handle(self, *args, **options):
+        informes = InformeMensal.objects.order_by('fundo_id', 'competencia')
+        if options.get('fundo_id'):
+            informes = informes.filter(fundo_id=options['fundo_id'])
+
+        total = 0
+        for informe in informes.iterator(chunk_size=500):
+            sincronizar_metricas(informe)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Métricas de {total} informe(s) sincronizadas."))
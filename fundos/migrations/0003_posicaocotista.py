@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:38
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0002_add_informe_mensal_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PosicaoCotista',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quantidade_cotas', models.DecimalField(decimal_places=6, default=0, max_digits=18)),
+                ('custo_total', models.DecimalField(decimal_places=2, default=0, help_text='Custo de aquisição das cotas em carteira', max_digits=16)),
+                ('data_atualizacao', models.DateTimeField(auto_now=True)),
+                ('cotista', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='posicoes', to='fundos.cotista')),
+                ('fundo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='posicoes', to='fundos.fundo')),
+            ],
+            options={
+                'verbose_name': 'Posição de Cotista',
+                'verbose_name_plural': 'Posições de Cotistas',
+                'db_table': 'posicoes_cotistas',
+                'indexes': [models.Index(fields=['fundo', 'quantidade_cotas'], name='posicoes_co_fundo_i_b8e3e3_idx')],
+                'unique_together': {('fundo', 'cotista')},
+            },
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:40
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def reconstruir_posicoes(apps, schema_editor):
+    # Preenche posições (0003) e lotes FIFO a partir das movimentações já confirmadas
+    MovimentacaoCota = apps.get_model('fundos', 'MovimentacaoCota')
+    PosicaoCotista = apps.get_model('fundos', 'PosicaoCotista')
+    LoteCotista = apps.get_model('fundos', 'LoteCotista')
+
+    posicoes = {}
+    lotes = {}
+    for mov in MovimentacaoCota.objects.filter(status='CONFIRMADO').order_by(
+        'data_cotizacao', 'data_solicitacao',
+    ).values(
+        'id', 'fundo_id', 'cotista_id', 'tipo_movimentacao', 'data_cotizacao',
+        'valor_cota', 'quantidade_cotas', 'valor_financeiro',
+    ).iterator(chunk_size=5000):
+        chave = (mov['fundo_id'], mov['cotista_id'])
+        posicao = posicoes.get(chave)
+        if posicao is None:
+            posicao = posicoes[chave] = PosicaoCotista(
+                fundo_id=mov['fundo_id'], cotista_id=mov['cotista_id'],
+                quantidade_cotas=Decimal('0'), custo_total=Decimal('0'),
+            )
+            lotes[chave] = []
+        tipo = mov['tipo_movimentacao']
+        quantidade = mov['quantidade_cotas'] or Decimal('0')
+        fila = lotes[chave]
+
+        if tipo == 'APLICACAO':
+            posicao.quantidade_cotas += quantidade
+            posicao.custo_total += mov['valor_financeiro'] or Decimal('0')
+            posicao.ultimo_lote += 1
+            fila.append(LoteCotista(
+                fundo_id=mov['fundo_id'], cotista_id=mov['cotista_id'], movimentacao_id=mov['id'],
+                sequencia=posicao.ultimo_lote, data_aplicacao=mov['data_cotizacao'],
+                valor_cota_aquisicao=mov['valor_cota'] or Decimal('0'),
+                quantidade_inicial=quantidade, quantidade_saldo=quantidade,
+            ))
+        elif tipo in ('RESGATE', 'COME_COTAS'):
+            if tipo == 'RESGATE' and posicao.quantidade_cotas > 0:
+                baixa = posicao.custo_total * min(quantidade / posicao.quantidade_cotas, Decimal('1'))
+                posicao.custo_total -= baixa.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            posicao.quantidade_cotas -= quantidade
+
+            restante = quantidade
+            while restante > 0 and posicao.lote_cursor <= len(fila):
+                lote = fila[posicao.lote_cursor - 1]
+                consumido = min(lote.quantidade_saldo, restante)
+                lote.quantidade_saldo -= consumido
+                restante -= consumido
+                if lote.quantidade_saldo > 0:
+                    break
+                posicao.lote_cursor += 1
+
+            if tipo == 'COME_COTAS' and mov['valor_cota']:
+                posicao.custo_total = (posicao.quantidade_cotas * mov['valor_cota']).quantize(
+                    Decimal('0.01'), rounding=ROUND_HALF_UP,
+                )
+                for lote in fila[posicao.lote_cursor - 1:]:
+                    lote.valor_cota_aquisicao = mov['valor_cota']
+
+        if posicao.quantidade_cotas <= 0:
+            posicao.quantidade_cotas = Decimal('0')
+            posicao.custo_total = Decimal('0')
+
+    LoteCotista.objects.all().delete()
+    PosicaoCotista.objects.all().delete()
+    PosicaoCotista.objects.bulk_create(posicoes.values(), batch_size=1000)
+    LoteCotista.objects.bulk_create((lote for fila in lotes.values() for lote in fila), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0003_posicaocotista'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posicaocotista',
+            name='lote_cursor',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='posicaocotista',
+            name='ultimo_lote',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='LoteCotista',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sequencia', models.PositiveIntegerField()),
+                ('data_aplicacao', models.DateField()),
+                ('valor_cota_aquisicao', models.DecimalField(decimal_places=6, max_digits=16)),
+                ('quantidade_inicial', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('quantidade_saldo', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('cotista', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='fundos.cotista')),
+                ('fundo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='fundos.fundo')),
+                ('movimentacao', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='lote', to='fundos.movimentacaocota')),
+            ],
+            options={
+                'verbose_name': 'Lote de Cotista',
+                'verbose_name_plural': 'Lotes de Cotistas',
+                'db_table': 'lotes_cotistas',
+                'ordering': ['fundo', 'cotista', 'sequencia'],
+                'unique_together': {('fundo', 'cotista', 'sequencia')},
+            },
+        ),
+        migrations.RunPython(reconstruir_posicoes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:46
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0004_lotecotista'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoComeCotas',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('semestre', models.CharField(help_text='AAAA-1 (maio) ou AAAA-2 (novembro)', max_length=6)),
+                ('data_referencia', models.DateField()),
+                ('valor_cota', models.DecimalField(decimal_places=6, max_digits=16)),
+                ('aliquota', models.DecimalField(decimal_places=4, max_digits=5)),
+                ('quantidade_cotistas', models.IntegerField(default=0)),
+                ('ir_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('cotas_reduzidas', models.DecimalField(decimal_places=6, default=0, max_digits=18)),
+                ('data_execucao', models.DateTimeField(auto_now_add=True)),
+                ('fundo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='execucoes_come_cotas', to='fundos.fundo')),
+            ],
+            options={
+                'verbose_name': 'Execução de Come-Cotas',
+                'verbose_name_plural': 'Execuções de Come-Cotas',
+                'db_table': 'execucoes_come_cotas',
+                'ordering': ['-data_referencia'],
+                'unique_together': {('fundo', 'semestre')},
+            },
+        ),
+    ]
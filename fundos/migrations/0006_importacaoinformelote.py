@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:03
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0005_execucaocomecotas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoInformeLote',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('arquivo', models.FileField(upload_to='informes/lotes/%Y/%m/')),
+                ('arquivo_nome', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDO', 'Concluído'), ('ERRO', 'Erro')], default='PENDENTE', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('processados', models.IntegerField(default=0)),
+                ('resultados', models.JSONField(blank=True, default=list)),
+                ('mensagem', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importacoes_informes', to=settings.AUTH_USER_MODEL)),
+                ('fundo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importacoes_informes', to='fundos.fundo')),
+            ],
+            options={
+                'verbose_name': 'Importação de Informes em Lote',
+                'verbose_name_plural': 'Importações de Informes em Lote',
+                'db_table': 'fundos_importacao_informe_lote',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0006_importacaoinformelote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='informemensal',
+            name='arquivo_sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 do XML importado; reenvios idênticos são ignorados.', max_length=64),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_empresa(apps, schema_editor):
+    ImportacaoInformeLote = apps.get_model('fundos', 'ImportacaoInformeLote')
+    for importacao in ImportacaoInformeLote.objects.select_related('fundo').filter(empresa__isnull=True):
+        importacao.empresa_id = importacao.fundo.empresa_id
+        importacao.save(update_fields=['empresa'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0007_informemensal_arquivo_sha256'),
+        ('usuarios', '0003_add_informe_permissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaoinformelote',
+            name='empresa',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='importacoes_informes', to='usuarios.empresa'),
+        ),
+        migrations.RunPython(preencher_empresa, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='importacaoinformelote',
+            name='empresa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importacoes_informes', to='usuarios.empresa'),
+        ),
+        migrations.AlterField(
+            model_name='importacaoinformelote',
+            name='fundo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='importacoes_informes', to='fundos.fundo'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_metricas(apps, schema_editor):
+    # Métricas dos informes importados antes de InformeMetrica existir
+    InformeMensal = apps.get_model('fundos', 'InformeMensal')
+    InformeMetrica = apps.get_model('fundos', 'InformeMetrica')
+    campos = [
+        f.name for f in InformeMensal._meta.get_fields()
+        if isinstance(f, (models.DecimalField, models.IntegerField)) and not f.primary_key
+    ]
+
+    objetos = []
+    informes = InformeMensal.objects.order_by('pk').values('id', 'fundo_id', 'competencia', *campos)
+    for informe in informes.iterator(chunk_size=500):
+        objetos.extend(
+            InformeMetrica(
+                informe_id=informe['id'], fundo_id=informe['fundo_id'], competencia=informe['competencia'],
+                metrica=metrica, valor=informe[metrica],
+            )
+            for metrica in campos
+            if informe[metrica] is not None
+        )
+        if len(objetos) >= 5000:
+            InformeMetrica.objects.bulk_create(objetos, batch_size=1000, ignore_conflicts=True)
+            objetos = []
+    InformeMetrica.objects.bulk_create(objetos, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0008_importacaoinformelote_empresa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InformeMetrica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField()),
+                ('metrica', models.CharField(max_length=40)),
+                ('valor', models.DecimalField(decimal_places=8, max_digits=24)),
+                ('fundo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metricas_informes', to='fundos.fundo')),
+                ('informe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metricas', to='fundos.informemensal')),
+            ],
+            options={
+                'verbose_name': 'Métrica do Informe',
+                'verbose_name_plural': 'Métricas dos Informes',
+                'db_table': 'fundos_informe_metrica',
+                'indexes': [models.Index(fields=['fundo', 'metrica', 'competencia'], name='fundos_info_fundo_i_3fd09b_idx')],
+                'unique_together': {('informe', 'metrica')},
+            },
+        ),
+        migrations.RunPython(preencher_metricas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mover_dados_brutos(apps, schema_editor):
+    InformeMensal = apps.get_model('fundos', 'InformeMensal')
+    InformeMensalBruto = apps.get_model('fundos', 'InformeMensalBruto')
+
+    lote = []
+    for informe_id, dados in InformeMensal.objects.exclude(
+        dados_brutos__isnull=True,
+    ).values_list('id', 'dados_brutos').iterator(chunk_size=200):
+        lote.append(InformeMensalBruto(informe_id=informe_id, dados=dados))
+        if len(lote) >= 200:
+            InformeMensalBruto.objects.bulk_create(lote)
+            lote = []
+    InformeMensalBruto.objects.bulk_create(lote)
+
+
+def restaurar_dados_brutos(apps, schema_editor):
+    InformeMensal = apps.get_model('fundos', 'InformeMensal')
+    InformeMensalBruto = apps.get_model('fundos', 'InformeMensalBruto')
+
+    for bruto in InformeMensalBruto.objects.iterator(chunk_size=200):
+        InformeMensal.objects.filter(id=bruto.informe_id).update(dados_brutos=bruto.dados)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0009_informemetrica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InformeMensalBruto',
+            fields=[
+                ('informe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='bruto', serialize=False, to='fundos.informemensal')),
+                ('dados', models.JSONField()),
+            ],
+            options={
+                'verbose_name': 'Dados Brutos do Informe',
+                'verbose_name_plural': 'Dados Brutos dos Informes',
+                'db_table': 'fundos_informe_mensal_bruto',
+            },
+        ),
+        migrations.RunPython(mover_dados_brutos, restaurar_dados_brutos),
+        migrations.RemoveField(
+            model_name='informemensal',
+            name='dados_brutos',
+        ),
+    ]
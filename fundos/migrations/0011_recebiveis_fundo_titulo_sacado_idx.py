@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundos', '0010_informemensalbruto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recebiveis',
+            index=models.Index(fields=['fundo', 'numero_titulo', 'sacado_cpf_cnpj'], name='recebiveis_fundo_i_e5b21c_idx'),
+        ),
+    ]
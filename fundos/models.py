@@ -173,6 +173,118 @@ class MovimentacaoCota(models.Model):
     def __str__(self):
         return f"{self.tipo_movimentacao} - {self.fundo.razao_social} - {self.data_solicitacao.date()}"
 
+# ============================================
+# MODELO: POSIÇÃO DO COTISTA (MATERIALIZADA)
+# ============================================
+
+class PosicaoCotista(models.Model):
+    """
+    Posição consolidada de um cotista em um fundo.
+    Mantida incrementalmente a cada movimentação confirmada
+    (ver fundos/services/posicao.py) e reconstruível a partir do histórico.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fundo = models.ForeignKey(Fundo, on_delete=models.PROTECT, related_name='posicoes')
+    cotista = models.ForeignKey(Cotista, on_delete=models.PROTECT, related_name='posicoes')
+    
+    # Saldo
+    quantidade_cotas = models.DecimalField(max_digits=18, decimal_places=6, default=0)
+    custo_total = models.DecimalField(max_digits=16, decimal_places=2, default=0, help_text='Custo de aquisição das cotas em carteira')
+    
+    # Lotes FIFO (ver LoteCotista): próximo lote em aberto e último lote emitido
+    lote_cursor = models.PositiveIntegerField(default=1)
+    ultimo_lote = models.PositiveIntegerField(default=0)
+    
+    data_atualizacao = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'posicoes_cotistas'
+        verbose_name = 'Posição de Cotista'
+        verbose_name_plural = 'Posições de Cotistas'
+        unique_together = [['fundo', 'cotista']]
+        indexes = [
+            models.Index(fields=['fundo', 'quantidade_cotas']),
+        ]
+    
+    def __str__(self):
+        return f"{self.cotista.nome_razao_social} - {self.fundo.razao_social} - {self.quantidade_cotas} cotas"
+    
+    @property
+    def custo_medio(self):
+        """Custo médio por cota."""
+        if not self.quantidade_cotas:
+            return Decimal('0')
+        return self.custo_total / self.quantidade_cotas
+
+# ============================================
+# MODELO: LOTES DE APLICAÇÃO (FIFO FISCAL)
+# ============================================
+
+class LoteCotista(models.Model):
+    """
+    Lote fiscal gerado por uma aplicação confirmada.
+    Resgates consomem os lotes em ordem FIFO a partir de PosicaoCotista.lote_cursor,
+    usando a data e o custo reais de cada lote no cálculo de IR/IOF.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fundo = models.ForeignKey(Fundo, on_delete=models.PROTECT, related_name='lotes')
+    cotista = models.ForeignKey(Cotista, on_delete=models.PROTECT, related_name='lotes')
+    movimentacao = models.OneToOneField(MovimentacaoCota, on_delete=models.PROTECT, related_name='lote')
+    
+    # Ordem FIFO dentro de (fundo, cotista)
+    sequencia = models.PositiveIntegerField()
+    
+    # Aquisição
+    data_aplicacao = models.DateField()
+    valor_cota_aquisicao = models.DecimalField(max_digits=16, decimal_places=6)
+    quantidade_inicial = models.DecimalField(max_digits=18, decimal_places=6)
+    quantidade_saldo = models.DecimalField(max_digits=18, decimal_places=6)
+    
+    class Meta:
+        db_table = 'lotes_cotistas'
+        verbose_name = 'Lote de Cotista'
+        verbose_name_plural = 'Lotes de Cotistas'
+        ordering = ['fundo', 'cotista', 'sequencia']
+        unique_together = [['fundo', 'cotista', 'sequencia']]
+    
+    def __str__(self):
+        return f"Lote {self.sequencia} - {self.data_aplicacao} - {self.quantidade_saldo}/{self.quantidade_inicial}"
+
+# ============================================
+# MODELO: EXECUÇÃO DE COME-COTAS
+# ============================================
+
+class ExecucaoComeCotas(models.Model):
+    """
+    Registro de um come-cotas concluído para (fundo, semestre).
+    Gravado na mesma transação das movimentações COME_COTAS: sua existência
+    garante que a execução não se repete (ver fundos/services/come_cotas.py).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fundo = models.ForeignKey(Fundo, on_delete=models.PROTECT, related_name='execucoes_come_cotas')
+    semestre = models.CharField(max_length=6, help_text='AAAA-1 (maio) ou AAAA-2 (novembro)')
+    data_referencia = models.DateField()
+    
+    valor_cota = models.DecimalField(max_digits=16, decimal_places=6)
+    aliquota = models.DecimalField(max_digits=5, decimal_places=4)
+    
+    # Totais
+    quantidade_cotistas = models.IntegerField(default=0)
+    ir_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    cotas_reduzidas = models.DecimalField(max_digits=18, decimal_places=6, default=0)
+    
+    data_execucao = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'execucoes_come_cotas'
+        verbose_name = 'Execução de Come-Cotas'
+        verbose_name_plural = 'Execuções de Come-Cotas'
+        ordering = ['-data_referencia']
+        unique_together = [['fundo', 'semestre']]
+    
+    def __str__(self):
+        return f"Come-cotas {self.semestre} - {self.fundo.razao_social}"
+
 # ============================================
 # MODELO: HISTÓRICO DE COTAS
 # ============================================
@@ -311,6 +423,7 @@ class Recebiveis(models.Model):
         ordering = ['data_vencimento']
         indexes = [
             models.Index(fields=['fundo', 'status']),
+            models.Index(fields=['fundo', 'numero_titulo', 'sacado_cpf_cnpj']),
             models.Index(fields=['cedente_cnpj']),
             models.Index(fields=['sacado_cpf_cnpj']),
             models.Index(fields=['data_vencimento']),
@@ -350,6 +463,10 @@ class InformeMensal(models.Model):
     versao_xml = models.CharField(max_length=10, blank=True)
     cnpj_administrador = models.CharField(max_length=14, blank=True)
     arquivo_xml_nome = models.CharField(max_length=255, blank=True)
+    arquivo_sha256 = models.CharField(
+        max_length=64, blank=True,
+        help_text='SHA-256 do XML importado; reenvios idênticos são ignorados.'
+    )
 
     # Ativos
     vl_disponib = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)
@@ -425,8 +542,7 @@ class InformeMensal(models.Model):
     vl_rating_c = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)
     vl_rating_d_h = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)
 
-    # Auditoria
-    dados_brutos = models.JSONField(null=True, blank=True)
+    # Auditoria (o parse completo fica em InformeMensalBruto)
     criado_por = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -454,6 +570,30 @@ class InformeMensal(models.Model):
         return self.competencia.strftime('%m/%Y')
 
 
+# ============================================
+# MODELO: DADOS BRUTOS DO INFORME MENSAL
+# ============================================
+
+class InformeMensalBruto(models.Model):
+    """
+    Parse completo do XML (dict de parse_informe_mensal) guardado para
+    auditoria. Fica fora de InformeMensal para que listagens e o admin não
+    carreguem o JSON; é lido apenas sob demanda (download dos dados brutos).
+    """
+    informe = models.OneToOneField(
+        InformeMensal, on_delete=models.CASCADE, primary_key=True, related_name='bruto'
+    )
+    dados = models.JSONField()
+
+    class Meta:
+        db_table = 'fundos_informe_mensal_bruto'
+        verbose_name = 'Dados Brutos do Informe'
+        verbose_name_plural = 'Dados Brutos dos Informes'
+
+    def __str__(self):
+        return f"Dados brutos — {self.informe_id}"
+
+
 # ============================================
 # MODELO: CEDENTES DO INFORME MENSAL
 # ============================================
@@ -499,4 +639,96 @@ class InformeMensalCarteira(models.Model):
         label = f"{self.segmento}"
         if self.subsegmento:
             label += f" / {self.subsegmento}"
-        return f"{label}: R$ {self.valor:,.2f}"
\ No newline at end of file
+        return f"{label}: R$ {self.valor:,.2f}"
+
+# ============================================
+# MODELO: IMPORTAÇÃO EM LOTE DE INFORMES
+# ============================================
+
+class StatusImportacao(models.TextChoices):
+    PENDENTE = 'PENDENTE', 'Pendente'
+    PROCESSANDO = 'PROCESSANDO', 'Processando'
+    CONCLUIDO = 'CONCLUIDO', 'Concluído'
+    ERRO = 'ERRO', 'Erro'
+
+
+class ImportacaoInformeLote(models.Model):
+    """
+    Job de importação de um ZIP de informes mensais. O upload só grava o
+    arquivo e este registro; a task importar_lote_zip_task processa o ZIP e
+    atualiza processados/resultados a cada lote confirmado no banco, que a
+    página de importação consulta via endpoint JSON.
+
+    Sem `fundo`, o ZIP é da empresa inteira e cada XML é roteado ao fundo
+    pelo CNPJ (importar_lote_zip_empresa).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='importacoes_informes')
+    fundo = models.ForeignKey(
+        Fundo, on_delete=models.CASCADE, related_name='importacoes_informes',
+        null=True, blank=True,
+    )
+    arquivo = models.FileField(upload_to='informes/lotes/%Y/%m/')
+    arquivo_nome = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(
+        max_length=20,
+        choices=StatusImportacao.choices,
+        default=StatusImportacao.PENDENTE,
+    )
+    total = models.IntegerField(default=0)
+    processados = models.IntegerField(default=0)
+    resultados = models.JSONField(default=list, blank=True)
+    mensagem = models.TextField(blank=True)
+
+    criado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='importacoes_informes'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fundos_importacao_informe_lote'
+        verbose_name = 'Importação de Informes em Lote'
+        verbose_name_plural = 'Importações de Informes em Lote'
+        ordering = ['-criado_em']
+
+    def __str__(self):
+        return f"{self.arquivo_nome or self.arquivo.name} — {self.get_status_display()}"
+
+    @property
+    def finalizada(self):
+        return self.status in (StatusImportacao.CONCLUIDO, StatusImportacao.ERRO)
+
+
+# ============================================
+# MODELO: SÉRIES DE MÉTRICAS DO INFORME MENSAL
+# ============================================
+
+class InformeMetrica(models.Model):
+    """
+    Formato estreito (fundo, competência, métrica, valor) dos campos numéricos
+    de InformeMensal, mantido por importar_informe_mensal. Gráficos e
+    relatórios entre competências leem daqui (services/metricas_informe.py)
+    em vez de carregar informes inteiros.
+    """
+    informe = models.ForeignKey(InformeMensal, on_delete=models.CASCADE, related_name='metricas')
+    fundo = models.ForeignKey(Fundo, on_delete=models.CASCADE, related_name='metricas_informes')
+    competencia = models.DateField()
+    metrica = models.CharField(max_length=40)
+    valor = models.DecimalField(max_digits=24, decimal_places=8)
+
+    class Meta:
+        db_table = 'fundos_informe_metrica'
+        verbose_name = 'Métrica do Informe'
+        verbose_name_plural = 'Métricas dos Informes'
+        unique_together = [['informe', 'metrica']]
+        indexes = [
+            models.Index(fields=['fundo', 'metrica', 'competencia']),
+        ]
+
+    def __str__(self):
+        return f"{self.fundo_id} {self.competencia:%m/%Y} {self.metrica}: {self.valor}"
@@ -0,0 +1,112 @@
+"""
+Arquivo dos XMLs Originais dos Informes
+
+Os bytes exatos de cada XML importado são guardados comprimidos (gzip) em
+disco, endereçados pelo SHA-256 do conteúdo — o mesmo valor gravado em
+InformeMensal.arquivo_sha256. Arquivos idênticos ocupam um único blob.
+
+Layout: INFORME_XML_ARQUIVO_DIR/ab/cd/abcd…ef.xml.gz
+
+Excluir um informe não remove o blob (outro informe pode referenciá-lo);
+blobs sem referência são removidos pelo comando limpar_xmls_orfaos.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+_NIVEL_GZIP = 6
+
+
+def _raiz() -> Path:
+    return Path(settings.INFORME_XML_ARQUIVO_DIR)
+
+
+def _caminho(sha256: str) -> Path:
+    if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+        raise ValueError(f"SHA-256 inválido: {sha256!r}")
+    return _raiz() / sha256[:2] / sha256[2:4] / f'{sha256}.xml.gz'
+
+
+def guardar_xml(conteudo: bytes) -> str:
+    """
+    Grava o XML no arquivo (se ainda não existir) e retorna seu SHA-256.
+    A escrita é atômica: o blob só aparece no caminho final completo.
+    """
+    sha256 = hashlib.sha256(conteudo).hexdigest()
+    caminho = _caminho(sha256)
+    try:
+        # Blob já existente: renova o mtime para que a varredura de órfãos
+        # (idade_minima) também poupe um blob que acaba de ser referenciado
+        os.utime(caminho)
+        return sha256
+    except FileNotFoundError:
+        pass
+
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=caminho.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mtime=0: o mesmo conteúdo gera sempre os mesmos bytes comprimidos
+            with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=_NIVEL_GZIP, mtime=0) as gz:
+                gz.write(conteudo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    return sha256
+
+
+def existe_xml(sha256: str) -> bool:
+    return bool(sha256) and _caminho(sha256).exists()
+
+
+def abrir_xml(sha256: str):
+    """
+    Abre o XML original para leitura em streaming (descomprimido).
+
+    Lança FileNotFoundError se o blob não existe.
+    """
+    return gzip.open(_caminho(sha256), 'rb')
+
+
+def ler_xml(sha256: str) -> bytes:
+    with abrir_xml(sha256) as f:
+        return f.read()
+
+
+def remover_orfaos(referenciados: set, idade_minima: int = 3600, simular: bool = False) -> list[str]:
+    """
+    Remove os blobs cujo SHA-256 não está em `referenciados`, e temporários
+    de escritas interrompidas.
+
+    Arquivos com menos de `idade_minima` segundos são mantidos: um XML é
+    gravado (ou tem o mtime renovado) antes do commit do seu informe, e
+    `referenciados` pode ter sido lido antes desse commit.
+
+    Returns:
+        Caminhos removidos (ou que seriam removidos, com simular=True)
+    """
+    limite = time.time() - idade_minima
+    removidos = []
+    for caminho in _raiz().glob('*/*/*'):
+        if caminho.name.endswith('.xml.gz'):
+            if caminho.name[:-len('.xml.gz')] in referenciados:
+                continue
+        elif not caminho.name.endswith('.tmp'):
+            continue
+        try:
+            if caminho.stat().st_mtime > limite:
+                continue
+            if not simular:
+                caminho.unlink()
+        except FileNotFoundError:
+            continue
+        removidos.append(str(caminho))
+    return removidos
@@ -0,0 +1,117 @@
+"""
+Calendário de Dias Úteis (feriados nacionais ANBIMA)
+
+O arquivo de feriados (settings.FERIADOS_ARQUIVO, formato "AAAA-MM-DD;descrição")
+é carregado uma única vez por processo e convertido em:
+  - um bitmap de dias úteis indexado pelo ordinal da data      → eh_dia_util O(1)
+  - a contagem acumulada de dias úteis                          → dias_uteis_entre O(1)
+  - a lista ordenada de ordinais de dias úteis                  → somar_dias_uteis O(log n)
+
+Datas fora do intervalo coberto pelo arquivo lançam ValueError.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class _Calendario:
+
+    def __init__(self, feriados: set[date], inicio: date, fim: date):
+        self.inicio = inicio.toordinal()
+        self.fim = fim.toordinal()
+
+        tamanho = self.fim - self.inicio + 1
+        self.util = bytearray(tamanho)
+        self.acumulado = [0] * (tamanho + 1)  # acumulado[i] = dias úteis em [inicio, inicio + i)
+        self.dias_uteis = []
+
+        for i in range(tamanho):
+            dia = date.fromordinal(self.inicio + i)
+            if dia.weekday() < 5 and dia not in feriados:
+                self.util[i] = 1
+                self.dias_uteis.append(self.inicio + i)
+            self.acumulado[i + 1] = self.acumulado[i] + self.util[i]
+
+    def indice(self, dia: date) -> int:
+        ordinal = dia.toordinal()
+        if not self.inicio <= ordinal <= self.fim:
+            raise ValueError(
+                f"Data {dia.isoformat()} fora do calendário de feriados "
+                f"({date.fromordinal(self.inicio)} a {date.fromordinal(self.fim)})"
+            )
+        return ordinal - self.inicio
+
+
+@lru_cache(maxsize=1)
+def _calendario() -> _Calendario:
+    feriados = set()
+    with open(settings.FERIADOS_ARQUIVO, encoding='utf-8') as f:
+        for linha in f:
+            campo = linha.split(';', 1)[0].strip()
+            if not campo or not campo[0].isdigit():
+                continue  # cabeçalho / linhas vazias
+            feriados.add(date.fromisoformat(campo))
+
+    anos = sorted(d.year for d in feriados)
+    return _Calendario(feriados, date(anos[0], 1, 1), date(anos[-1], 12, 31))
+
+
+def eh_dia_util(dia: date) -> bool:
+    cal = _calendario()
+    return bool(cal.util[cal.indice(dia)])
+
+
+def proximo_dia_util(dia: date) -> date:
+    """Primeiro dia útil em ou após `dia`."""
+    cal = _calendario()
+    cal.indice(dia)
+    pos = bisect_left(cal.dias_uteis, dia.toordinal())
+    if pos >= len(cal.dias_uteis):
+        raise ValueError(f"Sem dia útil no calendário após {dia.isoformat()}")
+    return date.fromordinal(cal.dias_uteis[pos])
+
+
+def dia_util_anterior(dia: date) -> date:
+    """Último dia útil estritamente antes de `dia`."""
+    cal = _calendario()
+    cal.indice(dia)
+    pos = bisect_left(cal.dias_uteis, dia.toordinal()) - 1
+    if pos < 0:
+        raise ValueError(f"Sem dia útil no calendário antes de {dia.isoformat()}")
+    return date.fromordinal(cal.dias_uteis[pos])
+
+
+def somar_dias_uteis(dia: date, n: int) -> date:
+    """
+    Avança (ou recua, se n < 0) `n` dias úteis a partir de `dia`.
+    Se `dia` não for útil, conta a partir do dia útil seguinte (n >= 0) ou
+    anterior (n < 0) — D+0 equivale a proximo_dia_util.
+    """
+    cal = _calendario()
+    cal.indice(dia)
+    if n >= 0:
+        pos = bisect_left(cal.dias_uteis, dia.toordinal()) + n
+    else:
+        pos = bisect_right(cal.dias_uteis, dia.toordinal()) - 1 + n
+    if not 0 <= pos < len(cal.dias_uteis):
+        raise ValueError(f"Resultado fora do calendário: {dia.isoformat()} {n:+d} dias úteis")
+    return date.fromordinal(cal.dias_uteis[pos])
+
+
+def dias_uteis_entre(inicio: date, fim: date) -> int:
+    """Dias úteis no intervalo [inicio, fim) — convenção ANBIMA de contagem DU."""
+    cal = _calendario()
+    return cal.acumulado[cal.indice(fim)] - cal.acumulado[cal.indice(inicio)]
+
+
+def dias_uteis_periodo(inicio: date, fim: date) -> list[date]:
+    """Dias úteis de [inicio, fim] (inclusive), em ordem."""
+    cal = _calendario()
+    cal.indice(inicio)
+    cal.indice(fim)
+    a = bisect_left(cal.dias_uteis, inicio.toordinal())
+    b = bisect_right(cal.dias_uteis, fim.toordinal())
+    return [date.fromordinal(o) for o in cal.dias_uteis[a:b]]
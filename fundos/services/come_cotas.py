@@ -0,0 +1,222 @@
+"""
+Come-Cotas Semestral por Cotista
+
+Calcula o IR antecipado de maio/novembro sobre o rendimento efetivo de cada
+posição (valor atual menos PosicaoCotista.custo_total) e emite as
+movimentações COME_COTAS do fundo com um único bulk_create. Depois do
+come-cotas o custo da posição e dos lotes restantes passa a ser a cota do
+come-cotas, para que o rendimento já tributado não volte a ser tributado.
+
+Cada fundo é processado numa transação que também grava ExecucaoComeCotas:
+uma execução interrompida não deixa rastro e pode ser refeita, e uma execução
+concluída nunca se repete para o mesmo (fundo, semestre).
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+import logging
+
+from django.db import connection, transaction
+
+from fundos.models import (
+    CotaHistorico, ExecucaoComeCotas, Fundo, LoteCotista, MovimentacaoCota,
+    PosicaoCotista, StatusMovimentacao,
+)
+from .posicao import _aplicar
+from .tributos_lote import (
+    calcular_come_cotas_lote, de_centavos, de_milionesimos, para_centavos, para_milionesimos,
+)
+
+logger = logging.getLogger(__name__)
+
+
+ALIQUOTA_COME_COTAS_PADRAO = Decimal('0.15')  # fundos de longo prazo
+
+
+def semestre_come_cotas(data_referencia: date) -> str:
+    """'AAAA-1' para o come-cotas de maio, 'AAAA-2' para o de novembro."""
+    return f"{data_referencia.year}-{1 if data_referencia.month <= 6 else 2}"
+
+
+def _aliquota_fundo(fundo: Fundo) -> Decimal:
+    aliquota = (fundo.dados_adicionais or {}).get('aliquota_come_cotas')
+    return Decimal(str(aliquota)) if aliquota is not None else ALIQUOTA_COME_COTAS_PADRAO
+
+
+def _regravar(modelo, objetos, campos):
+    """
+    Regrava linhas já existentes via upsert pela PK — em fundos com 100k+
+    cotistas é ordens de grandeza mais rápido que bulk_update (CASE WHEN por linha).
+    """
+    modelo.objects.bulk_create(
+        objetos,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['id'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=campos,
+    )
+
+
+def _baixar_lotes_fifo(fundo_id, posicoes: dict, cotas_por_cotista: dict, valor_cota: Decimal):
+    """
+    Consome os lotes FIFO de todos os cotistas do fundo com uma única leitura
+    e um bulk_update, atualizando lote_cursor das posições em memória. O custo
+    dos lotes que sobram passa a ser a cota do come-cotas.
+    """
+    lotes = defaultdict(list)
+    for lote in LoteCotista.objects.select_for_update().filter(
+        fundo_id=fundo_id,
+        quantidade_saldo__gt=0,
+    ).order_by('cotista_id', 'sequencia'):
+        lotes[lote.cotista_id].append(lote)
+
+    alterados = []
+    for cotista_id, restante in cotas_por_cotista.items():
+        posicao = posicoes[cotista_id]
+        for lote in lotes.get(cotista_id, ()):
+            if restante <= 0:
+                break
+            consumido = min(lote.quantidade_saldo, restante)
+            lote.quantidade_saldo -= consumido
+            restante -= consumido
+            if lote.quantidade_saldo == 0:
+                posicao.lote_cursor = lote.sequencia + 1
+        for lote in lotes.get(cotista_id, ()):
+            if lote.quantidade_saldo > 0:
+                lote.valor_cota_aquisicao = valor_cota
+            alterados.append(lote)
+
+    _regravar(LoteCotista, alterados, ['quantidade_saldo', 'valor_cota_aquisicao'])
+
+
+@transaction.atomic
+def executar_come_cotas_fundo(fundo_id: str, data_referencia: date, aliquota: Decimal = None) -> dict:
+    """
+    Executa o come-cotas de um fundo para o semestre de `data_referencia`.
+
+    Args:
+        fundo_id: UUID do fundo
+        data_referencia: Data do come-cotas (último dia útil de maio/novembro)
+        aliquota: Alíquota (default: dados_adicionais['aliquota_come_cotas'] ou 15%)
+
+    Returns:
+        dict com semestre, status ('executado' ou 'ja_executado') e totais
+    """
+    try:
+        fundo = Fundo.objects.select_for_update().get(id=fundo_id)
+    except Fundo.DoesNotExist:
+        raise ValueError(f"Fundo {fundo_id} não encontrado")
+
+    semestre = semestre_come_cotas(data_referencia)
+
+    execucao = ExecucaoComeCotas.objects.filter(fundo=fundo, semestre=semestre).first()
+    if execucao:
+        return {
+            'fundo_id': str(fundo.id),
+            'semestre': semestre,
+            'status': 'ja_executado',
+            'cotistas': execucao.quantidade_cotistas,
+            'ir_total': execucao.ir_total,
+        }
+
+    cota = CotaHistorico.objects.filter(
+        fundo=fundo,
+        data_referencia__lte=data_referencia,
+    ).order_by('-data_referencia').first()
+    if not cota:
+        raise ValueError(f"Cota não encontrada para {fundo.razao_social} até {data_referencia}")
+
+    aliquota = aliquota if aliquota is not None else _aliquota_fundo(fundo)
+
+    posicoes = {
+        p.cotista_id: p
+        for p in PosicaoCotista.objects.select_for_update().filter(
+            fundo=fundo,
+            quantidade_cotas__gt=0,
+        )
+    }
+    lista = list(posicoes.values())
+
+    ir, cotas = calcular_come_cotas_lote(
+        para_centavos([p.quantidade_cotas * cota.valor_cota for p in lista]),
+        para_centavos([p.custo_total for p in lista]),
+        para_milionesimos([cota.valor_cota]),
+        aliquota,
+    )
+
+    movimentacoes = []
+    cotas_por_cotista = {}
+    for posicao, ir_devido, cotas_reduzir in zip(lista, de_centavos(ir), de_milionesimos(cotas)):
+        if ir_devido <= 0:
+            continue
+        cotas_reduzir = min(cotas_reduzir, posicao.quantidade_cotas)
+
+        movimentacoes.append(MovimentacaoCota(
+            tipo_movimentacao='COME_COTAS',
+            fundo=fundo,
+            cotista_id=posicao.cotista_id,
+            data_cotizacao=data_referencia,
+            data_liquidacao=data_referencia,
+            valor_financeiro=ir_devido,
+            valor_cota=cota.valor_cota,
+            quantidade_cotas=cotas_reduzir,
+            ir_retido=ir_devido,
+            valor_liquido=Decimal('0.00'),
+            status=StatusMovimentacao.CONFIRMADO,
+            dados_adicionais={'semestre': semestre},
+        ))
+        cotas_por_cotista[posicao.cotista_id] = cotas_reduzir
+        _aplicar(posicao, 'COME_COTAS', cotas_reduzir, ir_devido, cota.valor_cota)
+
+    MovimentacaoCota.objects.bulk_create(movimentacoes, batch_size=1000)
+    _baixar_lotes_fifo(fundo.id, posicoes, cotas_por_cotista, cota.valor_cota)
+    _regravar(
+        PosicaoCotista,
+        [posicoes[c] for c in cotas_por_cotista],
+        ['quantidade_cotas', 'custo_total', 'lote_cursor'],
+    )
+
+    ir_total = sum((m.ir_retido for m in movimentacoes), Decimal('0.00'))
+    ExecucaoComeCotas.objects.create(
+        fundo=fundo,
+        semestre=semestre,
+        data_referencia=data_referencia,
+        valor_cota=cota.valor_cota,
+        aliquota=aliquota,
+        quantidade_cotistas=len(movimentacoes),
+        ir_total=ir_total,
+        cotas_reduzidas=sum(cotas_por_cotista.values(), Decimal('0')),
+    )
+
+    return {
+        'fundo_id': str(fundo.id),
+        'semestre': semestre,
+        'status': 'executado',
+        'cotistas': len(movimentacoes),
+        'ir_total': ir_total,
+    }
+
+
+def executar_come_cotas(data_referencia: date, fundo_ids: list = None) -> dict:
+    """
+    Executa o come-cotas de vários fundos (default: todos os ativos).
+    Fundos já executados no semestre são pulados; uma falha em um fundo
+    não afeta os demais e basta reexecutar para retomar.
+
+    Returns:
+        dict com 'resultados' (um por fundo) e 'erros' [{'fundo_id', 'mensagem'}]
+    """
+    if fundo_ids is None:
+        fundo_ids = Fundo.objects.filter(ativo=True).values_list('id', flat=True)
+
+    resultados = []
+    erros = []
+    for fundo_id in fundo_ids:
+        try:
+            resultados.append(executar_come_cotas_fundo(str(fundo_id), data_referencia))
+        except Exception as e:
+            logger.error(f"[COME-COTAS] Fundo {fundo_id}: {e}")
+            erros.append({'fundo_id': str(fundo_id), 'mensagem': str(e)})
+
+    return {'resultados': resultados, 'erros': erros}
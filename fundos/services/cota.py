@@ -8,8 +8,9 @@ from datetime import date
 from django.db import transaction
 from django.db.models import Sum, Q
 
-from fundos.models import Fundo, CotaHistorico, Ativo, Recebiveis
-from .tributos import calcular_pdd
+from fundos.models import Fundo, CotaHistorico, Ativo
+from .pdd import atualizar_pdd_fundo
+from .calendario import dias_uteis_periodo
 
 
 def calcular_cota_fechamento(fundo_id: str, data_referencia: date) -> dict:
@@ -36,53 +37,11 @@ def calcular_cota_fechamento(fundo_id: str, data_referencia: date) -> dict:
     except Fundo.DoesNotExist:
         raise ValueError(f"Fundo {fundo_id} não encontrado")
     
-    # 1. Valor da carteira (marcação a mercado)
-    ativos = Ativo.objects.filter(
-        fundo_id=fundo_id,
-        ativo=True
-    )
-    
-    valor_carteira = sum(
-        (ativo.valor_mercado or Decimal('0.00')) for ativo in ativos
-    )
-    
-    # 2. Se FIDC, calcula PDD e desconta
-    if fundo.tipo_fundo == 'FIDC':
-        recebiveis = Recebiveis.objects.filter(
-            fundo_id=fundo_id
-        ).exclude(status='BAIXADO')
-        
-        total_pdd = Decimal('0.00')
-        for rec in recebiveis:
-            pdd = calcular_pdd(rec.dias_atraso, rec.valor_nominal)
-            rec.pdd_valor = pdd
-            rec.pdd_percentual = (pdd / rec.valor_nominal * 100) if rec.valor_nominal > 0 else 0
-            total_pdd += pdd
-        
-        # Bulk update
-        Recebiveis.objects.bulk_update(recebiveis, ['pdd_valor', 'pdd_percentual'])
-        
-        valor_carteira -= total_pdd
-    
-    # 3. Disponibilidades (simplificado - em produção integrar com extrato bancário)
-    disponibilidades = Decimal('0.00')
-    
-    # 4. Passivo exigível - Provisionamento de taxas
-    dias_mes = 30
-    dias_decorridos = data_referencia.day
-    
-    taxa_admin_mes = (fundo.taxa_administracao or Decimal('0.00')) / 12
-    taxa_gestao_mes = (fundo.taxa_gestao or Decimal('0.00')) / 12
-    
-    pl_aproximado = valor_carteira + disponibilidades
-    
-    taxa_admin_provisionada = pl_aproximado * taxa_admin_mes * (Decimal(dias_decorridos) / Decimal(dias_mes))
-    taxa_gestao_provisionada = pl_aproximado * taxa_gestao_mes * (Decimal(dias_decorridos) / Decimal(dias_mes))
-    
-    passivo_exigivel = taxa_admin_provisionada + taxa_gestao_provisionada
+    # 1-2. Valor da carteira (marcação a mercado, líquida de PDD se FIDC)
+    valor_carteira = _calcular_valor_carteira(fundo)
     
-    # 5. Patrimônio Líquido
-    patrimonio_liquido = valor_carteira + disponibilidades - passivo_exigivel
+    # 3-5. Patrimônio Líquido
+    patrimonio_liquido = _calcular_patrimonio_liquido(fundo, valor_carteira, data_referencia)
     
     # 6. Quantidade de cotas
     ultima_cota = CotaHistorico.objects.filter(
@@ -132,19 +91,58 @@ def calcular_cota_fechamento(fundo_id: str, data_referencia: date) -> dict:
     }
 
 
-def _contar_cotistas(fundo_id: str) -> int:
+def _calcular_valor_carteira(fundo) -> Decimal:
     """
-    Conta cotistas ativos do fundo.
-    Em produção, implementar tabela PosicaoCotista.
+    Valor da carteira a mercado. Se FIDC, desconta a PDD (atualizada no banco).
     """
-    from fundos.models import MovimentacaoCota
+    # 1. Valor da carteira (marcação a mercado)
+    valor_carteira = Ativo.objects.filter(
+        fundo_id=fundo.id,
+        ativo=True
+    ).aggregate(total=Sum('valor_mercado'))['total'] or Decimal('0.00')
     
-    cotistas_ativos = MovimentacaoCota.objects.filter(
-        fundo_id=fundo_id,
-        status='CONFIRMADO'
-    ).values('cotista').distinct().count()
+    # 2. Se FIDC, calcula PDD e desconta
+    if fundo.tipo_fundo == 'FIDC':
+        # PDD calculada no banco (CASE por faixa) — ver services/pdd.py
+        total_pdd = atualizar_pdd_fundo(str(fundo.id))
+        
+        valor_carteira -= total_pdd
+    
+    return valor_carteira
+
+
+def _calcular_patrimonio_liquido(fundo, valor_carteira: Decimal, data_referencia: date) -> Decimal:
+    """
+    PL = Carteira + Disponibilidades - Passivo exigível (taxas provisionadas no mês).
+    """
+    # 3. Disponibilidades (simplificado - em produção integrar com extrato bancário)
+    disponibilidades = Decimal('0.00')
+    
+    # 4. Passivo exigível - Provisionamento de taxas
+    dias_mes = 30
+    dias_decorridos = data_referencia.day
+    
+    taxa_admin_mes = (fundo.taxa_administracao or Decimal('0.00')) / 12
+    taxa_gestao_mes = (fundo.taxa_gestao or Decimal('0.00')) / 12
+    
+    pl_aproximado = valor_carteira + disponibilidades
+    
+    taxa_admin_provisionada = pl_aproximado * taxa_admin_mes * (Decimal(dias_decorridos) / Decimal(dias_mes))
+    taxa_gestao_provisionada = pl_aproximado * taxa_gestao_mes * (Decimal(dias_decorridos) / Decimal(dias_mes))
+    
+    passivo_exigivel = taxa_admin_provisionada + taxa_gestao_provisionada
+    
+    # 5. Patrimônio Líquido
+    return valor_carteira + disponibilidades - passivo_exigivel
+
+
+def _contar_cotistas(fundo_id: str) -> int:
+    """
+    Conta cotistas ativos do fundo (saldo > 0 na PosicaoCotista).
+    """
+    from .posicao import contar_cotistas
     
-    return cotistas_ativos
+    return contar_cotistas(fundo_id)
 
 
 def _calcular_rentabilidade_dia(fundo_id: str, valor_cota_atual: Decimal, ultima_cota) -> Decimal:
@@ -195,4 +193,139 @@ def recalcular_rentabilidade_mes(fundo_id: str, mes: int, ano: int):
     rentabilidade_mes = (ultima_cota.valor_cota / primeira_cota.valor_cota) - Decimal('1.00')
     
     # Atualiza todas as cotas do mês
-    cotas_mes.update(rentabilidade_mes=rentabilidade_mes)
\ No newline at end of file
+    cotas_mes.update(rentabilidade_mes=rentabilidade_mes)
+
+
+def recalcular_cotas_periodo(fundo_id: str, data_inicio: date, data_fim: date) -> dict:
+    """
+    Recalcula (backfill) as cotas de um intervalo de datas em uma única passada.
+    
+    Diferente de chamar calcular_cota_fechamento() dia a dia:
+    - Carteira, PDD e cotistas são carregados uma única vez
+    - Quantidade de cotas e cota anterior são carregadas em memória
+    - Rentabilidade do dia, mês e ano é preenchida na mesma passada
+    - Todos os CotaHistorico são gravados com um único bulk upsert
+    
+    Cotas já existentes no mesmo mês/ano fora do intervalo entram no upsert
+    apenas para manter rentabilidade_mes/ano (e a rentabilidade_dia do dia
+    seguinte ao intervalo) consistentes.
+    
+    Args:
+        fundo_id: UUID do fundo
+        data_inicio: Primeira data a recalcular
+        data_fim: Última data a recalcular (inclusive)
+        
+    Returns:
+        dict com quantidade de dias recalculados e registros gravados
+    """
+    from django.db import connection
+    
+    if data_fim < data_inicio:
+        raise ValueError("data_fim deve ser maior ou igual a data_inicio")
+    
+    try:
+        fundo = Fundo.objects.get(id=fundo_id)
+    except Fundo.DoesNotExist:
+        raise ValueError(f"Fundo {fundo_id} não encontrado")
+    
+    # 1. Entradas carregadas uma única vez
+    valor_carteira = _calcular_valor_carteira(fundo)
+    quantidade_cotistas = _contar_cotistas(fundo_id)
+    
+    # 2. Cotas existentes na janela (ano inicial → ano final) + última anterior
+    janela_inicio = date(data_inicio.year, 1, 1)
+    janela_fim = date(data_fim.year, 12, 31)
+    
+    existentes = {
+        c.data_referencia: c
+        for c in CotaHistorico.objects.filter(
+            fundo_id=fundo_id,
+            data_referencia__range=(janela_inicio, janela_fim)
+        )
+    }
+    
+    anterior = CotaHistorico.objects.filter(
+        fundo_id=fundo_id,
+        data_referencia__lt=data_inicio
+    ).order_by('-data_referencia').first()
+    
+    if anterior:
+        quantidade_cotas = anterior.quantidade_cotas
+    else:
+        quantidade_cotas = Decimal('1000000.000000')  # Cotas iniciais padrão
+    
+    # 3. Caminha os dias úteis em ordem recalculando PL e cota
+    dias = 0
+    for dia in dias_uteis_periodo(data_inicio, data_fim):
+        patrimonio_liquido = _calcular_patrimonio_liquido(fundo, valor_carteira, dia)
+        
+        if quantidade_cotas > 0:
+            valor_cota = patrimonio_liquido / quantidade_cotas
+        else:
+            valor_cota = Decimal('1.000000')
+        valor_cota = valor_cota.quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
+        
+        cota = existentes.get(dia) or CotaHistorico(fundo_id=fundo.id, data_referencia=dia)
+        cota.valor_cota = valor_cota
+        cota.patrimonio_liquido = patrimonio_liquido.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        cota.quantidade_cotas = quantidade_cotas
+        cota.quantidade_cotistas = quantidade_cotistas
+        existentes[dia] = cota
+        
+        dias += 1
+    
+    # 4. Rentabilidades dia / mês / ano sobre a janela ordenada
+    cotas = [existentes[d] for d in sorted(existentes)]
+    
+    for cota in cotas:
+        if cota.data_referencia >= data_inicio:
+            cota.rentabilidade_dia = _calcular_rentabilidade_dia(fundo_id, cota.valor_cota, anterior)
+        anterior = cota
+    
+    primeira_mes, ultima_mes, primeira_ano, ultima_ano = {}, {}, {}, {}
+    for cota in cotas:
+        mes = (cota.data_referencia.year, cota.data_referencia.month)
+        ano = cota.data_referencia.year
+        primeira_mes.setdefault(mes, cota)
+        ultima_mes[mes] = cota
+        primeira_ano.setdefault(ano, cota)
+        ultima_ano[ano] = cota
+    
+    for cota in cotas:
+        mes = (cota.data_referencia.year, cota.data_referencia.month)
+        ano = cota.data_referencia.year
+        cota.rentabilidade_mes = _rentabilidade_periodo(primeira_mes[mes], ultima_mes[mes])
+        cota.rentabilidade_ano = _rentabilidade_periodo(primeira_ano[ano], ultima_ano[ano])
+    
+    # 5. Bulk upsert único
+    with transaction.atomic():
+        CotaHistorico.objects.bulk_create(
+            cotas,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=(
+                ['fundo', 'data_referencia']
+                if connection.features.supports_update_conflicts_with_target else None
+            ),
+            update_fields=[
+                'valor_cota', 'patrimonio_liquido', 'quantidade_cotas', 'quantidade_cotistas',
+                'rentabilidade_dia', 'rentabilidade_mes', 'rentabilidade_ano',
+            ],
+        )
+    
+    return {
+        'fundo_id': str(fundo_id),
+        'data_inicio': data_inicio.isoformat(),
+        'data_fim': data_fim.isoformat(),
+        'dias_recalculados': dias,
+        'registros_gravados': len(cotas),
+    }
+
+
+def _rentabilidade_periodo(primeira_cota, ultima_cota):
+    """Rentabilidade acumulada entre duas cotas: (Cota_Final / Cota_Inicial) - 1."""
+    if not primeira_cota.valor_cota:
+        return None
+    
+    rentabilidade = (ultima_cota.valor_cota / primeira_cota.valor_cota) - Decimal('1.00')
+    return rentabilidade.quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
@@ -6,15 +6,32 @@ Toda a operação é atômica: ou tudo é salvo, ou nada.
 """
 from __future__ import annotations
 
+import hashlib
 import io
+import re
 import zipfile
 import json
+import logging
+from collections import defaultdict, deque
+from concurrent.futures import Future
 from decimal import Decimal
 from datetime import date
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 
-from fundos.models import Fundo, InformeMensal, InformeMensalCedente, InformeMensalCarteira
+from core.services import processos
+from fundos.models import Fundo, InformeMensal, InformeMensalBruto, InformeMensalCedente, InformeMensalCarteira
+from fundos.services.arquivo_xml import existe_xml, guardar_xml, ler_xml
+from fundos.services.metricas_informe import sincronizar_metricas
+
+logger = logging.getLogger(__name__)
+
+
+# Parsing simultâneo em importar_lote_zip, no pool compartilhado (default: tamanho do pool)
+INFORME_IMPORT_WORKERS = getattr(settings, 'INFORME_IMPORT_WORKERS', None) or processos.tamanho_pool()
+# Informes gravados por transação em importar_lote_zip
+INFORME_IMPORT_LOTE_DB = getattr(settings, 'INFORME_IMPORT_LOTE_DB', 12)
 
 
 class InformeImportError(Exception):
@@ -26,6 +43,19 @@ def _clean_cnpj(raw: str) -> str:
     return ''.join(c for c in raw if c.isdigit())
 
 
+def sha256_arquivo(conteudo: bytes) -> str:
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def informe_inalterado(fundo, sha256: str) -> InformeMensal | None:
+    """
+    Retorna o informe do fundo já importado a partir de um arquivo idêntico
+    (mesmo SHA-256), ou None. Conteúdo igual implica mesma competência, então
+    o arquivo pode ser ignorado sem parsing.
+    """
+    return InformeMensal.objects.filter(fundo=fundo, arquivo_sha256=sha256).first()
+
+
 def _to_json_safe(data: dict) -> dict:
     """Converte Decimals e dates para tipos JSON-serializáveis."""
     if isinstance(data, dict):
@@ -39,12 +69,52 @@ def _to_json_safe(data: dict) -> dict:
     return data
 
 
+def _reconciliar_filhos(existentes, novos: list, chave: tuple, campos: tuple) -> dict:
+    """
+    Sincroniza as linhas filhas de um informe com `novos` (instâncias não
+    salvas) pela chave natural: apaga as que sumiram, atualiza as que mudaram
+    e insere as novas — no máximo um DELETE, um UPDATE e um INSERT em lote.
+    Linhas iguais não são tocadas, preservando seus IDs.
+
+    Chaves repetidas são pareadas na ordem em que aparecem.
+    """
+    modelo = existentes.model
+    por_chave = defaultdict(deque)
+    for obj in existentes.order_by('pk'):
+        por_chave[tuple(getattr(obj, c) for c in chave)].append(obj)
+
+    inserir, atualizar = [], []
+    for novo in novos:
+        pendentes = por_chave.get(tuple(getattr(novo, c) for c in chave))
+        if not pendentes:
+            inserir.append(novo)
+            continue
+        atual = pendentes.popleft()
+        if any(getattr(atual, c) != getattr(novo, c) for c in campos):
+            for c in campos:
+                setattr(atual, c, getattr(novo, c))
+            atualizar.append(atual)
+
+    apagar = [obj.pk for pendentes in por_chave.values() for obj in pendentes]
+
+    if apagar:
+        modelo.objects.filter(pk__in=apagar).delete()
+    if atualizar:
+        modelo.objects.bulk_update(atualizar, campos)
+    if inserir:
+        modelo.objects.bulk_create(inserir)
+
+    return {'inseridos': len(inserir), 'atualizados': len(atualizar), 'apagados': len(apagar)}
+
+
 @transaction.atomic
 def importar_informe_mensal(
     fundo_id,
     parsed_dict: dict,
     user,
     arquivo_nome: str = '',
+    arquivo_sha256: str = '',
+    xml_bytes: bytes | None = None,
 ) -> InformeMensal:
     """
     Persiste (ou atualiza) um Informe Mensal a partir do dict retornado por
@@ -56,6 +126,11 @@ def importar_informe_mensal(
     parsed     : dict retornado por parse_informe_mensal()
     user       : instância de AUTH_USER_MODEL (pode ser None em testes)
     arquivo_nome : nome original do arquivo XML
+    arquivo_sha256 : SHA-256 do XML (ver sha256_arquivo / informe_inalterado)
+    xml_bytes  : XML original; se informado, é guardado no arquivo de XMLs
+                 (services/arquivo_xml.py) antes de gravar o informe — uma
+                 falha na escrita aborta a importação — e os dados brutos
+                 passam a ser obtidos por re-parse (ver dados_brutos_informe)
 
     Retorna
     -------
@@ -66,6 +141,9 @@ def importar_informe_mensal(
     InformeImportError — CNPJ do fundo não confere, ou fundo não encontrado
     """
     parsed = parsed_dict
+    if xml_bytes is not None:
+        arquivo_sha256 = sha256_arquivo(xml_bytes)
+
     try:
         fundo = Fundo.objects.get(pk=fundo_id)
     except Fundo.DoesNotExist:
@@ -79,6 +157,11 @@ def importar_informe_mensal(
             f"CNPJ do XML ({cnpj_xml}) não corresponde ao CNPJ do fundo selecionado ({cnpj_fundo})."
         )
 
+    # Blob antes das linhas: se a transação for revertida ele fica órfão e
+    # sai em limpar_xmls_orfaos; o inverso perderia os dados brutos
+    if xml_bytes is not None:
+        guardar_xml(xml_bytes)
+
     competencia = parsed['header']['competencia']
     header      = parsed['header']
     ativos      = parsed['ativos']
@@ -100,6 +183,7 @@ def importar_informe_mensal(
             'versao_xml':           header.get('versao') or '',
             'cnpj_administrador':   _clean_cnpj(header.get('cnpj_administrador', ''))[:14],
             'arquivo_xml_nome':     arquivo_nome[:255],
+            'arquivo_sha256':       arquivo_sha256,
             'criado_por':           user,
 
             # Ativos
@@ -171,14 +255,23 @@ def importar_informe_mensal(
             'vl_rating_b':   scr.get('vl_rating_b'),
             'vl_rating_c':   scr.get('vl_rating_c'),
             'vl_rating_d_h': scr.get('vl_rating_d_h'),
-
-            # Dados brutos para auditoria
-            'dados_brutos': _to_json_safe(parsed),
         }
     )
 
-    # ── Cedentes: apaga os anteriores e recria ────────────────
-    informe.cedentes.all().delete()
+    # ── Dados brutos para auditoria ───────────────────────────
+    # Com o XML original arquivado eles são reconstruídos por re-parse;
+    # sem ele, o parse fica em InformeMensalBruto.
+    if xml_bytes is not None:
+        InformeMensalBruto.objects.filter(informe=informe).delete()
+    else:
+        InformeMensalBruto.objects.bulk_create(
+            [InformeMensalBruto(informe=informe, dados=_to_json_safe(parsed))],
+            update_conflicts=True,
+            unique_fields=['informe'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=['dados'],
+        )
+
+    # ── Cedentes e carteira: reconcilia com as linhas existentes ──
     cedentes_objs = [
         InformeMensalCedente(
             informe=informe,
@@ -188,11 +281,12 @@ def importar_informe_mensal(
         for c in parsed.get('cedentes', [])
         if c.get('nr_pf_pj_cedent')
     ]
-    if cedentes_objs:
-        InformeMensalCedente.objects.bulk_create(cedentes_objs)
+    _reconciliar_filhos(
+        informe.cedentes.all(), cedentes_objs,
+        chave=('nr_pf_pj_cedent',),
+        campos=('pr_cedent',),
+    )
 
-    # ── Carteira: apaga os anteriores e recria ────────────────
-    informe.carteira.all().delete()
     vl_carteira = informe.vl_carteira or Decimal('0')
     carteira_objs = []
     for seg in parsed.get('carteira_segmentos', []):
@@ -211,30 +305,86 @@ def importar_informe_mensal(
                 percentual_carteira=pct,
             )
         )
-    if carteira_objs:
-        InformeMensalCarteira.objects.bulk_create(carteira_objs)
+    _reconciliar_filhos(
+        informe.carteira.all(), carteira_objs,
+        chave=('segmento', 'subsegmento'),
+        campos=('valor', 'percentual_carteira'),
+    )
+
+    sincronizar_metricas(informe)
 
     return informe
 
 
-def importar_lote_zip(zip_bytes: bytes, fundo: Fundo, user) -> list[dict]:
+def dados_brutos_informe(informe: InformeMensal) -> dict | None:
     """
-    Processa um arquivo ZIP contendo múltiplos XMLs de informe mensal.
+    Dados brutos de um informe: re-parse do XML original arquivado ou, para
+    informes importados sem ele, o JSON de InformeMensalBruto.
+    """
+    from fundos.services.informe_xml import parse_informe_mensal
 
-    Cada XML é importado de forma independente (transações separadas).
-    Erros em um arquivo não afetam os demais.
+    if existe_xml(informe.arquivo_sha256):
+        return _to_json_safe(parse_informe_mensal(ler_xml(informe.arquivo_sha256)))
 
-    Retorna uma lista de dicts com:
-        - arquivo   : nome do arquivo dentro do ZIP
-        - status    : 'ok' | 'erro'
-        - competencia: string 'MM/YYYY' se status=='ok'
-        - mensagem  : descrição do erro se status=='erro'
-        - informe_id: UUID str se status=='ok'
+    return InformeMensalBruto.objects.filter(informe=informe).values_list('dados', flat=True).first()
+
+
+def _parsear_em_ordem(xmls, workers: int):
     """
-    from fundos.services.informe_xml import parse_informe_mensal, InformeParseError
+    Parseia os XMLs no pool de processos compartilhado (core.services.processos)
+    e devolve (parsed, erro) na ordem de entrada. No máximo 2 × workers
+    arquivos ficam em voo, então a persistência do início do lote começa
+    enquanto o resto ainda é parseado. Um arquivo perdido por falha do pool
+    (BrokenProcessPool) é parseado aqui mesmo.
 
-    resultados = []
+    `xmls` é um iterável de bytes (ou None para arquivos ilegíveis).
+    """
+    from fundos.services.informe_xml import parse_informe_mensal_seguro
+
+    backend = getattr(settings, 'INFORME_XML_PARSER', 'etree')
+
+    def _local(xml_bytes):
+        return parse_informe_mensal_seguro(xml_bytes, backend) if xml_bytes is not None else (None, '')
+
+    # Processos daemon (ex.: workers prefork do Celery) não podem criar filhos;
+    # a importação em lote roda na fila 'importacao' (ver CELERY_TASK_ROUTES)
+    disponivel = processos.pool_disponivel()
+    if workers > 1 and not disponivel:
+        logger.warning("[INFORMES] Processo daemon (prefork?): parsing sequencial")
+    if workers <= 1 or not disponivel:
+        for xml_bytes in xmls:
+            yield _local(xml_bytes)
+        return
+
+    def _submeter(xml_bytes):
+        if xml_bytes is None:
+            return None
+        try:
+            return processos.submeter(parse_informe_mensal_seguro, xml_bytes, backend)
+        except Exception as e:
+            futuro = Future()
+            futuro.set_exception(e)
+            return futuro
+
+    def _resultado(xml_bytes, futuro):
+        if futuro is None:
+            return None, ''
+        try:
+            return futuro.result()
+        except Exception as e:
+            logger.warning(f"[INFORMES] Falha no pool de parsing ({e!r}): parseando no próprio processo")
+            return _local(xml_bytes)
+
+    em_voo = deque()
+    for xml_bytes in xmls:
+        em_voo.append((xml_bytes, _submeter(xml_bytes)))
+        if len(em_voo) >= 2 * workers:
+            yield _resultado(*em_voo.popleft())
+    while em_voo:
+        yield _resultado(*em_voo.popleft())
 
+
+def _abrir_zip(zip_bytes: bytes) -> tuple[zipfile.ZipFile, list[str]]:
     try:
         zf = zipfile.ZipFile(io.BytesIO(zip_bytes))
     except zipfile.BadZipFile:
@@ -246,34 +396,230 @@ def importar_lote_zip(zip_bytes: bytes, fundo: Fundo, user) -> list[dict]:
     ]
 
     if not xml_names:
+        zf.close()
         raise ValueError('O ZIP não contém nenhum arquivo .xml.')
 
-    for name in xml_names:
-        arquivo_label = name.split('/')[-1]  # exibe apenas o nome, sem subpastas
-        try:
-            xml_bytes_item = zf.read(name)
-            parsed = parse_informe_mensal(xml_bytes_item)
-            informe = importar_informe_mensal(
-                fundo_id=str(fundo.id),
-                parsed_dict=parsed,
-                user=user,
-                arquivo_nome=arquivo_label,
-            )
-            resultados.append({
-                'arquivo': arquivo_label,
-                'status': 'ok',
-                'competencia': informe.competencia_display,
-                'informe_id': str(informe.id),
-                'mensagem': '',
-            })
-        except Exception as exc:
-            resultados.append({
-                'arquivo': arquivo_label,
-                'status': 'erro',
-                'competencia': '',
-                'informe_id': '',
-                'mensagem': str(exc),
-            })
-
-    zf.close()
+    return zf, xml_names
+
+
+def _importar_arquivos(zf: zipfile.ZipFile, arquivos: list, user, workers, progresso) -> list[dict]:
+    """
+    Núcleo de importar_lote_zip / importar_lote_zip_empresa.
+
+    `arquivos` é uma lista de (nome no ZIP, Fundo ou None, mensagem de erro);
+    arquivos sem fundo entram no relatório com o erro informado.
+    """
+    fundos = {fundo.id: fundo for _, fundo, _ in arquivos if fundo is not None}
+
+    erros_leitura = {}
+    hashes = {}
+    conteudos = {}  # XMLs lidos e ainda não persistidos (no máximo os em voo)
+    inalterados = {}
+
+    # (fundo_id, sha256) → (informe_id, competência) de todos os fundos do lote, numa consulta
+    importados = {
+        (fundo_id, sha256): (str(informe_id), competencia.strftime('%m/%Y'))
+        for fundo_id, sha256, informe_id, competencia in InformeMensal.objects.filter(
+            fundo_id__in=list(fundos),
+        ).exclude(arquivo_sha256='').values_list('fundo_id', 'arquivo_sha256', 'id', 'competencia')
+    }
+    vistos = set()
+
+    def _ler():
+        for name, fundo, _ in arquivos:
+            if fundo is None:
+                yield None
+                continue
+            try:
+                conteudo = zf.read(name)
+            except Exception as exc:
+                erros_leitura[name] = str(exc)
+                yield None
+                continue
+
+            chave = (fundo.id, sha256_arquivo(conteudo))
+            if chave in importados or chave in vistos:
+                inalterados[name] = chave
+                yield None
+                continue
+            vistos.add(chave)
+            hashes[name] = chave[1]
+            conteudos[name] = conteudo
+            yield conteudo
+
+    def _erro(arquivo_label, fundo, mensagem):
+        return {
+            'arquivo': arquivo_label,
+            'fundo_id': str(fundo.id) if fundo else '',
+            'status': 'erro',
+            'competencia': '',
+            'informe_id': '',
+            'mensagem': mensagem,
+        }
+
+    resultados = []
+    if progresso:
+        progresso(resultados, len(arquivos))
+    parseados = zip(arquivos, _parsear_em_ordem(_ler(), workers or INFORME_IMPORT_WORKERS))
+
+    while True:
+        lote = [item for _, item in zip(range(INFORME_IMPORT_LOTE_DB), parseados)]
+        if not lote:
+            break
+
+        with transaction.atomic():
+            for (name, fundo, erro_roteamento), (parsed, erro) in lote:
+                arquivo_label = name.split('/')[-1]  # exibe apenas o nome, sem subpastas
+                if fundo is None:
+                    resultados.append(_erro(arquivo_label, None, erro_roteamento))
+                    continue
+                if name in inalterados:
+                    if inalterados[name] not in importados:
+                        # cópia de um arquivo anterior do ZIP que falhou
+                        resultados.append(_erro(arquivo_label, fundo, 'Arquivo idêntico a outro do ZIP que não foi importado.'))
+                        continue
+                    informe_id, competencia = importados[inalterados[name]]
+                    resultados.append({
+                        'arquivo': arquivo_label,
+                        'fundo_id': str(fundo.id),
+                        'status': 'inalterado',
+                        'competencia': competencia,
+                        'informe_id': informe_id,
+                        'mensagem': 'Arquivo idêntico ao já importado.',
+                    })
+                    continue
+                xml_bytes = conteudos.pop(name, None)
+                if parsed is None:
+                    resultados.append(_erro(arquivo_label, fundo, erros_leitura.get(name) or erro))
+                    continue
+                try:
+                    informe = importar_informe_mensal(
+                        fundo_id=str(fundo.id),
+                        parsed_dict=parsed,
+                        user=user,
+                        arquivo_nome=arquivo_label,
+                        xml_bytes=xml_bytes,
+                    )
+                    importados[(fundo.id, hashes[name])] = (str(informe.id), informe.competencia_display)
+                    resultados.append({
+                        'arquivo': arquivo_label,
+                        'fundo_id': str(fundo.id),
+                        'status': 'ok',
+                        'competencia': informe.competencia_display,
+                        'informe_id': str(informe.id),
+                        'mensagem': '',
+                    })
+                except Exception as exc:
+                    resultados.append(_erro(arquivo_label, fundo, str(exc)))
+
+        if progresso:
+            progresso(resultados, len(arquivos))
+
     return resultados
+
+
+def importar_lote_zip(
+    zip_bytes: bytes,
+    fundo: Fundo,
+    user,
+    workers: int | None = None,
+    progresso=None,
+) -> list[dict]:
+    """
+    Processa um arquivo ZIP contendo múltiplos XMLs de informe mensal.
+
+    O parsing (CPU-bound, independente por arquivo) roda no pool de
+    processos compartilhado, com até 2 × INFORME_IMPORT_WORKERS arquivos em
+    voo; a persistência segue a ordem do ZIP,
+    em transações de INFORME_IMPORT_LOTE_DB informes. Cada informe tem seu
+    próprio savepoint: erros em um arquivo não afetam os demais.
+
+    Arquivos idênticos (SHA-256) a um informe já importado do fundo, ou a
+    um arquivo anterior do mesmo ZIP, não são parseados nem regravados.
+
+    `progresso(resultados, total)`, se informado, é chamado antes do primeiro
+    lote e após o commit de cada lote (ver tasks.importar_lote_zip_task).
+
+    Retorna uma lista de dicts com:
+        - arquivo   : nome do arquivo dentro do ZIP
+        - fundo_id  : UUID str do fundo
+        - status    : 'ok' | 'inalterado' | 'erro'
+        - competencia: string 'MM/YYYY' se status in ('ok', 'inalterado')
+        - mensagem  : descrição do erro se status=='erro'
+        - informe_id: UUID str se status in ('ok', 'inalterado')
+    """
+    zf, xml_names = _abrir_zip(zip_bytes)
+    try:
+        return _importar_arquivos(zf, [(name, fundo, '') for name in xml_names], user, workers, progresso)
+    finally:
+        zf.close()
+
+
+_CNPJ_FUNDO_RE = re.compile(rb'<NR_CNPJ_FUNDO>\s*([^<]*?)\s*</NR_CNPJ_FUNDO>')
+_CABECALHO_BYTES = 64 * 1024
+
+
+def _cnpj_fundo_xml(zf: zipfile.ZipFile, name: str) -> str:
+    """
+    Extrai NR_CNPJ_FUNDO do cabeçalho do XML sem parseá-lo (CAB_INFORM fica
+    no início do arquivo). O parser valida o CNPJ de novo na importação.
+    """
+    with zf.open(name) as f:
+        inicio = f.read(_CABECALHO_BYTES)
+        m = _CNPJ_FUNDO_RE.search(inicio)
+        if m is None and len(inicio) == _CABECALHO_BYTES:
+            m = _CNPJ_FUNDO_RE.search(inicio + f.read())
+    return _clean_cnpj(m.group(1).decode('latin-1')) if m else ''
+
+
+def importar_lote_zip_empresa(
+    zip_bytes: bytes,
+    empresa,
+    user,
+    workers: int | None = None,
+    progresso=None,
+) -> list[dict]:
+    """
+    Importa um ZIP com informes de vários fundos da empresa.
+
+    O CNPJ de cada XML é lido do cabeçalho e todos são resolvidos contra
+    Fundo com uma única consulta IN; os arquivos são agrupados por fundo
+    (na ordem do ZIP dentro de cada grupo) e seguem o mesmo pipeline de
+    importar_lote_zip — parsing em paralelo, persistência em lotes e
+    deduplicação por SHA-256.
+
+    Retorna um único relatório, no formato de importar_lote_zip; arquivos
+    cujo CNPJ não pertence a um fundo da empresa voltam com status 'erro'.
+    """
+    zf, xml_names = _abrir_zip(zip_bytes)
+    try:
+        cnpjs = {}
+        erros = {}
+        for name in xml_names:
+            try:
+                cnpjs[name] = _cnpj_fundo_xml(zf, name)
+            except Exception as exc:
+                erros[name] = str(exc)
+
+        fundos = {
+            fundo.cnpj: fundo
+            for fundo in Fundo.objects.filter(empresa=empresa, cnpj__in=set(cnpjs.values()) - {''})
+        }
+
+        por_fundo = defaultdict(list)
+        sem_fundo = []
+        for name in xml_names:
+            cnpj = cnpjs.get(name)
+            if name in erros:
+                sem_fundo.append((name, None, erros[name]))
+            elif not cnpj:
+                sem_fundo.append((name, None, 'NR_CNPJ_FUNDO não encontrado no XML.'))
+            elif cnpj not in fundos:
+                sem_fundo.append((name, None, f'Nenhum fundo da empresa com CNPJ {cnpj}.'))
+            else:
+                por_fundo[cnpj].append((name, fundos[cnpj], ''))
+
+        arquivos = [item for grupo in por_fundo.values() for item in grupo] + sem_fundo
+        return _importar_arquivos(zf, arquivos, user, workers, progresso)
+    finally:
+        zf.close()
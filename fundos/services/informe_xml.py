@@ -142,6 +142,38 @@ _CARTEIRA_MAP: list[tuple[str, str, str | None]] = [
 ]
 
 
+# Tags aninhadas por seção
+_SECTION_PARENTS = {
+    'VL_COMERC':                'SEGMT_COMERC',
+    'VL_COMERC_VARJ':           'SEGMT_COMERC',
+    'VL_ARREND_MERCNT':         'SEGMT_COMERC',
+    'VL_SERV':                  'SEGMT_SERV',
+    'VL_SERV_PUBLIC':           'SEGMT_SERV',
+    'VL_SERV_EDUC':             'SEGMT_SERV',
+    'VL_SERV_ENTRETEN':         'SEGMT_SERV',
+    'VL_FINANC_CRED_PESSOA':    'SEGMT_FINANC',
+    'VL_FINANC_CRED_PESSOA_CONSIG': 'SEGMT_FINANC',
+    'VL_FINANC_CRED_CORPOR':    'SEGMT_FINANC',
+    'VL_FINANC_MMARKET':        'SEGMT_FINANC',
+    'VL_FINANC_VEICL':          'SEGMT_FINANC',
+    'VL_FINANC_IMOBIL_EMPSRL':  'SEGMT_FINANC',
+    'VL_FINANC_IMOBIL_RESID':   'SEGMT_FINANC',
+    'VL_FINANC_OUTRO':          'SEGMT_FINANC',
+    'VL_FACT_PESSOA':           'SEGMT_FACT',
+    'VL_FACT_CORPOR':           'SEGMT_FACT',
+    'VL_SETOR_PUBLIC_PRECAT':   'SEGMT_SETOR_PUBLIC',
+    'VL_SETOR_PUBLIC_CRED_TRIBUT': 'SEGMT_SETOR_PUBLIC',
+    'VL_SETOR_PUBLIC_ROYA':     'SEGMT_SETOR_PUBLIC',
+    'VL_SETOR_PUBLIC_OUTRO':    'SEGMT_SETOR_PUBLIC',
+}
+
+# Valores Mobiliários ficam em APLIC_ATIVO/VALORES_MOB
+_VALORES_MOB_TAGS = {
+    'VL_DEBT', 'VL_CRI', 'VL_NP_COMERC',
+    'VL_LETRA_FINANC', 'VL_CLS_COTA_FIF', 'VL_OUTRO_DICRED',
+}
+
+
 def _parse_carteira(root: ET.Element) -> list[dict]:
     """
     Extrai a composição da carteira por segmento/subsegmento.
@@ -151,37 +183,6 @@ def _parse_carteira(root: ET.Element) -> list[dict]:
     if cart is None:
         return []
 
-    # Tags aninhadas por seção
-    _SECTION_PARENTS = {
-        'VL_COMERC':                'SEGMT_COMERC',
-        'VL_COMERC_VARJ':           'SEGMT_COMERC',
-        'VL_ARREND_MERCNT':         'SEGMT_COMERC',
-        'VL_SERV':                  'SEGMT_SERV',
-        'VL_SERV_PUBLIC':           'SEGMT_SERV',
-        'VL_SERV_EDUC':             'SEGMT_SERV',
-        'VL_SERV_ENTRETEN':         'SEGMT_SERV',
-        'VL_FINANC_CRED_PESSOA':    'SEGMT_FINANC',
-        'VL_FINANC_CRED_PESSOA_CONSIG': 'SEGMT_FINANC',
-        'VL_FINANC_CRED_CORPOR':    'SEGMT_FINANC',
-        'VL_FINANC_MMARKET':        'SEGMT_FINANC',
-        'VL_FINANC_VEICL':          'SEGMT_FINANC',
-        'VL_FINANC_IMOBIL_EMPSRL':  'SEGMT_FINANC',
-        'VL_FINANC_IMOBIL_RESID':   'SEGMT_FINANC',
-        'VL_FINANC_OUTRO':          'SEGMT_FINANC',
-        'VL_FACT_PESSOA':           'SEGMT_FACT',
-        'VL_FACT_CORPOR':           'SEGMT_FACT',
-        'VL_SETOR_PUBLIC_PRECAT':   'SEGMT_SETOR_PUBLIC',
-        'VL_SETOR_PUBLIC_CRED_TRIBUT': 'SEGMT_SETOR_PUBLIC',
-        'VL_SETOR_PUBLIC_ROYA':     'SEGMT_SETOR_PUBLIC',
-        'VL_SETOR_PUBLIC_OUTRO':    'SEGMT_SETOR_PUBLIC',
-    }
-
-    # Valores Mobiliários ficam em APLIC_ATIVO/VALORES_MOB
-    _VALORES_MOB_TAGS = {
-        'VL_DEBT', 'VL_CRI', 'VL_NP_COMERC',
-        'VL_LETRA_FINANC', 'VL_CLS_COTA_FIF', 'VL_OUTRO_DICRED',
-    }
-
     valores_mob_node = root.find('LISTA_INFORM/APLIC_ATIVO/VALORES_MOB')
 
     result = []
@@ -208,7 +209,7 @@ def _parse_carteira(root: ET.Element) -> list[dict]:
 # Parser principal
 # ============================================================
 
-def parse_informe_mensal(xml_bytes: bytes) -> dict:
+def parse_informe_mensal(xml_bytes: bytes, backend: str | None = None) -> dict:
     """
     Parseia o XML do Informe Mensal CVM (formato DOC_ARQ).
 
@@ -218,6 +219,37 @@ def parse_informe_mensal(xml_bytes: bytes) -> dict:
         captacao_resgate, scr
 
     Lança InformeParseError em caso de XML inválido ou campos obrigatórios ausentes.
+
+    backend: 'etree' (árvore completa, padrão) ou 'lxml' (passada única em
+    streaming, ver informe_xml_stream.py). Default: settings.INFORME_XML_PARSER.
+    Ambos retornam exatamente o mesmo dict.
+    """
+    if backend is None:
+        from django.conf import settings
+        backend = getattr(settings, 'INFORME_XML_PARSER', 'etree')
+
+    if backend == 'lxml':
+        from .informe_xml_stream import parse_informe_mensal_stream
+        return parse_informe_mensal_stream(xml_bytes)
+    if backend != 'etree':
+        raise ValueError(f"Backend de parser desconhecido: '{backend}'")
+    return _parse_informe_mensal_etree(xml_bytes)
+
+
+def parse_informe_mensal_seguro(xml_bytes: bytes, backend: str) -> tuple[dict | None, str]:
+    """
+    Variante para process pools (importar_lote_zip): não depende do Django nem
+    levanta exceções — retorna (parsed, '') ou (None, mensagem de erro).
+    """
+    try:
+        return parse_informe_mensal(xml_bytes, backend=backend), ''
+    except Exception as exc:
+        return None, str(exc)
+
+
+def _parse_informe_mensal_etree(xml_bytes: bytes) -> dict:
+    """
+    Backend ElementTree: monta a árvore completa e consulta cada campo com find().
     """
     try:
         root = ET.fromstring(xml_bytes)
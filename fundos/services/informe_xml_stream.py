@@ -0,0 +1,299 @@
+"""
+fundos/services/informe_xml_stream.py
+
+Backend lxml do parser do Informe Mensal CVM (settings.INFORME_XML_PARSER = 'lxml').
+
+Faz uma única passada incremental (iterparse) sobre o DOC_ARQ: cada elemento
+folha é despachado por uma tabela caminho → campo pré-compilada (incluindo
+_CARTEIRA_MAP) e descartado em seguida, de modo que a memória não cresce com
+o tamanho da LISTA_CEDENT. Retorna exatamente o mesmo dict que o backend
+ElementTree (_parse_informe_mensal_etree).
+
+Semântica de find(): só o primeiro filho com cada tag é considerado, exceto
+CEDENT, em que todos os filhos de LISTA_CEDENT são lidos (findall).
+"""
+from __future__ import annotations
+
+from io import BytesIO
+
+from lxml import etree
+
+from .informe_xml import (
+    InformeParseError,
+    _CARTEIRA_MAP,
+    _SECTION_PARENTS,
+    _VALORES_MOB_TAGS,
+    _parse_competencia,
+    _to_decimal_br,
+)
+
+
+# ============================================================
+# Tabela caminho → (seção, campo, conversor)
+# ============================================================
+
+def _conv_texto(raw):
+    return raw
+
+
+def _conv_int(raw):
+    if not raw:
+        return None
+    try:
+        return int(raw)
+    except (ValueError, TypeError):
+        return None
+
+
+_APLIC = 'LISTA_INFORM/APLIC_ATIVO'
+_OUTRAS = 'LISTA_INFORM/OUTRAS_INFORM'
+_CART = 'LISTA_INFORM/CART_SEGMT'
+_DESC_SERIE = f'{_OUTRAS}/DESC_SERIE_CLASSE'
+_SCR_DEVD = f'{_OUTRAS}/RES_INF_PRST_SCR/VLR_TOTAL_DIR_CRD_DEVD'
+_LISTA_CEDENT = f'{_APLIC}/LISTA_CEDENT'
+_CEDENT = f'{_LISTA_CEDENT}/CEDENT'
+
+# (seção, campo, caminho, conversor) — mesma ordem de chaves do backend etree
+_CAMPOS = [
+    ('header', 'versao',          'CAB_INFORM/VERSAO',          _conv_texto),
+    ('header', 'competencia_raw', 'CAB_INFORM/DT_COMPT',        _conv_texto),
+
+    ('ativos', 'vl_disponib',         f'{_APLIC}/VL_DISPONIB',                      _to_decimal_br),
+    ('ativos', 'vl_carteira',         f'{_APLIC}/VL_CARTEIRA',                      _to_decimal_br),
+    ('ativos', 'vl_total_ativos',     f'{_APLIC}/VL_SOM_APLIC_ATIVO',               _to_decimal_br),
+    ('ativos', 'vl_dicred',           f'{_APLIC}/DICRED/VL_DICRED',                 _to_decimal_br),
+    ('ativos', 'vl_dicred_cedent',    f'{_APLIC}/DICRED/VL_DICRED_CEDENT',          _to_decimal_br),
+    ('ativos', 'vl_dicred_inad',      f'{_APLIC}/DICRED/VL_DICRED_EXISTE_INAD',     _to_decimal_br),
+    ('ativos', 'vl_dicred_venc_inad', f'{_APLIC}/DICRED/VL_DICRED_TOTAL_VENC_INAD', _to_decimal_br),
+
+    ('passivo', 'vl_total_passivo', 'LISTA_INFORM/PASSIV/VL_SOM_PASSIV',                 _to_decimal_br),
+    ('passivo', 'vl_pgto_curprz',   'LISTA_INFORM/PASSIV/PASSIV_VALORES/VL_PGTO_CURPRZ', _to_decimal_br),
+    ('passivo', 'vl_pgto_lprazo',   'LISTA_INFORM/PASSIV/PASSIV_VALORES/VL_PGTO_LPRAZO', _to_decimal_br),
+
+    ('patrliq', 'vl_patrimonio_liquido',       'LISTA_INFORM/PATRLIQ/VL_PATRIM_LIQ',       _to_decimal_br),
+    ('patrliq', 'vl_patrimonio_liquido_medio', 'LISTA_INFORM/PATRLIQ/VL_PATRIM_LIQ_MEDIO', _to_decimal_br),
+
+    ('cotas_classes', 'qt_total_cotistas',  f'{_OUTRAS}/NUM_COTISTAS/QT_TOTAL_COTISTAS',        _conv_int),
+    ('cotas_classes', 'qt_cotistas_senior', f'{_OUTRAS}/NUM_COTISTAS/QT_TOTAL_COTISTAS_SENIOR', _conv_int),
+    ('cotas_classes', 'qt_cotistas_subord', f'{_OUTRAS}/NUM_COTISTAS/QT_TOTAL_COTISTAS_SUBORD', _conv_int),
+
+    ('rentabilidade', 'rentabilidade_senior', f'{_OUTRAS}/RENT_MES/RENT_CLASSE_SENIOR/PR_APURADA', _to_decimal_br),
+    ('rentabilidade', 'rentabilidade_subord', f'{_OUTRAS}/RENT_MES/RENT_CLASSE_SUBORD/PR_APURADA', _to_decimal_br),
+
+    ('desempenho', 'desemp_esp_senior',  f'{_OUTRAS}/DESEMP/CLASSE_SENIOR/DESEMP_ESP',  _to_decimal_br),
+    ('desempenho', 'desemp_real_senior', f'{_OUTRAS}/DESEMP/CLASSE_SENIOR/DESEMP_REAL', _to_decimal_br),
+    ('desempenho', 'desemp_esp_subord',  f'{_OUTRAS}/DESEMP/CLASSE_SUBORD/DESEMP_ESP',  _to_decimal_br),
+    ('desempenho', 'desemp_real_subord', f'{_OUTRAS}/DESEMP/CLASSE_SUBORD/DESEMP_REAL', _to_decimal_br),
+
+    ('liquidez', 'vl_liqdez_30',       f'{_OUTRAS}/LIQUIDEZ/VL_ATIV_LIQDEZ_30',       _to_decimal_br),
+    ('liquidez', 'vl_liqdez_60',       f'{_OUTRAS}/LIQUIDEZ/VL_ATIV_LIQDEZ_60',       _to_decimal_br),
+    ('liquidez', 'vl_liqdez_90',       f'{_OUTRAS}/LIQUIDEZ/VL_ATIV_LIQDEZ_90',       _to_decimal_br),
+    ('liquidez', 'vl_liqdez_180',      f'{_OUTRAS}/LIQUIDEZ/VL_ATIV_LIQDEZ_180',      _to_decimal_br),
+    ('liquidez', 'vl_liqdez_360',      f'{_OUTRAS}/LIQUIDEZ/VL_ATIV_LIQDEZ_360',      _to_decimal_br),
+    ('liquidez', 'vl_liqdez_mais_360', f'{_OUTRAS}/LIQUIDEZ/VL_ATIV_LIQDEZ_MAIS_360', _to_decimal_br),
+
+    ('vencimentos', 'vl_venc_30',       'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_30',      _to_decimal_br),
+    ('vencimentos', 'vl_venc_31_60',    'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_31_60',   _to_decimal_br),
+    ('vencimentos', 'vl_venc_61_90',    'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_61_90',   _to_decimal_br),
+    ('vencimentos', 'vl_venc_91_120',   'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_91_120',  _to_decimal_br),
+    ('vencimentos', 'vl_venc_121_180',  'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_121_150', _to_decimal_br),
+    ('vencimentos', 'vl_venc_181_360',  'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_151_180', _to_decimal_br),
+    ('vencimentos', 'vl_venc_361_720',  'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_361_720', _to_decimal_br),
+    ('vencimentos', 'vl_venc_mais_720', 'LISTA_INFORM/COMPMT_DICRED_SEM_AQUIS/VL_PRAZO_VENC_1080',    _to_decimal_br),
+
+    ('captacao_resgate', 'vl_capt_senior', f'{_OUTRAS}/CAPTA_RESGA_AMORTI/CAPT_MES/CLASSE_SENIOR/VL_TOTAL', _to_decimal_br),
+    ('captacao_resgate', 'vl_capt_subord', f'{_OUTRAS}/CAPTA_RESGA_AMORTI/CAPT_MES/CLASSE_SUBORD/VL_TOTAL', _to_decimal_br),
+    ('captacao_resgate', 'vl_resg_senior', f'{_OUTRAS}/CAPTA_RESGA_AMORTI/RESG_MES/CLASSE_SENIOR/VL_TOTAL', _to_decimal_br),
+    ('captacao_resgate', 'vl_resg_subord', f'{_OUTRAS}/CAPTA_RESGA_AMORTI/RESG_MES/CLASSE_SUBORD/VL_TOTAL', _to_decimal_br),
+
+    ('scr', 'vl_rating_aa', f'{_SCR_DEVD}/AA', _to_decimal_br),
+    ('scr', 'vl_rating_a',  f'{_SCR_DEVD}/A',  _to_decimal_br),
+    ('scr', 'vl_rating_b',  f'{_SCR_DEVD}/B',  _to_decimal_br),
+    ('scr', 'vl_rating_c',  f'{_SCR_DEVD}/C',  _to_decimal_br),
+]
+
+# Campos presentes apenas se DESC_SERIE_CLASSE existir
+_CAMPOS_DESC_SERIE = [
+    ('qt_cotas_senior', f'{_DESC_SERIE}/DESC_SERIE_CLASSE_SENIOR/QT_COTAS'),
+    ('vl_cota_senior',  f'{_DESC_SERIE}/DESC_SERIE_CLASSE_SENIOR/VL_COTAS'),
+    ('qt_cotas_subord', f'{_DESC_SERIE}/DESC_SERIE_CLASSE_SUBORD/QT_COTAS'),
+    ('vl_cota_subord',  f'{_DESC_SERIE}/DESC_SERIE_CLASSE_SUBORD/VL_COTAS'),
+]
+
+_SCR_D_H = [f'{_SCR_DEVD}/{tag}' for tag in ('D', 'E', 'F', 'G', 'H')]
+
+
+def _caminho_carteira(tag: str) -> str:
+    if tag in _VALORES_MOB_TAGS:
+        return f'{_APLIC}/VALORES_MOB/{tag}'
+    if tag in _SECTION_PARENTS:
+        return f'{_CART}/{_SECTION_PARENTS[tag]}/{tag}'
+    return f'{_CART}/{tag}'
+
+
+# (caminho, segmento, subsegmento) na ordem de _CARTEIRA_MAP
+_CAMPOS_CARTEIRA = [
+    (_caminho_carteira(tag), segmento, subsegmento)
+    for tag, segmento, subsegmento in _CARTEIRA_MAP
+]
+
+# Conjunto de caminhos folha cujo texto é capturado durante a passada
+_CAMINHOS_FOLHA = frozenset(
+    [caminho for _, _, caminho, _ in _CAMPOS]
+    + ['CAB_INFORM/NR_CNPJ_ADM', 'CAB_INFORM/NR_CNPJ_FUNDO', 'CAB_INFORM/NM_CLASSE']
+    + [caminho for _, caminho in _CAMPOS_DESC_SERIE]
+    + _SCR_D_H
+    + [caminho for caminho, _, _ in _CAMPOS_CARTEIRA]
+)
+
+# Contêineres cuja simples presença altera o resultado
+_CONTEINERES = frozenset(['CAB_INFORM', 'LISTA_INFORM', _CART, _DESC_SERIE, _SCR_DEVD])
+
+_AUSENTE = object()
+
+# Só estas tags geram eventos (o filtro roda em C dentro do lxml); os filhos de
+# CEDENT são lidos no fim de cada CEDENT e nunca passam pelo laço Python.
+_TAGS_DESPACHO = frozenset(
+    caminho.rsplit('/', 1)[-1] for caminho in _CAMINHOS_FOLHA | _CONTEINERES
+) | {'CEDENT'}
+
+
+def _caminho_principal(elem) -> str | None:
+    """
+    Caminho do elemento a partir da raiz se ele e todos os ancestrais forem o
+    primeiro filho com sua tag (os elementos que find() alcança); senão None.
+    """
+    partes = []
+    pai = elem.getparent()
+    while pai is not None:
+        if pai.find(elem.tag) is not elem:
+            return None
+        partes.append(elem.tag)
+        elem, pai = pai, pai.getparent()
+    return '/'.join(reversed(partes))
+
+
+# ============================================================
+# Passada única
+# ============================================================
+
+def _coletar(xml_bytes: bytes):
+    """
+    Percorre o documento uma vez. Retorna (textos, conteineres, cedentes):
+    texto do primeiro elemento de cada caminho folha, contêineres presentes
+    e os pares (NR_PF_PJ_CEDENT, PR_CEDENT) de cada CEDENT.
+    """
+    textos = {}
+    conteineres = set()
+    cedentes = []
+    lista_atual = None  # LISTA_CEDENT corrente e se é a alcançada por find()
+    lista_principal = False
+
+    contexto = etree.iterparse(
+        BytesIO(xml_bytes),
+        events=('end',),
+        tag=_TAGS_DESPACHO,
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=True,
+    )
+    try:
+        for _, elem in contexto:
+            if elem.tag == 'CEDENT':
+                lista = elem.getparent()
+                if lista is not lista_atual:
+                    lista_atual = lista
+                    lista_principal = _caminho_principal(lista) == _LISTA_CEDENT
+                if lista_principal:
+                    cnpj_ced = pr = _AUSENTE
+                    for filho in elem:
+                        if filho.tag == 'NR_PF_PJ_CEDENT':
+                            if cnpj_ced is _AUSENTE:
+                                cnpj_ced = filho.text
+                        elif filho.tag == 'PR_CEDENT' and pr is _AUSENTE:
+                            pr = filho.text
+                    cedentes.append((cnpj_ced, pr))
+                # Descarta o CEDENT já lido: a LISTA_CEDENT não cresce
+                lista.remove(elem)
+                continue
+
+            caminho = _caminho_principal(elem)
+            if caminho in _CAMINHOS_FOLHA:
+                textos[caminho] = elem.text.strip() if elem.text is not None else None
+                elem.clear(keep_tail=False)
+            elif caminho in _CONTEINERES:
+                conteineres.add(caminho)
+    except etree.XMLSyntaxError as exc:
+        raise InformeParseError(f"XML inválido: {exc}") from exc
+
+    return textos, conteineres, cedentes
+
+
+def parse_informe_mensal_stream(xml_bytes: bytes) -> dict:
+    """
+    Parseia o XML do Informe Mensal CVM em uma única passada (lxml.iterparse).
+    Mesmo contrato de parse_informe_mensal().
+    """
+    textos, conteineres, cedentes_raw = _coletar(xml_bytes)
+
+    if 'CAB_INFORM' not in conteineres:
+        raise InformeParseError("Elemento CAB_INFORM não encontrado. Verifique se é um Informe Mensal CVM.")
+    if 'LISTA_INFORM' not in conteineres:
+        raise InformeParseError("Elemento LISTA_INFORM não encontrado.")
+
+    secoes = {
+        'header': {}, 'ativos': {}, 'passivo': {}, 'patrliq': {}, 'cotas_classes': {},
+        'rentabilidade': {}, 'desempenho': {}, 'liquidez': {}, 'vencimentos': {},
+        'captacao_resgate': {}, 'scr': {},
+    }
+    for secao, campo, caminho, conversor in _CAMPOS:
+        secoes[secao][campo] = conversor(textos.get(caminho))
+
+    header = secoes['header']
+    header['competencia'] = _parse_competencia(header['competencia_raw'])
+    header['cnpj_administrador'] = textos.get('CAB_INFORM/NR_CNPJ_ADM') or ''
+    header['cnpj_fundo'] = textos.get('CAB_INFORM/NR_CNPJ_FUNDO') or ''
+    header['nome_fundo'] = textos.get('CAB_INFORM/NM_CLASSE') or ''
+
+    if _DESC_SERIE in conteineres:
+        for campo, caminho in _CAMPOS_DESC_SERIE:
+            secoes['cotas_classes'][campo] = _to_decimal_br(textos.get(caminho))
+
+    scr = secoes['scr']
+    scr['vl_rating_d_h'] = None
+    if _SCR_DEVD in conteineres:
+        d_h_total = sum(
+            v for caminho in _SCR_D_H
+            if (v := _to_decimal_br(textos.get(caminho))) is not None
+        )
+        scr['vl_rating_d_h'] = d_h_total if d_h_total else None
+
+    cedentes = []
+    for cnpj_ced, pr in cedentes_raw:
+        cnpj_ced = cnpj_ced.strip() if isinstance(cnpj_ced, str) else None
+        if cnpj_ced:
+            pr = pr.strip() if isinstance(pr, str) else None
+            cedentes.append({'nr_pf_pj_cedent': cnpj_ced, 'pr_cedent': _to_decimal_br(pr)})
+
+    carteira = []
+    if _CART in conteineres:
+        for caminho, segmento, subsegmento in _CAMPOS_CARTEIRA:
+            valor = _to_decimal_br(textos.get(caminho))
+            if valor and valor > 0:
+                carteira.append({'segmento': segmento, 'subsegmento': subsegmento, 'valor': valor})
+
+    return {
+        'header':              header,
+        'ativos':              secoes['ativos'],
+        'passivo':             secoes['passivo'],
+        'patrliq':             secoes['patrliq'],
+        'cedentes':            cedentes,
+        'carteira_segmentos':  carteira,
+        'cotas_classes':       secoes['cotas_classes'],
+        'rentabilidade':       secoes['rentabilidade'],
+        'desempenho':          secoes['desempenho'],
+        'liquidez':            secoes['liquidez'],
+        'vencimentos':         secoes['vencimentos'],
+        'captacao_resgate':    secoes['captacao_resgate'],
+        'scr':                 secoes['scr'],
+    }
@@ -0,0 +1,52 @@
+"""
+Listagem de Fundos por Empresa
+
+Dados da tela listar_fundos — totais por status/tipo e a lista de fundos —
+obtidos com uma agregação condicional e uma leitura da lista, memoizados no
+namespace 'fundos:listagem' da empresa (core/services/cache.py).
+fundos/signals.py invalida o namespace quando um Fundo da empresa é salvo
+ou excluído.
+"""
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from core.services.cache import invalidar_namespace, memoizar
+from fundos.models import Fundo, TipoFundo
+
+
+LISTAGEM_FUNDOS_CACHE_TIMEOUT = getattr(settings, 'LISTAGEM_FUNDOS_CACHE_TIMEOUT', 3600)
+
+
+def listagem_fundos(empresa) -> dict:
+    """
+    Returns:
+        dict com 'fundos' (lista ordenada por razão social), 'por_tipo'
+        ({'FIDC': [...], 'FII': [...], 'FIP': [...]}) e 'totais'
+        (total, ativos, inativos, fidc, fii, fip)
+    """
+    return memoizar(
+        'fundos:listagem', [], lambda: _carregar(empresa),
+        empresa_id=empresa.id, timeout=LISTAGEM_FUNDOS_CACHE_TIMEOUT,
+    )
+
+
+def _carregar(empresa) -> dict:
+    fundos_qs = Fundo.objects.filter(empresa=empresa)
+    totais = fundos_qs.aggregate(
+        total=Count('id'),
+        ativos=Count('id', filter=Q(ativo=True)),
+        inativos=Count('id', filter=Q(ativo=False)),
+        **{tipo.lower(): Count('id', filter=Q(tipo_fundo=tipo)) for tipo in TipoFundo.values},
+    )
+
+    fundos = list(fundos_qs.order_by('razao_social'))
+    por_tipo = {tipo: [] for tipo in TipoFundo.values}
+    for fundo in fundos:
+        por_tipo.setdefault(fundo.tipo_fundo, []).append(fundo)
+
+    return {'fundos': fundos, 'por_tipo': por_tipo, 'totais': totais}
+
+
+def invalidar_listagem_fundos(empresa_id):
+    invalidar_namespace('fundos:listagem', empresa_id)
@@ -0,0 +1,217 @@
+"""
+Lotes Fiscais FIFO
+
+Cada aplicação confirmada gera um LoteCotista com data e custo reais.
+Resgates consomem os lotes mais antigos primeiro, a partir do cursor
+PosicaoCotista.lote_cursor: a busca é um range scan no índice único
+(fundo, cotista, sequencia), então o custo por resgate depende apenas
+dos lotes efetivamente consumidos — não do tamanho do histórico.
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+from decimal import Decimal
+from django.db import transaction
+
+from fundos.models import LoteCotista, MovimentacaoCota, PosicaoCotista
+from .posicao import posicoes_bloqueadas
+from .tributos import calcular_impostos_resgate
+
+
+# Quantos lotes buscar por ida ao banco durante o consumo
+LOTES_POR_BUSCA = 100
+
+# Parcela de um lote consumida por um resgate
+ConsumoLote = namedtuple('ConsumoLote', ['data_aplicacao', 'valor_cota_aquisicao', 'quantidade'])
+
+
+def _posicao_bloqueada(fundo_id, cotista_id) -> PosicaoCotista:
+    posicao, _ = PosicaoCotista.objects.select_for_update().get_or_create(
+        fundo_id=fundo_id,
+        cotista_id=cotista_id,
+    )
+    return posicao
+
+
+@transaction.atomic
+def registrar_lote(movimentacao: MovimentacaoCota) -> LoteCotista:
+    """
+    Cria o lote de uma APLICACAO confirmada no fim da fila FIFO do cotista.
+    """
+    posicao = _posicao_bloqueada(movimentacao.fundo_id, movimentacao.cotista_id)
+    posicao.ultimo_lote += 1
+    posicao.save(update_fields=['ultimo_lote'])
+
+    return LoteCotista.objects.create(
+        fundo_id=movimentacao.fundo_id,
+        cotista_id=movimentacao.cotista_id,
+        movimentacao=movimentacao,
+        sequencia=posicao.ultimo_lote,
+        data_aplicacao=movimentacao.data_cotizacao,
+        valor_cota_aquisicao=movimentacao.valor_cota,
+        quantidade_inicial=movimentacao.quantidade_cotas,
+        quantidade_saldo=movimentacao.quantidade_cotas,
+    )
+
+
+@transaction.atomic
+def registrar_lotes(aplicacoes: list[MovimentacaoCota]) -> list[LoteCotista]:
+    """
+    Versão em lote de registrar_lote(): um lock nas posições envolvidas,
+    um bulk_create de lotes e um bulk_update das sequências.
+    """
+    posicoes = posicoes_bloqueadas((m.fundo_id, m.cotista_id) for m in aplicacoes)
+
+    lotes = []
+    for mov in aplicacoes:
+        posicao = posicoes[(mov.fundo_id, mov.cotista_id)]
+        posicao.ultimo_lote += 1
+        lotes.append(LoteCotista(
+            fundo_id=mov.fundo_id,
+            cotista_id=mov.cotista_id,
+            movimentacao=mov,
+            sequencia=posicao.ultimo_lote,
+            data_aplicacao=mov.data_cotizacao,
+            valor_cota_aquisicao=mov.valor_cota,
+            quantidade_inicial=mov.quantidade_cotas,
+            quantidade_saldo=mov.quantidade_cotas,
+        ))
+
+    LoteCotista.objects.bulk_create(lotes, batch_size=1000)
+    PosicaoCotista.objects.bulk_update(posicoes.values(), ['ultimo_lote'], batch_size=1000)
+
+    return lotes
+
+
+@transaction.atomic
+def consumir_lotes_fifo(fundo_id, cotista_id, quantidade: Decimal) -> tuple[list[ConsumoLote], Decimal]:
+    """
+    Baixa `quantidade` cotas dos lotes mais antigos do cotista.
+
+    Returns:
+        (consumos, quantidade_nao_coberta) — a sobra só ocorre para posições
+        anteriores ao livro de lotes (sem LoteCotista correspondente).
+    """
+    posicao = _posicao_bloqueada(fundo_id, cotista_id)
+
+    restante = quantidade
+    cursor = posicao.lote_cursor
+    consumos = []
+    alterados = []
+
+    while restante > 0:
+        lotes = list(
+            LoteCotista.objects.select_for_update().filter(
+                fundo_id=fundo_id,
+                cotista_id=cotista_id,
+                sequencia__gte=cursor,
+            ).order_by('sequencia')[:LOTES_POR_BUSCA]
+        )
+        if not lotes:
+            break
+
+        for lote in lotes:
+            consumido = min(lote.quantidade_saldo, restante)
+            if consumido > 0:
+                lote.quantidade_saldo -= consumido
+                restante -= consumido
+                alterados.append(lote)
+                consumos.append(ConsumoLote(lote.data_aplicacao, lote.valor_cota_aquisicao, consumido))
+
+            if lote.quantidade_saldo > 0:
+                break
+            cursor = lote.sequencia + 1
+
+        if restante > 0 and len(lotes) < LOTES_POR_BUSCA:
+            break
+
+    if alterados:
+        LoteCotista.objects.bulk_update(alterados, ['quantidade_saldo'], batch_size=1000)
+
+    posicao.lote_cursor = cursor
+    posicao.save(update_fields=['lote_cursor'])
+
+    return consumos, restante
+
+
+class LivroLotes:
+    """
+    Lotes em aberto de vários pares (fundo, cotista), carregados com lock numa
+    única query, para consumir os resgates de uma efetivação em lote em
+    memória e gravar tudo com um bulk_update de lotes e um de cursores.
+    """
+
+    def __init__(self, pares):
+        self._posicoes = posicoes_bloqueadas(pares)
+        self._filas = {par: [] for par in self._posicoes}
+        self._alterados = {}
+
+        for lote in LoteCotista.objects.select_for_update().filter(
+            fundo_id__in={f for f, _ in self._posicoes},
+            cotista_id__in={c for _, c in self._posicoes},
+            quantidade_saldo__gt=0,
+        ).order_by('sequencia'):
+            fila = self._filas.get((lote.fundo_id, lote.cotista_id))
+            if fila is not None and lote.sequencia >= self._posicoes[(lote.fundo_id, lote.cotista_id)].lote_cursor:
+                fila.append(lote)
+
+    @contextmanager
+    def consumo(self, fundo_id, cotista_id, quantidade: Decimal):
+        """
+        Baixa `quantidade` cotas dos lotes mais antigos do par, em memória.
+        Produz (consumos, quantidade_nao_coberta) como consumir_lotes_fifo();
+        se o bloco levantar exceção, a baixa é desfeita (como um savepoint).
+        """
+        posicao = self._posicoes[(fundo_id, cotista_id)]
+        cursor = posicao.lote_cursor
+
+        restante = quantidade
+        consumos = []
+        baixas = []
+        for lote in self._filas[(fundo_id, cotista_id)]:
+            if restante <= 0:
+                break
+            consumido = min(lote.quantidade_saldo, restante)
+            if consumido <= 0:
+                continue
+            lote.quantidade_saldo -= consumido
+            restante -= consumido
+            baixas.append((lote, consumido))
+            consumos.append(ConsumoLote(lote.data_aplicacao, lote.valor_cota_aquisicao, consumido))
+            if lote.quantidade_saldo == 0:
+                posicao.lote_cursor = lote.sequencia + 1
+
+        try:
+            yield consumos, restante
+        except BaseException:
+            for lote, consumido in baixas:
+                lote.quantidade_saldo += consumido
+            posicao.lote_cursor = cursor
+            raise
+
+        self._alterados.update((lote.id, lote) for lote, _ in baixas)
+
+    def gravar(self):
+        if self._alterados:
+            LoteCotista.objects.bulk_update(self._alterados.values(), ['quantidade_saldo'], batch_size=1000)
+            PosicaoCotista.objects.bulk_update(self._posicoes.values(), ['lote_cursor'], batch_size=1000)
+
+
+def calcular_impostos_lotes(consumos: list[ConsumoLote], valor_cota: Decimal, data_resgate) -> dict:
+    """
+    Soma IR/IOF de um resgate calculando cada lote com sua data e custo reais.
+    """
+    ir = Decimal('0.00')
+    iof = Decimal('0.00')
+
+    for consumo in consumos:
+        impostos = calcular_impostos_resgate(
+            consumo.quantidade * valor_cota,
+            consumo.quantidade * consumo.valor_cota_aquisicao,
+            consumo.data_aplicacao,
+            data_resgate,
+        )
+        ir += impostos['ir_retido']
+        iof += impostos['iof_retido']
+
+    return {'ir_retido': ir, 'iof_retido': iof}
@@ -0,0 +1,147 @@
+"""
+Séries de Métricas do Informe Mensal
+
+InformeMensal é uma linha larga (~60 colunas numéricas).
+Para gráficos entre competências — evolução do PL, inadimplência, escada de
+liquidez — os mesmos valores ficam também em InformeMetrica, no formato
+(fundo, competência, métrica, valor), sincronizados a cada importação.
+
+series_metricas() devolve N fundos × M métricas alinhados num eixo único de
+competências com uma consulta sobre o índice (fundo, metrica, competencia).
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection, models
+
+from fundos.models import InformeMensal, InformeMetrica
+
+
+# Campos numéricos de InformeMensal replicados em InformeMetrica
+METRICAS = tuple(
+    f.name for f in InformeMensal._meta.get_fields()
+    if isinstance(f, (models.DecimalField, models.IntegerField)) and not f.primary_key
+)
+
+
+def sincronizar_metricas(informe: InformeMensal) -> int:
+    """
+    Regrava as métricas de um informe: upsert dos valores presentes e remoção
+    das métricas que ficaram nulas. Retorna o número de métricas gravadas.
+    """
+    objetos = [
+        InformeMetrica(
+            informe=informe,
+            fundo_id=informe.fundo_id,
+            competencia=informe.competencia,
+            metrica=metrica,
+            valor=valor,
+        )
+        for metrica in METRICAS
+        if (valor := getattr(informe, metrica)) is not None
+    ]
+
+    informe.metricas.exclude(metrica__in=[o.metrica for o in objetos]).delete()
+    InformeMetrica.objects.bulk_create(
+        objetos,
+        update_conflicts=True,
+        unique_fields=['informe', 'metrica'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=['fundo', 'competencia', 'valor'],
+    )
+    return len(objetos)
+
+
+def preencher_metricas(lote: int = 500) -> int:
+    """
+    Gera as métricas de todos os informes já importados, sem apagar nem
+    sobrescrever as existentes. Retorna o número de métricas geradas.
+
+    Args:
+        lote: Informes lidos e gravados por vez
+    """
+    total = 0
+    objetos = []
+    informes = InformeMensal.objects.order_by('pk').values('id', 'fundo_id', 'competencia', *METRICAS)
+    for informe in informes.iterator(chunk_size=lote):
+        objetos.extend(
+            InformeMetrica(
+                informe_id=informe['id'],
+                fundo_id=informe['fundo_id'],
+                competencia=informe['competencia'],
+                metrica=metrica,
+                valor=informe[metrica],
+            )
+            for metrica in METRICAS
+            if informe[metrica] is not None
+        )
+        if len(objetos) >= lote * 10:
+            total += len(InformeMetrica.objects.bulk_create(objetos, batch_size=1000, ignore_conflicts=True))
+            objetos = []
+    if objetos:
+        total += len(InformeMetrica.objects.bulk_create(objetos, batch_size=1000, ignore_conflicts=True))
+    return total
+
+
+def series_metricas(
+    fundo_ids,
+    metricas,
+    inicio: date = None,
+    fim: date = None,
+) -> dict:
+    """
+    Séries alinhadas de várias métricas para vários fundos.
+
+    Args:
+        fundo_ids: UUIDs dos fundos
+        metricas: Nomes de campos de InformeMensal (ver METRICAS)
+        inicio: Primeira competência (inclusive)
+        fim: Última competência (inclusive)
+
+    Returns:
+        dict com:
+            - competencias: lista ordenada de datas (união de todos os fundos)
+            - series: {fundo_id (str): {metrica: [Decimal | None, ...]}}, com
+              None nas competências sem informe ou sem o valor
+    """
+    invalidas = set(metricas) - set(METRICAS)
+    if invalidas:
+        raise ValueError(f"Métricas desconhecidas: {', '.join(sorted(invalidas))}")
+
+    fundo_ids = [str(f) for f in fundo_ids]
+    filtros = {'fundo_id__in': fundo_ids, 'metrica__in': list(metricas)}
+    if inicio:
+        filtros['competencia__gte'] = inicio
+    if fim:
+        filtros['competencia__lte'] = fim
+
+    linhas = list(
+        InformeMetrica.objects.filter(**filtros).values_list('fundo_id', 'metrica', 'competencia', 'valor')
+    )
+
+    competencias = sorted({competencia for _, _, competencia, _ in linhas})
+    posicao = {competencia: i for i, competencia in enumerate(competencias)}
+
+    series = defaultdict(lambda: {m: [None] * len(competencias) for m in metricas})
+    for fundo_id, metrica, competencia, valor in linhas:
+        series[str(fundo_id)][metrica][posicao[competencia]] = valor
+
+    return {
+        'competencias': competencias,
+        'series': {f: series[f] for f in fundo_ids},
+    }
+
+
+def series_para_grafico(series: dict) -> dict:
+    """Versão JSON (competências 'MM/AAAA', valores float) de series_metricas()."""
+    def _float(valor):
+        return float(valor) if isinstance(valor, Decimal) else valor
+
+    return {
+        'competencias': [c.strftime('%m/%Y') for c in series['competencias']],
+        'series': {
+            fundo_id: {m: [_float(v) for v in valores] for m, valores in metricas.items()}
+            for fundo_id, metricas in series['series'].items()
+        },
+    }
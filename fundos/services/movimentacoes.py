@@ -15,6 +15,9 @@ from fundos.models import (
     StatusMovimentacao
 )
 from .tributos import calcular_impostos_resgate
+from .calendario import proximo_dia_util, somar_dias_uteis
+from .posicao import atualizar_posicao, atualizar_posicoes, saldo_disponivel
+from .lotes import LivroLotes, consumir_lotes_fifo, calcular_impostos_lotes, registrar_lote, registrar_lotes
 
 
 HORARIO_CORTE_PADRAO = time(14, 0)
@@ -46,11 +49,8 @@ def determinar_data_cotizacao(
     else:  # D+1
         data_cotizacao = data_solicitacao.date() + timedelta(days=1)
     
-    # Pula fim de semana (simplificado - não considera feriados)
-    while data_cotizacao.weekday() >= 5:
-        data_cotizacao += timedelta(days=1)
-    
-    return data_cotizacao
+    # Pula fins de semana e feriados
+    return proximo_dia_util(data_cotizacao)
 
 
 @transaction.atomic
@@ -102,9 +102,7 @@ def processar_aplicacao(
     )
     
     # Determina data de liquidação
-    data_liquidacao = data_cotizacao + timedelta(days=fundo.prazo_liquidacao or 0)
-    while data_liquidacao.weekday() >= 5:
-        data_liquidacao += timedelta(days=1)
+    data_liquidacao = somar_dias_uteis(data_cotizacao, fundo.prazo_liquidacao or 0)
     
     # Cria movimentação
     movimentacao = MovimentacaoCota.objects.create(
@@ -163,7 +161,12 @@ def processar_resgate(
     if quantidade_cotas <= 0:
         raise ValueError("Quantidade de cotas deve ser positiva")
     
-    # TODO: Validar se cotista possui cotas suficientes
+    # Valida saldo (posição confirmada - resgates pendentes)
+    disponivel = saldo_disponivel(fundo_id, cotista_id)
+    if quantidade_cotas > disponivel:
+        raise ValueError(
+            f"Saldo insuficiente: {disponivel} cotas disponíveis para resgate"
+        )
     
     # Determina data de cotização
     data_cotizacao = determinar_data_cotizacao(
@@ -173,9 +176,7 @@ def processar_resgate(
     )
     
     # Data de liquidação para resgates (geralmente D+3)
-    data_liquidacao = data_cotizacao + timedelta(days=3)
-    while data_liquidacao.weekday() >= 5:
-        data_liquidacao += timedelta(days=1)
+    data_liquidacao = somar_dias_uteis(data_cotizacao, 3)
     
     # Cria movimentação
     movimentacao = MovimentacaoCota.objects.create(
@@ -192,6 +193,62 @@ def processar_resgate(
     return movimentacao
 
 
+def _calcular_efetivacao(movimentacao: MovimentacaoCota, valor_cota: Decimal):
+    """
+    Preenche cotas, valores e tributos da movimentação com a cota do dia (sem salvar).
+    Para RESGATE consome os lotes FIFO do cotista.
+    """
+    movimentacao.valor_cota = valor_cota
+    
+    if movimentacao.tipo_movimentacao == 'APLICACAO':
+        # Qtd cotas = Valor / Cota
+        movimentacao.quantidade_cotas = (
+            movimentacao.valor_financeiro / movimentacao.valor_cota
+        ).quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
+        
+        movimentacao.valor_liquido = movimentacao.valor_financeiro
+        movimentacao.status = StatusMovimentacao.CONFIRMADO
+    
+    elif movimentacao.tipo_movimentacao == 'RESGATE':
+        # Consome os lotes FIFO do cotista
+        consumos, nao_coberta = consumir_lotes_fifo(
+            movimentacao.fundo_id,
+            movimentacao.cotista_id,
+            movimentacao.quantidade_cotas
+        )
+        _calcular_resgate(movimentacao, consumos, nao_coberta)
+
+
+def _calcular_resgate(movimentacao: MovimentacaoCota, consumos, nao_coberta: Decimal):
+    """
+    Preenche valores e tributos de um RESGATE (sem salvar) a partir dos lotes
+    consumidos. movimentacao.valor_cota já deve estar definido.
+    """
+    # Valor bruto = Qtd cotas * Cota
+    valor_bruto = movimentacao.quantidade_cotas * movimentacao.valor_cota
+    movimentacao.valor_financeiro = valor_bruto
+    
+    # Calcula IR e IOF por lote (FIFO) com data e custo reais de aquisição
+    impostos = calcular_impostos_lotes(consumos, movimentacao.valor_cota, movimentacao.data_cotizacao)
+    
+    if nao_coberta > 0:
+        # Posição anterior ao livro de lotes: mantém a estimativa antiga
+        valor_bruto_legado = nao_coberta * movimentacao.valor_cota
+        legado = calcular_impostos_resgate(
+            valor_bruto_legado,
+            valor_bruto_legado * Decimal('0.8'),  # 20% de rendimento
+            movimentacao.data_cotizacao - timedelta(days=800),
+            movimentacao.data_cotizacao
+        )
+        impostos['ir_retido'] += legado['ir_retido']
+        impostos['iof_retido'] += legado['iof_retido']
+    
+    movimentacao.ir_retido = impostos['ir_retido']
+    movimentacao.iof_retido = impostos['iof_retido']
+    movimentacao.valor_liquido = valor_bruto - impostos['ir_retido'] - impostos['iof_retido']
+    movimentacao.status = StatusMovimentacao.CONFIRMADO
+
+
 @transaction.atomic  # ⭐ DECORATOR ADICIONADO
 def efetivar_movimentacao(movimentacao_id: str) -> MovimentacaoCota:
     """
@@ -216,51 +273,153 @@ def efetivar_movimentacao(movimentacao_id: str) -> MovimentacaoCota:
     except MovimentacaoCota.DoesNotExist:
         raise ValueError(f"Movimentação {movimentacao_id} não encontrada")
     
+    if movimentacao.status == StatusMovimentacao.CONFIRMADO:
+        raise ValueError(f"Movimentação {movimentacao_id} já confirmada")
+    
     # Busca cota do dia
     try:
         cota_hist = CotaHistorico.objects.get(
-            fundo=movimentacao.fundo,
+            fundo_id=movimentacao.fundo_id,
             data_referencia=movimentacao.data_cotizacao
         )
     except CotaHistorico.DoesNotExist:
         raise ValueError(f"Cota não calculada para {movimentacao.data_cotizacao}")
     
-    movimentacao.valor_cota = cota_hist.valor_cota
+    _calcular_efetivacao(movimentacao, cota_hist.valor_cota)
     
-    if movimentacao.tipo_movimentacao == 'APLICACAO':
-        # Qtd cotas = Valor / Cota
-        movimentacao.quantidade_cotas = (
-            movimentacao.valor_financeiro / movimentacao.valor_cota
-        ).quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
+    movimentacao.save()
+    
+    # Mantém a posição materializada e o livro de lotes do cotista
+    if movimentacao.status == StatusMovimentacao.CONFIRMADO:
+        atualizar_posicao(movimentacao)
+        if movimentacao.tipo_movimentacao == 'APLICACAO':
+            registrar_lote(movimentacao)
+    
+    return movimentacao
+
+
+def efetivar_movimentacoes_em_lote(movimentacao_ids, tamanho_lote: int = 500) -> dict:
+    """
+    Efetiva várias movimentações pendentes de uma vez.
+    
+    Diferente de chamar efetivar_movimentacao() por linha:
+    - Cotas de todos os pares (fundo, data_cotizacao) são buscadas numa única query
+    - Quantidades e tributos são calculados em memória
+    - Cada bloco de `tamanho_lote` movimentações é travado (select_for_update),
+      gravado com bulk_update e atualiza posições/lotes em lote
+    - Os lotes FIFO dos cotistas com resgate são lidos numa única query e
+      consumidos em memória (LivroLotes), com um bulk_update ao final
+    - Erros de uma movimentação não abortam as demais
+    
+    Aplicações são processadas antes dos resgates, para que os lotes FIFO
+    do mesmo dia já existam quando os resgates forem consumidos.
+    
+    Args:
+        movimentacao_ids: UUIDs das movimentações a efetivar
+        tamanho_lote: Movimentações por transação
         
-        movimentacao.valor_liquido = movimentacao.valor_financeiro
-        movimentacao.status = StatusMovimentacao.CONFIRMADO
+    Returns:
+        dict com total, sucesso e lista de erros {'id', 'mensagem'}
+    """
+    pendentes = list(
+        MovimentacaoCota.objects.filter(id__in=list(movimentacao_ids))
+        .values_list('id', 'fundo_id', 'data_cotizacao', 'tipo_movimentacao')
+    )
     
-    elif movimentacao.tipo_movimentacao == 'RESGATE':
-        # Valor bruto = Qtd cotas * Cota
-        valor_bruto = movimentacao.quantidade_cotas * movimentacao.valor_cota
-        movimentacao.valor_financeiro = valor_bruto
+    # Cota de cada (fundo, data_cotizacao) — uma única query
+    cotas = {
+        (fundo_id, data_ref): valor_cota
+        for fundo_id, data_ref, valor_cota in CotaHistorico.objects.filter(
+            fundo_id__in={p[1] for p in pendentes},
+            data_referencia__in={p[2] for p in pendentes},
+        ).values_list('fundo_id', 'data_referencia', 'valor_cota')
+    }
+    
+    # Aplicações primeiro; dentro do tipo, agrupado por (fundo, data)
+    pendentes.sort(key=lambda p: (p[3] != 'APLICACAO', str(p[1]), p[2]))
+    ordem = [p[0] for p in pendentes]
+    
+    sucesso = 0
+    erros = []
+    
+    for inicio in range(0, len(ordem), tamanho_lote):
+        bloco = ordem[inicio:inicio + tamanho_lote]
+        erros_bloco = []
         
-        # Calcula IR e IOF (simplificado - assumindo data aplicação)
-        # Em produção, buscar custo médio real do cotista
-        data_aplicacao_estimada = movimentacao.data_cotizacao - timedelta(days=800)
-        valor_aplicacao_estimado = valor_bruto * Decimal('0.8')  # 20% de rendimento
+        try:
+            with transaction.atomic():
+                por_id = MovimentacaoCota.objects.select_for_update().in_bulk(bloco)
+                movs = [por_id[i] for i in bloco if i in por_id]
+                
+                confirmadas = []
+                aplicacoes = []
+                resgates = []
+                for mov in movs:
+                    if mov.status in (StatusMovimentacao.CONFIRMADO, StatusMovimentacao.CANCELADO):
+                        erros_bloco.append({'id': str(mov.id), 'mensagem': f"Movimentação já {mov.status.lower()}"})
+                        continue
+                    
+                    valor_cota = cotas.get((mov.fundo_id, mov.data_cotizacao))
+                    if valor_cota is None:
+                        erros_bloco.append({'id': str(mov.id), 'mensagem': f"Cota não calculada para {mov.data_cotizacao}"})
+                        continue
+                    
+                    if mov.tipo_movimentacao == 'RESGATE':
+                        resgates.append((mov, valor_cota))
+                        continue
+                    
+                    if mov.tipo_movimentacao != 'APLICACAO':
+                        erros_bloco.append({'id': str(mov.id), 'mensagem': f"Tipo {mov.tipo_movimentacao} não efetivável"})
+                        continue
+                    
+                    try:
+                        _calcular_efetivacao(mov, valor_cota)
+                    except Exception as e:
+                        erros_bloco.append({'id': str(mov.id), 'mensagem': str(e)})
+                        continue
+                    
+                    confirmadas.append(mov)
+                    aplicacoes.append(mov)
+                
+                # Lotes das aplicações antes de consumir os resgates
+                if aplicacoes:
+                    registrar_lotes(aplicacoes)
+                
+                # Resgates: lotes de todos os pares lidos uma vez e consumidos em memória
+                if resgates:
+                    livro = LivroLotes((mov.fundo_id, mov.cotista_id) for mov, _ in resgates)
+                    for mov, valor_cota in resgates:
+                        try:
+                            with livro.consumo(mov.fundo_id, mov.cotista_id, mov.quantidade_cotas) as (consumos, nao_coberta):
+                                mov.valor_cota = valor_cota
+                                _calcular_resgate(mov, consumos, nao_coberta)
+                        except Exception as e:
+                            erros_bloco.append({'id': str(mov.id), 'mensagem': str(e)})
+                            continue
+                        confirmadas.append(mov)
+                    livro.gravar()
+                
+                MovimentacaoCota.objects.bulk_update(
+                    confirmadas,
+                    ['valor_cota', 'quantidade_cotas', 'valor_financeiro',
+                     'ir_retido', 'iof_retido', 'valor_liquido', 'status'],
+                    batch_size=tamanho_lote,
+                )
+                atualizar_posicoes(confirmadas)
         
-        impostos = calcular_impostos_resgate(
-            valor_bruto,
-            valor_aplicacao_estimado,
-            data_aplicacao_estimada,
-            movimentacao.data_cotizacao
-        )
+        except Exception as e:
+            # Falha de banco: o bloco inteiro é revertido
+            erros.extend({'id': str(i), 'mensagem': f"Bloco revertido: {e}"} for i in bloco)
+            continue
         
-        movimentacao.ir_retido = impostos['ir_retido']
-        movimentacao.iof_retido = impostos['iof_retido']
-        movimentacao.valor_liquido = impostos['valor_liquido']
-        movimentacao.status = StatusMovimentacao.CONFIRMADO
-    
-    movimentacao.save()
-    
-    return movimentacao
+        sucesso += len(confirmadas)
+        erros.extend(erros_bloco)
+    
+    return {
+        'total': len(ordem),
+        'sucesso': sucesso,
+        'erros': erros,
+    }
 
 
 @transaction.atomic
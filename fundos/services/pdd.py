@@ -0,0 +1,89 @@
+"""
+Motor de PDD em lote (set-based)
+Referência: Resolução CVM 175/2022 - Anexo II
+
+Calcula faixa e valor da provisão diretamente no banco (CASE sobre dias_atraso),
+sem carregar a carteira de recebíveis em memória. Resultado idêntico a
+tributos.calcular_pdd() aplicado título a título.
+"""
+
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Cast, Floor, Round
+
+from fundos.models import Recebiveis
+from .tributos import FAIXAS_PDD
+
+
+def _case_percentual(campo: str = 'dias_atraso') -> Case:
+    """CASE dias_atraso → percentual inteiro da faixa (0–100)."""
+    return Case(
+        *[
+            When(**{f'{campo}__range': (min_dias, max_dias)}, then=Value(int(percentual * 100)))
+            for min_dias, max_dias, percentual in FAIXAS_PDD
+        ],
+        default=Value(0),
+        output_field=BigIntegerField(),
+    )
+
+
+def expressoes_pdd():
+    """
+    Retorna (expr_percentual, expr_valor) para uso em annotate()/update().
+
+    O valor é calculado em centavos inteiros para reproduzir exatamente o
+    ROUND_HALF_UP de calcular_pdd() em qualquer backend (MySQL, SQLite):
+        pdd_centavos = FLOOR((valor_centavos * pct + 50) / 100)
+    """
+    pct = _case_percentual()
+    valor_centavos = Cast(Round(F('valor_nominal') * Value(100)), BigIntegerField())
+    pdd_centavos = Floor((valor_centavos * pct + Value(50)) / Value(100), output_field=BigIntegerField())
+
+    expr_percentual = Case(
+        When(valor_nominal__lte=0, then=Value(Decimal('0.00'))),
+        default=Cast(pct, DecimalField(max_digits=5, decimal_places=2)),
+        output_field=DecimalField(max_digits=5, decimal_places=2),
+    )
+    expr_valor = Cast(
+        pdd_centavos * Value(Decimal('0.01')),
+        DecimalField(max_digits=16, decimal_places=2),
+    )
+    return expr_percentual, expr_valor
+
+
+def atualizar_pdd_fundo(fundo_id: str) -> Decimal:
+    """
+    Recalcula PDD de todos os recebíveis não baixados do fundo.
+
+    Fluxo:
+    1. Valida dias_atraso (mesma regra de calcular_pdd)
+    2. UPDATE único apenas nas linhas cuja faixa/valor mudou
+    3. SUM(pdd_valor) da carteira
+
+    Args:
+        fundo_id: UUID do fundo
+
+    Returns:
+        Total de PDD da carteira (Decimal, 2 casas)
+    """
+    carteira = Recebiveis.objects.filter(fundo_id=fundo_id).exclude(status='BAIXADO')
+
+    if carteira.filter(dias_atraso__lt=0).exists():
+        raise ValueError("Dias de atraso não pode ser negativo")
+
+    if carteira.filter(valor_nominal__lt=0).exists():
+        raise ValueError("Valor nominal não pode ser negativo")
+
+    expr_percentual, expr_valor = expressoes_pdd()
+
+    with transaction.atomic():
+        (
+            carteira
+            .alias(_pdd_percentual=expr_percentual, _pdd_valor=expr_valor)
+            .exclude(pdd_percentual=F('_pdd_percentual'), pdd_valor=F('_pdd_valor'))
+            .update(pdd_percentual=expr_percentual, pdd_valor=expr_valor)
+        )
+
+    total = carteira.aggregate(total=Sum('pdd_valor'))['total']
+    return total or Decimal('0.00')
@@ -0,0 +1,220 @@
+"""
+Posição Materializada de Cotistas
+
+Mantém PosicaoCotista (fundo, cotista) → quantidade de cotas e custo de aquisição,
+atualizada incrementalmente a cada movimentação confirmada. Contagem de cotistas,
+checagem de saldo e custo médio passam a ser leituras indexadas.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Sum
+
+from fundos.models import LoteCotista, MovimentacaoCota, PosicaoCotista, StatusMovimentacao
+
+
+def _aplicar(posicao: PosicaoCotista, tipo_movimentacao: str, quantidade: Decimal, valor: Decimal, valor_cota: Decimal = None):
+    """
+    Aplica uma movimentação confirmada sobre a posição (em memória).
+    No COME_COTAS o custo passa a ser o valor das cotas restantes na cota do
+    come-cotas (`valor_cota`): o rendimento já tributado não é tributado de novo.
+    """
+    if tipo_movimentacao == 'APLICACAO':
+        posicao.quantidade_cotas += quantidade
+        posicao.custo_total += valor
+
+    elif tipo_movimentacao in ('RESGATE', 'COME_COTAS'):
+        if tipo_movimentacao == 'RESGATE' and posicao.quantidade_cotas > 0:
+            # Baixa o custo proporcional às cotas resgatadas (custo médio)
+            baixa = posicao.custo_total * min(quantidade / posicao.quantidade_cotas, Decimal('1'))
+            posicao.custo_total -= baixa.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        posicao.quantidade_cotas -= quantidade
+        if tipo_movimentacao == 'COME_COTAS' and valor_cota:
+            posicao.custo_total = (posicao.quantidade_cotas * valor_cota).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    if posicao.quantidade_cotas <= 0:
+        posicao.quantidade_cotas = Decimal('0')
+        posicao.custo_total = Decimal('0')
+
+
+@transaction.atomic
+def atualizar_posicao(movimentacao: MovimentacaoCota) -> PosicaoCotista:
+    """
+    Atualiza a posição do cotista com uma movimentação recém-confirmada.
+    Deve ser chamada uma única vez por movimentação (em efetivar_movimentacao).
+    """
+    posicao, _ = PosicaoCotista.objects.select_for_update().get_or_create(
+        fundo_id=movimentacao.fundo_id,
+        cotista_id=movimentacao.cotista_id,
+    )
+
+    _aplicar(
+        posicao,
+        movimentacao.tipo_movimentacao,
+        movimentacao.quantidade_cotas or Decimal('0'),
+        movimentacao.valor_financeiro or Decimal('0'),
+    )
+    posicao.save()
+
+    return posicao
+
+
+def posicoes_bloqueadas(pares) -> dict:
+    """
+    Carrega (com lock) as posições de vários pares (fundo_id, cotista_id),
+    criando as que ainda não existem. Retorna {(fundo_id, cotista_id): posição}.
+    """
+    pares = set(pares)
+    if not pares:
+        return {}
+
+    def _carregar():
+        return {
+            (p.fundo_id, p.cotista_id): p
+            for p in PosicaoCotista.objects.select_for_update().filter(
+                fundo_id__in={f for f, _ in pares},
+                cotista_id__in={c for _, c in pares},
+            )
+            if (p.fundo_id, p.cotista_id) in pares
+        }
+
+    posicoes = _carregar()
+    faltantes = [
+        PosicaoCotista(fundo_id=f, cotista_id=c)
+        for f, c in pares if (f, c) not in posicoes
+    ]
+    if faltantes:
+        PosicaoCotista.objects.bulk_create(faltantes, ignore_conflicts=True)
+        posicoes = _carregar()
+
+    return posicoes
+
+
+@transaction.atomic
+def atualizar_posicoes(movimentacoes: list[MovimentacaoCota]):
+    """
+    Versão em lote de atualizar_posicao(): aplica várias movimentações
+    confirmadas com um único lock e um único bulk_update.
+    """
+    posicoes = posicoes_bloqueadas((m.fundo_id, m.cotista_id) for m in movimentacoes)
+
+    for mov in movimentacoes:
+        _aplicar(
+            posicoes[(mov.fundo_id, mov.cotista_id)],
+            mov.tipo_movimentacao,
+            mov.quantidade_cotas or Decimal('0'),
+            mov.valor_financeiro or Decimal('0'),
+        )
+
+    PosicaoCotista.objects.bulk_update(
+        posicoes.values(), ['quantidade_cotas', 'custo_total'], batch_size=1000
+    )
+
+
+def obter_posicao(fundo_id: str, cotista_id: str) -> PosicaoCotista | None:
+    """Posição atual do cotista no fundo (None se nunca aplicou)."""
+    return PosicaoCotista.objects.filter(fundo_id=fundo_id, cotista_id=cotista_id).first()
+
+
+def saldo_disponivel(fundo_id: str, cotista_id: str) -> Decimal:
+    """
+    Cotas disponíveis para resgate: posição confirmada menos resgates ainda pendentes.
+    """
+    posicao = obter_posicao(fundo_id, cotista_id)
+    if posicao is None:
+        return Decimal('0')
+
+    pendente = MovimentacaoCota.objects.filter(
+        fundo_id=fundo_id,
+        cotista_id=cotista_id,
+        tipo_movimentacao='RESGATE',
+        status=StatusMovimentacao.SOLICITADO,
+    ).aggregate(total=Sum('quantidade_cotas'))['total'] or Decimal('0')
+
+    return posicao.quantidade_cotas - pendente
+
+
+def contar_cotistas(fundo_id: str) -> int:
+    """Cotistas com saldo positivo no fundo."""
+    return PosicaoCotista.objects.filter(fundo_id=fundo_id, quantidade_cotas__gt=0).count()
+
+
+@transaction.atomic
+def reconstruir_posicoes(fundo_id: str = None) -> int:
+    """
+    Reconstrói posições e lotes FIFO a partir de todo o histórico de
+    movimentações confirmadas.
+
+    Percorre as movimentações em ordem de cotização (streaming) e grava o
+    resultado com bulk_create, substituindo posições e lotes existentes.
+
+    Args:
+        fundo_id: Restringe a um fundo (default: todos)
+
+    Returns:
+        Quantidade de posições gravadas
+    """
+    movimentacoes = MovimentacaoCota.objects.filter(status=StatusMovimentacao.CONFIRMADO)
+    posicoes_qs = PosicaoCotista.objects.all()
+    lotes_qs = LoteCotista.objects.all()
+    if fundo_id:
+        movimentacoes = movimentacoes.filter(fundo_id=fundo_id)
+        posicoes_qs = posicoes_qs.filter(fundo_id=fundo_id)
+        lotes_qs = lotes_qs.filter(fundo_id=fundo_id)
+
+    posicoes = {}
+    lotes = {}  # chave → lista de LoteCotista em ordem FIFO
+    for mov in movimentacoes.order_by('data_cotizacao', 'data_solicitacao').values(
+        'id', 'fundo_id', 'cotista_id', 'tipo_movimentacao', 'data_cotizacao',
+        'valor_cota', 'quantidade_cotas', 'valor_financeiro'
+    ).iterator(chunk_size=5000):
+        chave = (mov['fundo_id'], mov['cotista_id'])
+        posicao = posicoes.get(chave)
+        if posicao is None:
+            posicao = posicoes[chave] = PosicaoCotista(
+                fundo_id=mov['fundo_id'],
+                cotista_id=mov['cotista_id'],
+                quantidade_cotas=Decimal('0'),
+                custo_total=Decimal('0'),
+            )
+            lotes[chave] = []
+        quantidade = mov['quantidade_cotas'] or Decimal('0')
+        _aplicar(posicao, mov['tipo_movimentacao'], quantidade, mov['valor_financeiro'] or Decimal('0'), mov['valor_cota'])
+
+        fila = lotes[chave]
+        if mov['tipo_movimentacao'] == 'APLICACAO':
+            posicao.ultimo_lote += 1
+            fila.append(LoteCotista(
+                fundo_id=mov['fundo_id'],
+                cotista_id=mov['cotista_id'],
+                movimentacao_id=mov['id'],
+                sequencia=posicao.ultimo_lote,
+                data_aplicacao=mov['data_cotizacao'],
+                valor_cota_aquisicao=mov['valor_cota'] or Decimal('0'),
+                quantidade_inicial=quantidade,
+                quantidade_saldo=quantidade,
+            ))
+        elif mov['tipo_movimentacao'] in ('RESGATE', 'COME_COTAS'):
+            # Consome FIFO a partir do cursor
+            while quantidade > 0 and posicao.lote_cursor <= len(fila):
+                lote = fila[posicao.lote_cursor - 1]
+                consumido = min(lote.quantidade_saldo, quantidade)
+                lote.quantidade_saldo -= consumido
+                quantidade -= consumido
+                if lote.quantidade_saldo > 0:
+                    break
+                posicao.lote_cursor += 1
+            if mov['tipo_movimentacao'] == 'COME_COTAS' and mov['valor_cota']:
+                # Custo dos lotes restantes sobe para a cota do come-cotas
+                for lote in fila[posicao.lote_cursor - 1:]:
+                    lote.valor_cota_aquisicao = mov['valor_cota']
+
+    lotes_qs.delete()
+    posicoes_qs.delete()
+    PosicaoCotista.objects.bulk_create(posicoes.values(), batch_size=1000)
+    LoteCotista.objects.bulk_create(
+        (lote for fila in lotes.values() for lote in fila),
+        batch_size=1000,
+    )
+
+    return len(posicoes)
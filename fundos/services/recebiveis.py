@@ -0,0 +1,55 @@
+"""
+Persistência de Recebíveis em Lote
+
+Grava os títulos de uma cessão numa transação: uma pré-consulta sobre o
+índice (fundo, numero_titulo, sacado_cpf_cnpj) identifica os já cadastrados
+e os novos entram com bulk_create em blocos de RECEBIVEIS_BULK_BATCH_SIZE.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from fundos.models import Fundo, Recebiveis
+
+
+RECEBIVEIS_BULK_BATCH_SIZE = getattr(settings, 'RECEBIVEIS_BULK_BATCH_SIZE', 500)
+
+
+def _chave(recebivel: Recebiveis) -> tuple[str, str]:
+    return recebivel.numero_titulo, recebivel.sacado_cpf_cnpj
+
+
+@transaction.atomic
+def inserir_recebiveis_novos(fundo: Fundo, recebiveis: list[Recebiveis], batch_size: int | None = None) -> dict:
+    """
+    Insere os recebíveis (ainda não salvos) do fundo, ignorando os que já
+    existem — mesmo (fundo, numero_titulo, sacado_cpf_cnpj) — ou que se
+    repetem na própria lista.
+
+    Returns:
+        dict com 'inseridos', 'ignorados' e 'duplicados' (chaves ignoradas)
+    """
+    # Serializa cessões simultâneas do mesmo fundo entre a pré-consulta e o INSERT
+    Fundo.objects.select_for_update().filter(pk=fundo.pk).exists()
+
+    existentes = set(
+        Recebiveis.objects.filter(
+            fundo=fundo,
+            numero_titulo__in={r.numero_titulo for r in recebiveis},
+            sacado_cpf_cnpj__in={r.sacado_cpf_cnpj for r in recebiveis},
+        ).values_list('numero_titulo', 'sacado_cpf_cnpj')
+    )
+
+    novos, duplicados = [], []
+    for recebivel in recebiveis:
+        chave = _chave(recebivel)
+        if chave in existentes:
+            duplicados.append(chave)
+            continue
+        existentes.add(chave)
+        recebivel.fundo = fundo
+        novos.append(recebivel)
+
+    Recebiveis.objects.bulk_create(novos, batch_size=batch_size or RECEBIVEIS_BULK_BATCH_SIZE)
+
+    return {'inseridos': len(novos), 'ignorados': len(duplicados), 'duplicados': duplicados}
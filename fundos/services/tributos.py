@@ -10,6 +10,20 @@ from decimal import Decimal, ROUND_HALF_UP
 from typing import Tuple
 
 
+# Faixas de provisão (dias_min, dias_max, percentual) — Resolução CVM 175/2022, Anexo II.
+# Compartilhadas entre o cálculo escalar (calcular_pdd) e o motor em lote (services/pdd.py).
+FAIXAS_PDD = [
+    (0, 30, Decimal('0.00')),
+    (31, 60, Decimal('0.01')),
+    (61, 90, Decimal('0.03')),
+    (91, 120, Decimal('0.10')),
+    (121, 150, Decimal('0.30')),
+    (151, 180, Decimal('0.50')),
+    (181, 360, Decimal('0.75')),
+    (361, 999999, Decimal('1.00')),
+]
+
+
 def calcular_pdd(dias_atraso: int, valor_nominal: Decimal) -> Decimal:
     """
     Calcula Provisão para Devedores Duvidosos conforme Resolução CVM 175/2022 - Anexo II.
@@ -37,18 +51,7 @@ def calcular_pdd(dias_atraso: int, valor_nominal: Decimal) -> Decimal:
     if valor_nominal < 0:
         raise ValueError("Valor nominal não pode ser negativo")
     
-    faixas = {
-        (0, 30): Decimal('0.00'),
-        (31, 60): Decimal('0.01'),
-        (61, 90): Decimal('0.03'),
-        (91, 120): Decimal('0.10'),
-        (121, 150): Decimal('0.30'),
-        (151, 180): Decimal('0.50'),
-        (181, 360): Decimal('0.75'),
-        (361, 999999): Decimal('1.00')
-    }
-    
-    for (min_dias, max_dias), percentual in faixas.items():
+    for min_dias, max_dias, percentual in FAIXAS_PDD:
         if min_dias <= dias_atraso <= max_dias:
             pdd = valor_nominal * percentual
             return pdd.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -175,6 +178,39 @@ def calcular_come_cotas(
     return valor_cota_atual, cotas_a_reduzir.quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
 
 
+def calcular_come_cotas_cotista(
+    valor_posicao: Decimal,
+    custo_aplicacao: Decimal,
+    valor_cota: Decimal,
+    aliquota: Decimal = Decimal('0.15')
+) -> Tuple[Decimal, Decimal]:
+    """
+    Calcula o come-cotas de uma posição individual, sobre o rendimento
+    efetivo do cotista (valor da posição menos custo de aquisição).
+
+    Args:
+        valor_posicao: Valor atual da posição (cotas × valor da cota)
+        custo_aplicacao: Custo de aquisição das cotas em carteira
+        valor_cota: Valor da cota na data do come-cotas
+        aliquota: Alíquota (padrão 15% para fundos de longo prazo)
+
+    Returns:
+        Tuple (ir_devido, cotas_a_reduzir)
+    """
+    if valor_cota <= 0:
+        raise ValueError("Valor da cota deve ser positivo")
+
+    rendimento = valor_posicao - custo_aplicacao
+
+    if rendimento <= 0:
+        return Decimal('0.00'), Decimal('0.000000')
+
+    ir_devido = (rendimento * aliquota).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    cotas_a_reduzir = (ir_devido / valor_cota).quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
+
+    return ir_devido, cotas_a_reduzir
+
+
 def calcular_impostos_resgate(
     valor_bruto: Decimal,
     valor_aplicacao: Decimal,
@@ -0,0 +1,184 @@
+"""
+Cálculos Tributários em Lote (NumPy)
+
+Versões vetorizadas de calcular_ir_resgate, calcular_iof e
+calcular_come_cotas_cotista para avaliar carteiras inteiras de cotistas
+(ex.: come-cotas de maio/novembro) sem um laço Python por posição.
+
+Toda a aritmética é inteira — valores em centavos, cotas e valor da cota em
+milionésimos — com arredondamento ROUND_HALF_UP idêntico ao das funções
+escalares de tributos.py. Quando os produtos intermediários não cabem em
+int64 o cálculo é feito com inteiros Python (dtype=object), sem perda de exatidão.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+
+_INT64_SEGURO = 2 ** 62
+
+# Tabela regressiva de IR (dias_max, alíquota em milésimos) — Lei 11.033/2004
+_FAIXAS_IR = [
+    (180, 225),
+    (360, 200),
+    (720, 175),
+]
+_ALIQUOTA_IR_MINIMA = 150
+
+# IOF: 96% - 3,33% por dia, em décimos de milésimo; 1% do valor resgatado
+_IOF_BASE = 9600
+_IOF_DECREMENTO = 333
+_IOF_DIAS_ISENCAO = 30
+
+
+def _array_inteiro(valores) -> np.ndarray:
+    try:
+        return np.asarray(valores, dtype=np.int64)
+    except OverflowError:
+        return np.asarray(valores, dtype=object)
+
+
+def _para_inteiros(valores, casas: int) -> np.ndarray:
+    quantum = Decimal(1).scaleb(-casas)
+    return _array_inteiro([
+        int(Decimal(v).quantize(quantum, rounding=ROUND_HALF_UP).scaleb(casas))
+        for v in valores
+    ])
+
+
+def para_centavos(valores) -> np.ndarray:
+    """Converte valores monetários (Decimal/str/int) em centavos, ROUND_HALF_UP."""
+    return _para_inteiros(valores, 2)
+
+
+def para_milionesimos(valores) -> np.ndarray:
+    """Converte cotas ou valores de cota em milionésimos (6 casas), ROUND_HALF_UP."""
+    return _para_inteiros(valores, 6)
+
+
+def de_centavos(centavos) -> list[Decimal]:
+    return [Decimal(int(c)).scaleb(-2) for c in centavos]
+
+
+def de_milionesimos(milionesimos) -> list[Decimal]:
+    return [Decimal(int(m)).scaleb(-6) for m in milionesimos]
+
+
+def _inteiros(nome: str, valores) -> np.ndarray:
+    arr = np.asarray(valores)
+    if arr.dtype != object and not np.issubdtype(arr.dtype, np.integer):
+        raise ValueError(f"{nome} deve conter inteiros (use para_centavos/para_milionesimos)")
+    return arr
+
+
+def _maximo(arr: np.ndarray) -> int:
+    return int(np.abs(arr).max()) if arr.size else 0
+
+
+def _ajustar(limite: int, *arrays):
+    """Converte os arrays para int64, ou para inteiros Python se `limite` estoura int64."""
+    dtype = np.int64 if limite < _INT64_SEGURO else object
+    return [a.astype(dtype) for a in arrays]
+
+
+def _dividir_arredondando(numerador, denominador):
+    """numerador / denominador (> 0) arredondado ROUND_HALF_UP (afastando do zero)."""
+    magnitude = (2 * np.abs(numerador) + denominador) // (2 * denominador)
+    return np.where(numerador < 0, -magnitude, magnitude)
+
+
+def _validar_dias(dias: np.ndarray):
+    if dias.size and dias.min() < 0:
+        raise ValueError("Dias aplicado não pode ser negativo")
+
+
+def calcular_ir_resgate_lote(valor_resgate, valor_aplicacao, dias_aplicado) -> np.ndarray:
+    """
+    IR regressivo para várias posições.
+
+    Args:
+        valor_resgate: Valores brutos de resgate (centavos)
+        valor_aplicacao: Custos de aquisição (centavos)
+        dias_aplicado: Dias corridos desde a aplicação
+
+    Returns:
+        Array com o IR a reter (centavos)
+    """
+    resgate = _inteiros('valor_resgate', valor_resgate)
+    aplicacao = _inteiros('valor_aplicacao', valor_aplicacao)
+    dias = _inteiros('dias_aplicado', dias_aplicado)
+    _validar_dias(dias)
+
+    rendimento = np.maximum(resgate - aplicacao, 0)
+
+    aliquota = np.full(dias.shape, _ALIQUOTA_IR_MINIMA, dtype=np.int64)
+    for dias_max, milesimos in reversed(_FAIXAS_IR):
+        aliquota = np.where(dias <= dias_max, milesimos, aliquota)
+
+    rendimento, aliquota = _ajustar(_maximo(rendimento) * 2 * 225 + 1000, rendimento, aliquota)
+    return _dividir_arredondando(rendimento * aliquota, 1000)
+
+
+def calcular_iof_lote(valor_resgate, dias_aplicado) -> np.ndarray:
+    """
+    IOF regressivo para várias posições (mesma tabela de calcular_iof).
+
+    Args:
+        valor_resgate: Valores de resgate (centavos)
+        dias_aplicado: Dias corridos desde a aplicação
+
+    Returns:
+        Array com o IOF a reter (centavos)
+    """
+    resgate = _inteiros('valor_resgate', valor_resgate)
+    dias = _inteiros('dias_aplicado', dias_aplicado)
+    _validar_dias(dias)
+
+    percentual = np.where(
+        dias >= _IOF_DIAS_ISENCAO,
+        0,
+        np.maximum(_IOF_BASE - np.minimum(dias, _IOF_DIAS_ISENCAO) * _IOF_DECREMENTO, 0),
+    )
+
+    resgate, percentual = _ajustar(_maximo(resgate) * 2 * _IOF_BASE + 1_000_000, resgate, percentual)
+    # centavos × (percentual / 10⁴) × 1%
+    return _dividir_arredondando(resgate * percentual, 1_000_000)
+
+
+def calcular_come_cotas_lote(
+    valor_posicao,
+    custo_aplicacao,
+    valor_cota,
+    aliquota: Decimal = Decimal('0.15')
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Come-cotas de várias posições (mesma regra de calcular_come_cotas_cotista).
+
+    Args:
+        valor_posicao: Valores atuais das posições (centavos)
+        custo_aplicacao: Custos de aquisição (centavos)
+        valor_cota: Valor da cota (milionésimos) — escalar ou um por posição
+        aliquota: Alíquota do come-cotas
+
+    Returns:
+        Tuple (ir_devido em centavos, cotas_a_reduzir em milionésimos)
+    """
+    posicao = _inteiros('valor_posicao', valor_posicao)
+    custo = _inteiros('custo_aplicacao', custo_aplicacao)
+    cota = np.broadcast_to(_inteiros('valor_cota', valor_cota), posicao.shape)
+
+    if cota.size and cota.min() <= 0:
+        raise ValueError("Valor da cota deve ser positivo")
+
+    num, den = Decimal(aliquota).as_integer_ratio()
+    rendimento = np.maximum(posicao - custo, 0)
+
+    (rendimento,) = _ajustar(_maximo(rendimento) * 2 * num + den, rendimento)
+    ir = _dividir_arredondando(rendimento * num, den)
+
+    # cotas = (ir / 100) / (cota / 10⁶) → em milionésimos: ir × 10¹⁰ / cota
+    ir_calc, cota = _ajustar(_maximo(ir) * 2 * 10 ** 10 + _maximo(cota), ir, cota)
+    cotas = _dividir_arredondando(ir_calc * 10 ** 10, cota)
+
+    return ir, cotas
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Fundo
+from .services.listagem import invalidar_listagem_fundos
+
+
+@receiver(pre_save, sender=Fundo)
+def guardar_empresa_anterior(sender, instance, **kwargs):
+    # Um fundo que muda de empresa também sai da listagem da empresa anterior
+    instance._empresa_anterior_id = None if instance._state.adding else (
+        sender.objects.filter(pk=instance.pk).values_list('empresa_id', flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Fundo)
+def invalidar_cache_listagem(sender, instance, **kwargs):
+    invalidar_listagem_fundos(instance.empresa_id)
+    anterior = getattr(instance, '_empresa_anterior_id', None)
+    if anterior is not None and anterior != instance.empresa_id:
+        invalidar_listagem_fundos(anterior)
@@ -1,14 +1,18 @@
 # fundos/tasks.py
 
-from celery import shared_task
+from celery import shared_task, chord, group
+from django.core.cache import cache
 from django.core.mail import send_mail
 from django.conf import settings
 from datetime import date, timedelta
 from decimal import Decimal
+from django.db.models import Q
+from django.utils import timezone
 import logging
 
 from .models import Fundo, MovimentacaoCota, Recebiveis
-from .services.movimentacoes import efetivar_movimentacao
+from .services.movimentacoes import efetivar_movimentacoes_em_lote
+from .services.calendario import eh_dia_util, dia_util_anterior, somar_dias_uteis
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +24,7 @@ def calcular_cotas_diarias():
     """
     DEPRECATED — cálculo diário substituído por importação do Informe Mensal XML.
     Mantido apenas para referência. Não registrar no Celery Beat.
+    Para fechamento em lote use fechar_cotas_diarias (um subtask por fundo).
     """
     try:
         fundos = Fundo.objects.filter(ativo=True)
@@ -67,63 +72,157 @@ def calcular_cotas_diarias():
         raise self.retry(exc=e, countdown=300)  # Retry em 5 minutos
 
 
+# Máximo de fechamentos simultâneos por banco de dados (slots de semáforo no cache).
+# O semáforo depende do cache compartilhado (Redis): com um cache por processo não limita nada.
+COTAS_MAX_PARALELO_POR_BANCO = getattr(settings, 'COTAS_MAX_PARALELO_POR_BANCO', 8)
+# O fechamento de um fundo é interrompido em COTAS_FUNDO_TIME_LIMIT (soft) e morto
+# 30s depois; o slot expira só após isso. Um detentor vivo nunca perde o slot, e o
+# de uma task morta volta sozinho, sem recuperação (não atômica) por outras tasks.
+COTAS_FUNDO_TIME_LIMIT = getattr(settings, 'COTAS_FUNDO_TIME_LIMIT', 5 * 60)
+COTAS_SLOT_TIMEOUT = COTAS_FUNDO_TIME_LIMIT + 60
+# Espera por slot: backoff exponencial (5s, 10s, 20s... até 5 min) por no máximo N tentativas
+COTAS_SLOT_MAX_TENTATIVAS = getattr(settings, 'COTAS_SLOT_MAX_TENTATIVAS', 20)
+COTAS_SLOT_ESPERA_MAX = 5 * 60
+
+
+def _adquirir_slot_banco(alias, task_id):
+    """Tenta ocupar um dos slots de fechamento do banco. Retorna a chave ou None."""
+    for i in range(COTAS_MAX_PARALELO_POR_BANCO):
+        chave = f'cotas:slot:{alias}:{i}'
+        if cache.add(chave, task_id, timeout=COTAS_SLOT_TIMEOUT):
+            return chave
+    return None
+
+
+def _liberar_slot_banco(chave, task_id):
+    # O slot só expira depois do time limit da task, então enquanto ela roda
+    # ninguém mais o ocupa; a checagem protege contra liberar o slot de outra task
+    if cache.get(chave) == task_id:
+        cache.delete(chave)
+
+
+@shared_task
+def fechar_cotas_diarias(data_iso=None):
+    """
+    Orquestra o fechamento de cotas de todos os fundos ativos.
+
+    Dispara uma subtask por fundo (group) e consolida os resultados num único
+    callback (chord). O tempo total passa a ser o do fundo mais lento, limitado
+    por COTAS_MAX_PARALELO_POR_BANCO fechamentos simultâneos no mesmo banco.
+    """
+    data_iso = data_iso or date.today().isoformat()
+    if not eh_dia_util(date.fromisoformat(data_iso)):
+        logger.info(f"[COTAS] {data_iso} não é dia útil — fechamento ignorado")
+        return {'data': data_iso, 'total_fundos': 0}
+
+    fundo_ids = [str(pk) for pk in Fundo.objects.filter(ativo=True).values_list('id', flat=True)]
+
+    logger.info(f"[COTAS] Disparando fechamento de {len(fundo_ids)} fundos para {data_iso}")
+
+    if not fundo_ids:
+        return {'data': data_iso, 'total_fundos': 0}
+
+    chord(
+        group(calcular_cota_fundo_task.s(fundo_id, data_iso) for fundo_id in fundo_ids)
+    )(consolidar_fechamento_cotas.s(data_iso))
+
+    return {'data': data_iso, 'total_fundos': len(fundo_ids)}
+
+
+@shared_task(
+    bind=True, max_retries=None,
+    soft_time_limit=COTAS_FUNDO_TIME_LIMIT, time_limit=COTAS_FUNDO_TIME_LIMIT + 30,
+)
+def calcular_cota_fundo_task(self, fundo_id, data_iso, alias='default'):
+    """
+    Fecha a cota de um único fundo. Nunca levanta exceção: erros voltam no
+    resultado para que o chord sempre chegue ao callback de consolidação.
+    """
+    from .services.cota import calcular_cota_fechamento
+
+    slot = _adquirir_slot_banco(alias, self.request.id)
+    if slot is None:
+        tentativa = self.request.retries
+        if tentativa >= COTAS_SLOT_MAX_TENTATIVAS:
+            logger.error(f"[COTAS] ❌ {fundo_id}: banco {alias} saturado após {tentativa} tentativas")
+            return {
+                'fundo_id': fundo_id, 'status': 'erro',
+                'mensagem': f'Banco saturado: nenhum slot livre após {tentativa} tentativas.',
+            }
+        # Banco saturado — reenfileira com backoff exponencial
+        raise self.retry(countdown=min(5 * 2 ** tentativa, COTAS_SLOT_ESPERA_MAX))
+
+    try:
+        resultado = calcular_cota_fechamento(fundo_id, date.fromisoformat(data_iso))
+        logger.info(
+            f"[COTAS] ✅ {fundo_id}: "
+            f"R$ {resultado['valor_cota']:.6f} | "
+            f"PL: R$ {resultado['patrimonio_liquido']:,.2f}"
+        )
+        return {'fundo_id': fundo_id, 'status': 'ok', **resultado}
+
+    except Exception as e:
+        logger.error(f"[COTAS] ❌ {fundo_id}: {e}")
+        return {'fundo_id': fundo_id, 'status': 'erro', 'mensagem': str(e)}
+
+    finally:
+        _liberar_slot_banco(slot, self.request.id)
+
+
+@shared_task
+def consolidar_fechamento_cotas(resultados, data_iso):
+    """
+    Callback do chord: resume o fechamento e envia um único email de alerta.
+    """
+    sucesso = [r for r in resultados if r['status'] == 'ok']
+    erros = [f"Fundo {r['fundo_id']}: {r['mensagem']}" for r in resultados if r['status'] != 'ok']
+
+    if erros:
+        enviar_email_alerta_task.delay(
+            assunto=f"⚠️ Cálculo de Cotas - {len(sucesso)} OK / {len(erros)} Erros",
+            mensagem=f"Data: {data_iso}\nSucesso: {len(sucesso)}\n\nErros:\n" + "\n".join(erros)
+        )
+
+    logger.info(f"[COTAS] Finalizado {data_iso}: {len(sucesso)} sucesso, {len(erros)} erros")
+
+    return {
+        'data': data_iso,
+        'total_fundos': len(resultados),
+        'sucesso': len(sucesso),
+        'erros': len(erros)
+    }
+
+
 @shared_task(bind=True, max_retries=3)
 def efetivar_movimentacoes_pendentes(self):
     """
     Task que efetiva aplicações e resgates pendentes
-    Executa às 8h via Celery Beat
+    Executa às 8h (seg-sex) via Celery Beat; efetiva as cotizações do
+    último dia útil e não faz nada em feriados.
     """
     try:
-        ontem = date.today() - timedelta(days=1)
-        
-        # Buscar aplicações pendentes
-        aplicacoes = MovimentacaoCota.objects.filter(
-            tipo_movimentacao='APLICACAO',
-            status='AGUARDANDO_PAGAMENTO',
+        hoje = date.today()
+        if not eh_dia_util(hoje):
+            logger.info(f"[EFETIVAÇÃO] {hoje} não é dia útil — nada a efetivar")
+            return {'data': hoje.isoformat(), 'total': 0, 'sucesso': 0, 'erros': 0}
+        ontem = dia_util_anterior(hoje)
+        
+        # Buscar aplicações e resgates pendentes
+        pendentes = MovimentacaoCota.objects.filter(
+            Q(tipo_movimentacao='APLICACAO', status='AGUARDANDO_PAGAMENTO') |
+            Q(tipo_movimentacao='RESGATE', status='SOLICITADO'),
             data_cotizacao=ontem
-        )
+        ).values_list('id', flat=True)
         
-        # Buscar resgates pendentes
-        resgates = MovimentacaoCota.objects.filter(
-            tipo_movimentacao='RESGATE',
-            status='SOLICITADO',
-            data_cotizacao=ontem
-        )
+        # Efetivação em lote: uma cota por (fundo, data), bulk_update por bloco
+        resultado = efetivar_movimentacoes_em_lote(pendentes)
         
-        total = aplicacoes.count() + resgates.count()
-        
-        logger.info(
-            f"[EFETIVAÇÃO] Iniciando: {aplicacoes.count()} aplicações + "
-            f"{resgates.count()} resgates = {total} movimentações"
-        )
-        
-        sucesso = 0
-        erros = []
-        
-        # Efetivar aplicações
-        for app in aplicacoes:
-            try:
-                efetivar_movimentacao(str(app.id))
-                logger.info(f"[EFETIVAÇÃO] ✅ Aplicação {app.id}: {app.quantidade_cotas} cotas")
-                sucesso += 1
-            except Exception as e:
-                erro_msg = f"Aplicação {app.id}: {str(e)}"
-                logger.error(f"[EFETIVAÇÃO] ❌ {erro_msg}")
-                erros.append(erro_msg)
+        total = resultado['total']
+        sucesso = resultado['sucesso']
+        erros = [f"Movimentação {e['id']}: {e['mensagem']}" for e in resultado['erros']]
         
-        # Efetivar resgates
-        for resgate in resgates:
-            try:
-                efetivar_movimentacao(str(resgate.id))
-                logger.info(
-                    f"[EFETIVAÇÃO] ✅ Resgate {resgate.id}: "
-                    f"R$ {resgate.valor_liquido:,.2f}"
-                )
-                sucesso += 1
-            except Exception as e:
-                erro_msg = f"Resgate {resgate.id}: {str(e)}"
-                logger.error(f"[EFETIVAÇÃO] ❌ {erro_msg}")
-                erros.append(erro_msg)
+        for erro_msg in erros:
+            logger.error(f"[EFETIVAÇÃO] ❌ {erro_msg}")
         
         # Enviar email de resumo
         if erros:
@@ -146,6 +245,177 @@ def efetivar_movimentacoes_pendentes(self):
         raise self.retry(exc=e, countdown=300)
 
 
+@shared_task
+def executar_come_cotas_semestral(data_iso=None):
+    """
+    Come-cotas de todos os fundos ativos no último dia útil de maio e novembro.
+    Agendada diariamente no fim desses meses; nos demais dias não faz nada.
+    Reexecutar retoma apenas os fundos que ainda não concluíram o semestre.
+    """
+    from .services.come_cotas import executar_come_cotas
+
+    data = date.fromisoformat(data_iso) if data_iso else date.today()
+    if data_iso is None and not (
+        data.month in (5, 11) and eh_dia_util(data) and somar_dias_uteis(data, 1).month != data.month
+    ):
+        return {'data': data.isoformat(), 'executado': False}
+
+    resultado = executar_come_cotas(data)
+    executados = [r for r in resultado['resultados'] if r['status'] == 'executado']
+
+    logger.info(
+        f"[COME-COTAS] {data}: {len(executados)} fundos executados, "
+        f"{len(resultado['resultados']) - len(executados)} já executados, {len(resultado['erros'])} erros"
+    )
+
+    if resultado['erros']:
+        enviar_email_alerta_task.delay(
+            assunto=f"⚠️ Come-Cotas {data} - {len(resultado['erros'])} Erros",
+            mensagem="\n".join(f"Fundo {e['fundo_id']}: {e['mensagem']}" for e in resultado['erros'])
+        )
+
+    return {
+        'data': data.isoformat(),
+        'executado': True,
+        'fundos': len(executados),
+        'cotistas': sum(r['cotistas'] for r in executados),
+        'erros': len(resultado['erros']),
+    }
+
+
+@shared_task
+def importar_lote_zip_task(importacao_id):
+    """
+    Processa um ZIP de informes enviado pela tela de importação.
+    O progresso (arquivos processados e resultado de cada um) é gravado em
+    ImportacaoInformeLote após o commit de cada lote de persistência.
+    """
+    from .models import ImportacaoInformeLote, StatusImportacao
+    from .services.importar_informe import importar_lote_zip, importar_lote_zip_empresa
+
+    importacao = ImportacaoInformeLote.objects.select_related('empresa', 'fundo', 'criado_por').get(id=importacao_id)
+    if importacao.finalizada:
+        return {'importacao_id': str(importacao.id), 'status': importacao.status}
+
+    registro = ImportacaoInformeLote.objects.filter(id=importacao.id)
+    # update() não preenche auto_now: atualizado_em marca o último progresso (ver reciclar_importacoes_travadas).
+    # Condicional: uma importação já reciclada enquanto esperava na fila não é retomada.
+    iniciada = registro.filter(
+        status__in=[StatusImportacao.PENDENTE, StatusImportacao.PROCESSANDO],
+    ).update(status=StatusImportacao.PROCESSANDO, atualizado_em=timezone.now())
+    if not iniciada:
+        return {'importacao_id': str(importacao.id), 'status': StatusImportacao.ERRO}
+
+    def _progresso(resultados, total):
+        registro.update(total=total, processados=len(resultados), resultados=resultados, atualizado_em=timezone.now())
+
+    try:
+        with importacao.arquivo.open('rb') as f:
+            zip_bytes = f.read()
+        if importacao.fundo_id:
+            resultados = importar_lote_zip(
+                zip_bytes=zip_bytes,
+                fundo=importacao.fundo,
+                user=importacao.criado_por,
+                progresso=_progresso,
+            )
+        else:
+            resultados = importar_lote_zip_empresa(
+                zip_bytes=zip_bytes,
+                empresa=importacao.empresa,
+                user=importacao.criado_por,
+                progresso=_progresso,
+            )
+    except Exception as e:
+        logger.error(f"[INFORMES] Importação {importacao.id}: {e}")
+        registro.update(status=StatusImportacao.ERRO, mensagem=str(e), atualizado_em=timezone.now())
+        _descartar_zip(importacao)
+        return {'importacao_id': str(importacao.id), 'status': StatusImportacao.ERRO}
+
+    ok_count = sum(1 for r in resultados if r['status'] == 'ok')
+    inalterados = sum(1 for r in resultados if r['status'] == 'inalterado')
+    registro.update(
+        status=StatusImportacao.CONCLUIDO,
+        mensagem=f'{ok_count} de {len(resultados)} informe(s) importado(s)'
+        + (f'; {inalterados} inalterado(s).' if inalterados else '.'),
+        atualizado_em=timezone.now(),
+    )
+    _descartar_zip(importacao)
+    logger.info(
+        f"[INFORMES] Importação {importacao.id}: {ok_count}/{len(resultados)} importados, "
+        f"{inalterados} inalterados"
+    )
+
+    return {
+        'importacao_id': str(importacao.id),
+        'status': StatusImportacao.CONCLUIDO,
+        'importados': ok_count,
+        'inalterados': inalterados,
+        'erros': len(resultados) - ok_count - inalterados,
+    }
+
+
+def _descartar_zip(importacao):
+    """Remove o ZIP enviado de uma importação finalizada (o relatório fica no registro)."""
+    from .models import ImportacaoInformeLote
+
+    if not importacao.arquivo:
+        return
+    try:
+        importacao.arquivo.delete(save=False)
+    except Exception as e:
+        logger.warning(f"[INFORMES] ZIP da importação {importacao.id} não removido: {e}")
+        return
+    ImportacaoInformeLote.objects.filter(id=importacao.id).update(arquivo='')
+
+
+# Sem progresso por mais que isso (s), uma importação em PENDENTE ou PROCESSANDO é dada como interrompida
+INFORME_IMPORT_TIMEOUT = getattr(settings, 'INFORME_IMPORT_TIMEOUT', 35 * 60)
+
+
+@shared_task
+def reciclar_importacoes_travadas():
+    """
+    Finaliza com ERRO as importações sem progresso há mais de
+    INFORME_IMPORT_TIMEOUT segundos: em PROCESSANDO (worker morto pelo time
+    limit ou reiniciado) ou ainda em PENDENTE (nenhum worker consumindo a
+    fila 'importacao'). Os lotes já confirmados permanecem; reenviar o ZIP
+    importa só o que falta.
+    """
+    from .models import ImportacaoInformeLote, StatusImportacao
+
+    limite = timezone.now() - timedelta(seconds=INFORME_IMPORT_TIMEOUT)
+    travadas = ImportacaoInformeLote.objects.filter(
+        status__in=[StatusImportacao.PENDENTE, StatusImportacao.PROCESSANDO],
+        atualizado_em__lt=limite,
+    )
+
+    recicladas = 0
+    for importacao in travadas:
+        if importacao.status == StatusImportacao.PENDENTE:
+            mensagem = 'Importação não foi iniciada: nenhum worker processou a fila de importação. Reenvie o ZIP.'
+        else:
+            mensagem = (
+                f'Importação interrompida após {importacao.processados} de {importacao.total} arquivo(s). '
+                'Reenvie o ZIP para concluir: arquivos já importados são ignorados.'
+            )
+        atualizadas = ImportacaoInformeLote.objects.filter(
+            id=importacao.id, status=importacao.status, atualizado_em__lt=limite,
+        ).update(
+            status=StatusImportacao.ERRO,
+            mensagem=mensagem,
+            atualizado_em=timezone.now(),
+        )
+        if atualizadas:
+            logger.warning(
+                f"[INFORMES] Importação {importacao.id} sem progresso em {importacao.status} — marcada como ERRO"
+            )
+            _descartar_zip(importacao)
+            recicladas += 1
+
+    return {'recicladas': recicladas}
+
+
 # DEPRECATED: envio ANBIMA diário substituído pelo fluxo de Informe Mensal XML
 # @shared_task
 # def enviar_cotas_anbima_diarias():
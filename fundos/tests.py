@@ -1,3 +1,973 @@
-from django.test import TestCase
+import io
+import os
+import random
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from usuarios.models import Empresa
+from .models import Ativo, CotaHistorico, Cotista, Fundo, ImportacaoInformeLote, InformeMensal, InformeMensalBruto, LoteCotista, MovimentacaoCota, PosicaoCotista, Recebiveis, StatusMovimentacao
+from .services.calendario import dias_uteis_entre, dia_util_anterior, eh_dia_util, proximo_dia_util, somar_dias_uteis
+from .services.come_cotas import executar_come_cotas_fundo
+from .services.cota import recalcular_cotas_periodo
+from .services.importar_informe import InformeImportError, importar_informe_mensal, importar_lote_zip, importar_lote_zip_empresa, sha256_arquivo
+from .services.informe_xml import InformeParseError, parse_informe_mensal
+from .services.listagem import invalidar_listagem_fundos, listagem_fundos
+from .services.metricas_informe import preencher_metricas, series_metricas
+from .services.movimentacoes import efetivar_movimentacao, efetivar_movimentacoes_em_lote
+from .services.pdd import atualizar_pdd_fundo
+from .services.recebiveis import inserir_recebiveis_novos
+from .services.posicao import reconstruir_posicoes, saldo_disponivel
+from .services.tributos import (
+    calcular_come_cotas_cotista, calcular_impostos_resgate, calcular_iof, calcular_ir_resgate, calcular_pdd,
+)
+from .services.tributos_lote import (
+    calcular_come_cotas_lote, calcular_iof_lote, calcular_ir_resgate_lote,
+    de_centavos, de_milionesimos, para_centavos, para_milionesimos,
+)
+from . import tasks
+from .tasks import importar_lote_zip_task
+
+
+def setUpModule():
+    # XMLs arquivados na importação vão para um diretório temporário
+    global _arquivo_xml
+    _arquivo_xml = override_settings(INFORME_XML_ARQUIVO_DIR=tempfile.mkdtemp())
+    _arquivo_xml.enable()
+
+
+def tearDownModule():
+    shutil.rmtree(settings.INFORME_XML_ARQUIVO_DIR, ignore_errors=True)
+    _arquivo_xml.disable()
+
+
+class CalendarioTests(TestCase):
+
+    def test_feriados_e_fins_de_semana(self):
+        self.assertFalse(eh_dia_util(date(2026, 2, 16)))   # Carnaval
+        self.assertFalse(eh_dia_util(date(2026, 4, 3)))    # Paixão de Cristo
+        self.assertFalse(eh_dia_util(date(2026, 4, 4)))    # sábado
+        self.assertTrue(eh_dia_util(date(2026, 4, 6)))
+
+        self.assertEqual(proximo_dia_util(date(2026, 4, 3)), date(2026, 4, 6))
+        self.assertEqual(dia_util_anterior(date(2026, 4, 6)), date(2026, 4, 2))
+        self.assertEqual(somar_dias_uteis(date(2026, 4, 1), 3), date(2026, 4, 7))
+        self.assertEqual(somar_dias_uteis(date(2026, 4, 7), -3), date(2026, 4, 1))
+        self.assertEqual(dias_uteis_entre(date(2026, 1, 1), date(2027, 1, 1)), 249)
+
+    def test_fora_do_calendario(self):
+        with self.assertRaises(ValueError):
+            eh_dia_util(date(1990, 1, 1))
+
+
+def _informe_xml(cedentes=3):
+    ced = ''.join(
+        f'<CEDENT><NR_PF_PJ_CEDENT>{i:014d}</NR_PF_PJ_CEDENT><PR_CEDENT>{i % 100},5</PR_CEDENT></CEDENT>'
+        for i in range(1, cedentes + 1)
+    )
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<DOC_ARQ>
+  <CAB_INFORM><VERSAO>6.0</VERSAO><DT_COMPT>02/2026</DT_COMPT><NR_CNPJ_ADM>11222333000144</NR_CNPJ_ADM>
+    <NR_CNPJ_FUNDO>55666777000188</NR_CNPJ_FUNDO><NM_CLASSE> FIDC Teste </NM_CLASSE></CAB_INFORM>
+  <LISTA_INFORM>
+    <APLIC_ATIVO><VL_DISPONIB>1.000,50</VL_DISPONIB><VL_CARTEIRA>12.000.000,00</VL_CARTEIRA>
+      <VL_SOM_APLIC_ATIVO>13000000.25</VL_SOM_APLIC_ATIVO>
+      <DICRED><VL_DICRED>500,00</VL_DICRED><VL_DICRED_EXISTE_INAD>0,00</VL_DICRED_EXISTE_INAD></DICRED>
+      <VALORES_MOB><VL_DEBT>10,00</VL_DEBT><VL_CRI>0</VL_CRI></VALORES_MOB>
+      <LISTA_CEDENT>{ced}<CEDENT><PR_CEDENT>1,0</PR_CEDENT></CEDENT></LISTA_CEDENT>
+    </APLIC_ATIVO>
+    <CART_SEGMT><VL_IND>100,00</VL_IND><SEGMT_COMERC><VL_COMERC>50,00</VL_COMERC><VL_COMERC_VARJ>7,00</VL_COMERC_VARJ></SEGMT_COMERC>
+      <SEGMT_FINANC><VL_FINANC_MMARKET>3,25</VL_FINANC_MMARKET></SEGMT_FINANC><VL_CART_CRED>0,00</VL_CART_CRED></CART_SEGMT>
+    <PASSIV><VL_SOM_PASSIV>10,00</VL_SOM_PASSIV><PASSIV_VALORES><VL_PGTO_CURPRZ>4,00</VL_PGTO_CURPRZ></PASSIV_VALORES></PASSIV>
+    <PATRLIQ><VL_PATRIM_LIQ>12.999.990,25</VL_PATRIM_LIQ><VL_PATRIM_LIQ_MEDIO>12.500.000,00</VL_PATRIM_LIQ_MEDIO></PATRLIQ>
+    <COMPMT_DICRED_SEM_AQUIS><VL_PRAZO_VENC_30>1,00</VL_PRAZO_VENC_30><VL_PRAZO_VENC_1080>2,00</VL_PRAZO_VENC_1080></COMPMT_DICRED_SEM_AQUIS>
+    <OUTRAS_INFORM>
+      <NUM_COTISTAS><QT_TOTAL_COTISTAS>12</QT_TOTAL_COTISTAS><QT_TOTAL_COTISTAS_SENIOR>10</QT_TOTAL_COTISTAS_SENIOR></NUM_COTISTAS>
+      <DESC_SERIE_CLASSE><DESC_SERIE_CLASSE_SENIOR><QT_COTAS>1000.5</QT_COTAS><VL_COTAS>1,234567</VL_COTAS></DESC_SERIE_CLASSE_SENIOR></DESC_SERIE_CLASSE>
+      <RENT_MES><RENT_CLASSE_SENIOR><PR_APURADA>1,05</PR_APURADA></RENT_CLASSE_SENIOR></RENT_MES>
+      <DESEMP><CLASSE_SUBORD><DESEMP_ESP>2,0</DESEMP_ESP><DESEMP_REAL>2,5</DESEMP_REAL></CLASSE_SUBORD></DESEMP>
+      <LIQUIDEZ><VL_ATIV_LIQDEZ_30>10,00</VL_ATIV_LIQDEZ_30></LIQUIDEZ>
+      <CAPTA_RESGA_AMORTI><CAPT_MES><CLASSE_SENIOR><VL_TOTAL>100,00</VL_TOTAL></CLASSE_SENIOR></CAPT_MES>
+        <RESG_MES><CLASSE_SUBORD><VL_TOTAL>20,00</VL_TOTAL></CLASSE_SUBORD></RESG_MES></CAPTA_RESGA_AMORTI>
+      <RES_INF_PRST_SCR><VLR_TOTAL_DIR_CRD_DEVD><AA>1,00</AA><D>2,00</D><H>3,00</H></VLR_TOTAL_DIR_CRD_DEVD></RES_INF_PRST_SCR>
+    </OUTRAS_INFORM>
+  </LISTA_INFORM>
+</DOC_ARQ>'''.encode()
+
+
+class InformeXmlParserTests(TestCase):
+
+    def test_backends_retornam_o_mesmo_dict(self):
+        xml_bytes = _informe_xml(cedentes=50)
+        etree_ = parse_informe_mensal(xml_bytes, backend='etree')
+        self.assertEqual(parse_informe_mensal(xml_bytes, backend='lxml'), etree_)
+        self.assertEqual(len(etree_['cedentes']), 50)
+        self.assertEqual(etree_['scr']['vl_rating_d_h'], Decimal('5.00'))
+        self.assertEqual(
+            [(c['segmento'], c['subsegmento']) for c in etree_['carteira_segmentos']],
+            [('INDUSTRIAL', None), ('COMERCIAL', 'GERAL'), ('COMERCIAL', 'VAREJO'),
+             ('FINANCEIRO', 'MONEY_MARKET'), ('VALORES_MOBILIARIOS', 'DEBENTURES')],
+        )
+
+    def test_importar_lote_zip_em_paralelo(self):
+        fundo = _criar_fundo(cnpj='55666777000188')
+        arquivos = [
+            ('2026-01.xml', _informe_xml().replace(b'02/2026', b'01/2026')),
+            ('quebrado.xml', b'<DOC_ARQ>'),
+            ('2026-02.xml', _informe_xml()),
+        ]
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            for nome, conteudo in arquivos:
+                zf.writestr(f'informes/{nome}', conteudo)
+
+        resultados = importar_lote_zip(buffer.getvalue(), fundo, None, workers=2)
+
+        self.assertEqual(
+            [(r['arquivo'], r['status'], r['competencia']) for r in resultados],
+            [('2026-01.xml', 'ok', '01/2026'), ('quebrado.xml', 'erro', ''), ('2026-02.xml', 'ok', '02/2026')],
+        )
+        self.assertEqual(InformeMensal.objects.filter(fundo=fundo).count(), 2)
+
+    def test_reimportacao_identica_e_ignorada(self):
+        fundo = _criar_fundo(cnpj='55666777000188')
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('2026-02.xml', _informe_xml())
+            zf.writestr('copia/2026-02.xml', _informe_xml())
+
+        primeira = importar_lote_zip(buffer.getvalue(), fundo, None, workers=1)
+        self.assertEqual([r['status'] for r in primeira], ['ok', 'inalterado'])
+        informe = InformeMensal.objects.get(fundo=fundo)
+        cedentes = list(informe.cedentes.values_list('id', flat=True))
+
+        segunda = importar_lote_zip(buffer.getvalue(), fundo, None, workers=1)
+        self.assertEqual([r['status'] for r in segunda], ['inalterado', 'inalterado'])
+        self.assertEqual({r['informe_id'] for r in segunda}, {str(informe.id)})
+        self.assertEqual(list(informe.cedentes.values_list('id', flat=True)), cedentes)
+
+        alterado = io.BytesIO()
+        with zipfile.ZipFile(alterado, 'w') as zf:
+            zf.writestr('2026-02.xml', _informe_xml(cedentes=4))
+        self.assertEqual([r['status'] for r in importar_lote_zip(alterado.getvalue(), fundo, None, workers=1)], ['ok'])
+        self.assertEqual(informe.cedentes.count(), 4)
+
+    def test_reimportacao_reconcilia_cedentes_e_carteira(self):
+        fundo = _criar_fundo(cnpj='55666777000188')
+        informe = importar_informe_mensal(fundo.id, parse_informe_mensal(_informe_xml(cedentes=3)), None)
+        ids = dict(informe.cedentes.values_list('nr_pf_pj_cedent', 'id'))
+        carteira = list(informe.carteira.order_by('id').values_list('id', flat=True))
+
+        # cedente 2 muda de percentual, 3 sai, 4 entra; carteira igual
+        xml = _informe_xml(cedentes=4).replace(
+            b'<CEDENT><NR_PF_PJ_CEDENT>00000000000003</NR_PF_PJ_CEDENT><PR_CEDENT>3,5</PR_CEDENT></CEDENT>', b'',
+        ).replace(b'<PR_CEDENT>2,5</PR_CEDENT>', b'<PR_CEDENT>7,0</PR_CEDENT>')
+
+        with CaptureQueriesContext(connection) as ctx:
+            importar_informe_mensal(fundo.id, parse_informe_mensal(xml), None)
+        escritas = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')
+            and any(t in q['sql'] for t in ('informe_mensal_cedente', 'informe_mensal_carteira'))
+        ]
+        self.assertEqual(len(escritas), 3)
+
+        atuais = dict(informe.cedentes.values_list('nr_pf_pj_cedent', 'id'))
+        self.assertEqual(set(atuais), {'00000000000001', '00000000000002', '00000000000004'})
+        self.assertEqual(atuais['00000000000001'], ids['00000000000001'])
+        self.assertEqual(atuais['00000000000002'], ids['00000000000002'])
+        self.assertEqual(informe.cedentes.get(nr_pf_pj_cedent='00000000000002').pr_cedent, Decimal('7.00'))
+        self.assertEqual(list(informe.carteira.order_by('id').values_list('id', flat=True)), carteira)
+
+    def test_importar_lote_zip_empresa_roteia_por_cnpj(self):
+        fundo_a = _criar_fundo(cnpj='55666777000188')
+        fundo_b = _criar_fundo(cnpj='22333444000155')
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('a.xml', _informe_xml())
+            zf.writestr('desconhecido.xml', _informe_xml().replace(b'55666777000188', b'99888777000166'))
+            zf.writestr('b.xml', _informe_xml().replace(b'55666777000188', b'22.333.444/0001-55'))
+            zf.writestr('a-jan.xml', _informe_xml().replace(b'02/2026', b'01/2026'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            resultados = importar_lote_zip_empresa(buffer.getvalue(), fundo_a.empresa, None, workers=1)
+        consultas_fundo = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and '"fundos"."cnpj" IN' in q['sql']
+        ]
+        self.assertEqual(len(consultas_fundo), 1)
+
+        # agrupados por fundo, na ordem do ZIP; não roteados no fim
+        self.assertEqual(
+            [(r['arquivo'], r['status'], r['fundo_id']) for r in resultados],
+            [
+                ('a.xml', 'ok', str(fundo_a.id)),
+                ('a-jan.xml', 'ok', str(fundo_a.id)),
+                ('b.xml', 'ok', str(fundo_b.id)),
+                ('desconhecido.xml', 'erro', ''),
+            ],
+        )
+        self.assertIn('99888777000166', resultados[-1]['mensagem'])
+        self.assertEqual(InformeMensal.objects.filter(fundo=fundo_a).count(), 2)
+        self.assertEqual(InformeMensal.objects.filter(fundo=fundo_b).count(), 1)
+
+    def test_series_metricas_alinhadas(self):
+        fundo_a = _criar_fundo(cnpj='55666777000188')
+        fundo_b = _criar_fundo(cnpj='22333444000155')
+        jan = importar_informe_mensal(fundo_a.id, parse_informe_mensal(_informe_xml().replace(b'02/2026', b'01/2026')), None)
+        fev = importar_informe_mensal(fundo_a.id, parse_informe_mensal(_informe_xml()), None)
+        fev_b = importar_informe_mensal(
+            fundo_b.id, parse_informe_mensal(_informe_xml().replace(b'55666777000188', b'22333444000155')), None,
+        )
+
+        with self.assertNumQueries(1):
+            resultado = series_metricas(
+                [fundo_a.id, fundo_b.id], ['vl_patrimonio_liquido', 'qt_total_cotistas'],
+            )
+
+        self.assertEqual(resultado['competencias'], [date(2026, 1, 1), date(2026, 2, 1)])
+        self.assertEqual(
+            resultado['series'][str(fundo_a.id)]['vl_patrimonio_liquido'],
+            [jan.vl_patrimonio_liquido, fev.vl_patrimonio_liquido],
+        )
+        self.assertEqual(
+            resultado['series'][str(fundo_b.id)]['qt_total_cotistas'],
+            [None, fev_b.qt_total_cotistas],
+        )
+        with self.assertRaises(ValueError):
+            series_metricas([fundo_a.id], ['dados_brutos'])
+
+        jan.delete()
+        self.assertEqual(series_metricas([fundo_a.id], ['vl_patrimonio_liquido'])['competencias'], [date(2026, 2, 1)])
+
+    def test_preencher_metricas_de_informes_antigos(self):
+        from .models import InformeMetrica
+
+        fundo = _criar_fundo(cnpj='55666777000188')
+        informe = importar_informe_mensal(fundo.id, parse_informe_mensal(_informe_xml()), None)
+        esperadas = set(InformeMetrica.objects.values_list('metrica', 'valor'))
+        self.assertTrue(esperadas)
+
+        # Informe anterior a InformeMetrica: só parte das métricas existe
+        InformeMetrica.objects.exclude(metrica='vl_patrimonio_liquido').delete()
+        preencher_metricas()
+
+        self.assertEqual(set(informe.metricas.values_list('metrica', 'valor')), esperadas)
+
+    def test_xml_invalido(self):
+        for backend in ('etree', 'lxml'):
+            with self.assertRaises(InformeParseError):
+                parse_informe_mensal(b'<DOC_ARQ><CAB_INFORM>', backend=backend)
+            with self.assertRaises(InformeParseError):
+                parse_informe_mensal(b'<DOC_ARQ><LISTA_INFORM/></DOC_ARQ>', backend=backend)
+
+
+class ImportacaoInformeLoteTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.fundo = _criar_fundo(cnpj='55666777000188')
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@teste.com', 'senha')
+        self.client.force_login(self.user)
+
+    def test_upload_agenda_task_e_status_reporta_progresso(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('2026-02.xml', _informe_xml())
+            zf.writestr('quebrado.xml', b'<DOC_ARQ>')
+        url = reverse('fundos:importar_informe', kwargs={'fundo_id': self.fundo.id})
+
+        with override_settings(MEDIA_ROOT=self.media):
+            with self.captureOnCommitCallbacks() as callbacks:
+                resp = self.client.post(url, {
+                    'tipo_import': 'lote',
+                    'zip_file': SimpleUploadedFile('informes.zip', buffer.getvalue(), 'application/zip'),
+                })
+
+            importacao = ImportacaoInformeLote.objects.get(fundo=self.fundo)
+            self.assertRedirects(resp, f'{url}?importacao={importacao.id}')
+            self.assertEqual(len(callbacks), 1)
+            self.assertEqual(InformeMensal.objects.filter(fundo=self.fundo).count(), 0)
+
+            importar_lote_zip_task(str(importacao.id))
+
+        status_url = reverse('fundos:status_importacao_informe', kwargs={
+            'fundo_id': self.fundo.id, 'importacao_id': importacao.id,
+        })
+        dados = self.client.get(status_url).json()
+
+        self.assertEqual(dados['status'], 'CONCLUIDO')
+        self.assertTrue(dados['finalizada'])
+        self.assertEqual((dados['processados'], dados['total']), (2, 2))
+        self.assertEqual([r['status'] for r in dados['resultados']], ['ok', 'erro'])
+        self.assertTrue(dados['resultados'][0]['url'])
+        self.assertEqual(InformeMensal.objects.filter(fundo=self.fundo).count(), 1)
+
+
+    def test_importacao_por_empresa(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('2026-02.xml', _informe_xml())
+        url = reverse('fundos:importar_informes_empresa')
+
+        with override_settings(MEDIA_ROOT=self.media):
+            with self.captureOnCommitCallbacks():
+                resp = self.client.post(url, {
+                    'zip_file': SimpleUploadedFile('todos.zip', buffer.getvalue(), 'application/zip'),
+                })
+            importacao = ImportacaoInformeLote.objects.get(empresa=self.fundo.empresa, fundo__isnull=True)
+            self.assertRedirects(resp, f'{url}?importacao={importacao.id}')
+            self.assertEqual(self.client.get(resp['Location']).status_code, 200)
+
+            importar_lote_zip_task(str(importacao.id))
+
+        dados = self.client.get(reverse('fundos:status_importacao_informes_empresa', kwargs={
+            'importacao_id': importacao.id,
+        })).json()
+        self.assertEqual(dados['status'], 'CONCLUIDO')
+        self.assertEqual(dados['resultados'][0]['fundo'], self.fundo.razao_social)
+
+
+    def test_task_parseia_em_paralelo_e_remove_zip(self):
+        from core.services import processos
+        from fidc_gestao.celery import app
+        from .services import importar_informe
+
+        # A task vai para a fila sem prefork, onde o pool de parsing pode ser criado
+        self.assertEqual(app.amqp.router.route({}, importar_lote_zip_task.name)['queue'].name, 'importacao')
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('fev.xml', _informe_xml())
+            zf.writestr('jan.xml', _informe_xml().replace(b'02/2026', b'01/2026'))
+
+        with override_settings(MEDIA_ROOT=self.media):
+            importacao = ImportacaoInformeLote.objects.create(
+                empresa=self.fundo.empresa, fundo=self.fundo, arquivo_nome='informes.zip',
+                arquivo=SimpleUploadedFile('informes.zip', buffer.getvalue(), 'application/zip'),
+            )
+            caminho = Path(importacao.arquivo.path)
+
+            with mock.patch.object(importar_informe, 'INFORME_IMPORT_WORKERS', 2), \
+                    mock.patch.object(processos, 'submeter', wraps=processos.submeter) as submeter:
+                resultado = importar_lote_zip_task(str(importacao.id))
+
+        self.assertEqual((resultado['status'], resultado['importados']), ('CONCLUIDO', 2))
+        self.assertEqual(submeter.call_count, 2)
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.arquivo.name, '')
+        self.assertFalse(caminho.exists())
+
+    def test_falha_do_pool_de_parsing_cai_para_sequencial(self):
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+        from core.services import processos
+
+        def _quebrado(*args):
+            futuro = Future()
+            futuro.set_exception(BrokenProcessPool('filho morto'))
+            return futuro
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('fev.xml', _informe_xml())
+            zf.writestr('jan.xml', _informe_xml().replace(b'02/2026', b'01/2026'))
+
+        with mock.patch.object(processos, 'submeter', side_effect=_quebrado):
+            resultados = importar_lote_zip(buffer.getvalue(), self.fundo, None, workers=2)
+
+        self.assertEqual([r['status'] for r in resultados], ['ok', 'ok'])
+
+    def test_importacao_travada_e_reciclada(self):
+        from django.utils import timezone
+        from .models import StatusImportacao
+
+        def _importacao(minutos, status=StatusImportacao.PROCESSANDO):
+            importacao = ImportacaoInformeLote.objects.create(
+                empresa=self.fundo.empresa, fundo=self.fundo, status=status,
+                arquivo='informes/lotes/inexistente.zip', total=10, processados=4,
+            )
+            ImportacaoInformeLote.objects.filter(id=importacao.id).update(
+                atualizado_em=timezone.now() - timedelta(minutes=minutos),
+            )
+            return importacao
+
+        travada, ativa = _importacao(60), _importacao(5)
+        nunca_iniciada = _importacao(60, StatusImportacao.PENDENTE)
+        with override_settings(MEDIA_ROOT=self.media):
+            self.assertEqual(tasks.reciclar_importacoes_travadas(), {'recicladas': 2})
+
+        travada.refresh_from_db()
+        self.assertEqual((travada.status, travada.arquivo.name), (StatusImportacao.ERRO, ''))
+        self.assertIn('4 de 10', travada.mensagem)
+        ativa.refresh_from_db()
+        self.assertEqual(ativa.status, StatusImportacao.PROCESSANDO)
+        nunca_iniciada.refresh_from_db()
+        self.assertEqual(nunca_iniciada.status, StatusImportacao.ERRO)
+        self.assertIn('fila de importação', nunca_iniciada.mensagem)
+
+        # A task que chega depois da reciclagem não retoma a importação
+        self.assertEqual(
+            importar_lote_zip_task(str(nunca_iniciada.id)),
+            {'importacao_id': str(nunca_iniciada.id), 'status': StatusImportacao.ERRO},
+        )
+
+    def test_dados_brutos_sob_demanda(self):
+        informe = importar_informe_mensal(self.fundo.id, parse_informe_mensal(_informe_xml()), None)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('fundos:listar_informes', kwargs={'fundo_id': self.fundo.id}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(any('informe_mensal_bruto' in q['sql'] for q in ctx.captured_queries))
+
+        resp = self.client.get(reverse('fundos:baixar_dados_brutos_informe', kwargs={
+            'fundo_id': self.fundo.id, 'informe_id': informe.id,
+        }))
+        self.assertIn('attachment', resp['Content-Disposition'])
+        self.assertEqual(resp.json()['header']['competencia'], '2026-02-01')
+        self.assertEqual(len(resp.json()['cedentes']), 3)
+
+    def test_xml_original_arquivado(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('fev.xml', _informe_xml())
+            zf.writestr('copia/fev.xml', _informe_xml())
+            zf.writestr('jan.xml', _informe_xml().replace(b'02/2026', b'01/2026'))
+        importar_lote_zip(buffer.getvalue(), self.fundo, None, workers=1)
+
+        # a cópia idêntica não gera um segundo blob
+        blobs = {p.name for p in Path(settings.INFORME_XML_ARQUIVO_DIR).rglob('*.xml.gz')}
+        hashes = InformeMensal.objects.filter(fundo=self.fundo).values_list('arquivo_sha256', flat=True)
+        self.assertEqual(len(hashes), 2)
+        self.assertTrue({f'{h}.xml.gz' for h in hashes} <= blobs)
+
+        informe = InformeMensal.objects.get(fundo=self.fundo, competencia=date(2026, 2, 1))
+        self.assertFalse(InformeMensalBruto.objects.filter(informe=informe).exists())
+
+        resp = self.client.get(reverse('fundos:baixar_xml_informe', kwargs={
+            'fundo_id': self.fundo.id, 'informe_id': informe.id,
+        }))
+        self.assertTrue(resp.streaming)
+        self.assertEqual(b''.join(resp.streaming_content), _informe_xml())
+
+        dados = self.client.get(reverse('fundos:baixar_dados_brutos_informe', kwargs={
+            'fundo_id': self.fundo.id, 'informe_id': informe.id,
+        })).json()
+        self.assertEqual(dados['header']['competencia'], '2026-02-01')
+
+    @override_settings(INFORME_XML_ARQUIVO_DIR=tempfile.mkdtemp())
+    def test_falha_ao_arquivar_xml_aborta_importacao(self):
+        from django.core.management import call_command
+        from .services.arquivo_xml import existe_xml, guardar_xml, remover_orfaos
+
+        self.addCleanup(shutil.rmtree, settings.INFORME_XML_ARQUIVO_DIR, ignore_errors=True)
+        outro_fundo = _criar_fundo(cnpj='22333444000155')
+        xml = _informe_xml()
+        with self.assertRaises(InformeImportError):
+            importar_informe_mensal(outro_fundo.id, parse_informe_mensal(xml), None, xml_bytes=xml)
+        self.assertFalse(existe_xml(sha256_arquivo(xml)))
+
+        # Sem o blob o informe não é gravado (nem perde os dados brutos)
+        informe = importar_informe_mensal(self.fundo.id, parse_informe_mensal(xml), None)
+        self.assertTrue(InformeMensalBruto.objects.filter(informe=informe).exists())
+        with mock.patch('fundos.services.importar_informe.guardar_xml', side_effect=OSError('disco cheio')):
+            with self.assertRaises(OSError):
+                importar_informe_mensal(self.fundo.id, parse_informe_mensal(xml), None, xml_bytes=xml)
+        informe.refresh_from_db()
+        self.assertEqual(informe.arquivo_sha256, '')
+        self.assertTrue(InformeMensalBruto.objects.filter(informe=informe).exists())
+
+        informe = importar_informe_mensal(self.fundo.id, parse_informe_mensal(xml), None, xml_bytes=xml)
+        self.assertTrue(existe_xml(informe.arquivo_sha256))
+        self.assertFalse(InformeMensalBruto.objects.filter(informe=informe).exists())
+
+        # Blob sem informe (ex.: informe excluído) sai na varredura de órfãos
+        orfao = guardar_xml(xml.replace(b'02/2026', b'03/2026'))
+        saida = io.StringIO()
+        call_command('limpar_xmls_orfaos', '--idade-minima=0', stdout=saida)
+        self.assertIn('1 arquivo(s)', saida.getvalue())
+        self.assertFalse(existe_xml(orfao))
+        self.assertTrue(existe_xml(informe.arquivo_sha256))
+
+        # Um blob antigo que volta a ser referenciado tem o mtime renovado
+        caminho = next(Path(settings.INFORME_XML_ARQUIVO_DIR).rglob('*.xml.gz'))
+        os.utime(caminho, (0, 0))
+        guardar_xml(xml)
+        self.assertEqual(remover_orfaos(set(), idade_minima=3600), [])
+
+
+class ListarFundosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@teste.com', 'senha')
+        self.client.force_login(self.user)
+
+    def _consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('fundos:listar_fundos'))
+        self.assertEqual(resp.status_code, 200)
+        return resp, len(ctx.captured_queries)
+
+    def test_consultas_constantes_e_cache_por_empresa(self):
+        for i, tipo in enumerate(['FIDC', 'FII', 'FIP']):
+            _criar_fundo(cnpj=f'1000000000000{i}', tipo_fundo=tipo)
+        self._consultas()  # primeira requisição grava a empresa ativa na sessão
+        invalidar_listagem_fundos(Empresa.objects.get().id)
+        _, com_3 = self._consultas()
+        _, em_cache = self._consultas()
+        self.assertEqual(em_cache, com_3 - 2)
+
+        for i in range(10):
+            _criar_fundo(cnpj=f'200000000000{i:02d}', tipo_fundo='FIDC')
+        resp, com_13 = self._consultas()
+        self.assertEqual(com_13, com_3)
+        self.assertEqual((resp.context['total_fundos'], resp.context['total_fidc']), (13, 11))
+
+        fundo = Fundo.objects.get(cnpj='10000000000001')
+        fundo.ativo = False
+        fundo.save()
+        resp, _ = self._consultas()
+        self.assertEqual(resp.context['total_inativos'], 1)
+
+    def test_fundo_movido_sai_da_listagem_da_empresa_anterior(self):
+        fundo = _criar_fundo()
+        anterior = fundo.empresa
+        self.assertEqual(listagem_fundos(anterior)['totais']['total'], 1)
+
+        nova = Empresa.objects.create(nome='Outra Empresa', cnpj='00000000000200')
+        self.assertEqual(listagem_fundos(nova)['totais']['total'], 0)
+        fundo.empresa = nova
+        fundo.save()
+
+        self.assertEqual(listagem_fundos(anterior)['totais']['total'], 0)
+        self.assertEqual(listagem_fundos(nova)['totais']['total'], 1)
+
+
+def _criar_fundo(cnpj='11111111000111', tipo_fundo='FIDC'):
+    empresa, _ = Empresa.objects.get_or_create(nome='Empresa Teste', cnpj='00000000000100')
+    return Fundo.objects.create(
+        empresa=empresa,
+        cnpj=cnpj,
+        razao_social=f'Fundo {cnpj}',
+        tipo_fundo=tipo_fundo,
+        data_constituicao=date(2020, 1, 1),
+    )
+
+
+class RecebiveisCessaoTests(TestCase):
+
+    def _recebivel(self, numero, sacado='33333333000133'):
+        return Recebiveis(
+            cedente_cnpj='22222222000122', cedente_nome='Cedente',
+            sacado_cpf_cnpj=sacado, sacado_nome='Sacado',
+            tipo_credito='Duplicata', numero_titulo=numero,
+            data_vencimento=date(2026, 12, 31),
+            valor_nominal=Decimal('100.00'), valor_cessao=Decimal('100.00'), status='A_ENVIAR',
+        )
+
+    def test_insercao_em_lote_ignora_existentes(self):
+        fundo = _criar_fundo()
+        outro_fundo = _criar_fundo(cnpj='99999999000199')
+        for numero, f in [('1', fundo), ('2', outro_fundo)]:
+            existente = self._recebivel(numero)
+            existente.fundo = f
+            existente.save()
+
+        recebiveis = [self._recebivel(str(i)) for i in range(1, 201)]
+        recebiveis += [self._recebivel('5'), self._recebivel('5', sacado='44444444000144')]
+
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = inserir_recebiveis_novos(fundo, recebiveis, batch_size=50)
+
+        self.assertEqual((resultado['inseridos'], resultado['ignorados']), (200, 2))
+        self.assertEqual(resultado['duplicados'], [('1', '33333333000133'), ('5', '33333333000133')])
+        self.assertEqual(fundo.recebiveis.count(), 201)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 4)  # 200 novos em blocos de 50
+
+
+class PddEngineTests(TestCase):
+
+    def setUp(self):
+        self.fundo = _criar_fundo()
+        rnd = random.Random(175)
+        dias = [0, 30, 31, 60, 61, 90, 91, 120, 121, 150, 151, 180, 181, 360, 361, 5000]
+        valores = [Decimal('0.00'), Decimal('0.50'), Decimal('100.50'), Decimal('33.33')]
+        for i in range(200):
+            dias.append(rnd.randint(0, 800))
+            valores.append(Decimal(rnd.randint(0, 10_000_000)) / 100)
+        for i, d in enumerate(dias):
+            Recebiveis.objects.create(
+                fundo=self.fundo,
+                cedente_cnpj='22222222000122', cedente_nome='Cedente',
+                sacado_cpf_cnpj='33333333000133', sacado_nome='Sacado',
+                tipo_credito='Duplicata', numero_titulo=str(i),
+                data_vencimento=date(2026, 1, 1),
+                valor_nominal=valores[i % len(valores)], valor_cessao=valores[i % len(valores)],
+                status='VENCIDO', dias_atraso=d,
+            )
+        Recebiveis.objects.filter(numero_titulo='0').update(status='BAIXADO', pdd_valor=Decimal('9.99'))
+
+    def test_paridade_com_calcular_pdd(self):
+        total = atualizar_pdd_fundo(str(self.fundo.id))
+
+        esperado = Decimal('0.00')
+        for rec in Recebiveis.objects.filter(fundo=self.fundo).exclude(status='BAIXADO'):
+            pdd = calcular_pdd(rec.dias_atraso, rec.valor_nominal)
+            self.assertEqual(rec.pdd_valor, pdd, f'título {rec.numero_titulo}')
+            esperado += pdd
+
+        self.assertEqual(total, esperado)
+        self.assertEqual(Recebiveis.objects.get(numero_titulo='0').pdd_valor, Decimal('9.99'))
+
+    def test_dias_negativos(self):
+        Recebiveis.objects.filter(numero_titulo='1').update(dias_atraso=-1)
+        with self.assertRaises(ValueError):
+            atualizar_pdd_fundo(str(self.fundo.id))
+
+
+class TributosLoteTests(TestCase):
+
+    def _posicoes(self, n, escala):
+        rng = random.Random(7)
+        valores = [Decimal(rng.randint(0, escala)) / 100 for _ in range(n)]
+        custos = [Decimal(rng.randint(0, escala)) / 100 for _ in range(n)]
+        dias = [rng.choice([0, 1, 29, 30, 180, 181, 360, 361, 720, 721]) if i % 3 == 0 else rng.randint(0, 900)
+                for i in range(n)]
+        cotas = [Decimal(rng.randint(1, 5_000_000)) / 1_000_000 for _ in range(n)]
+        return valores, custos, dias, cotas
+
+    def _assert_paridade(self, valores, custos, dias, cotas):
+        ir = de_centavos(calcular_ir_resgate_lote(para_centavos(valores), para_centavos(custos), dias))
+        iof = de_centavos(calcular_iof_lote(para_centavos(valores), dias))
+        ir_cc, cotas_cc = calcular_come_cotas_lote(
+            para_centavos(valores), para_centavos(custos), para_milionesimos(cotas), Decimal('0.20')
+        )
+        come_cotas = list(zip(de_centavos(ir_cc), de_milionesimos(cotas_cc)))
+
+        for i, (v, c, d, vc) in enumerate(zip(valores, custos, dias, cotas)):
+            self.assertEqual(ir[i], calcular_ir_resgate(v, c, d))
+            self.assertEqual(iof[i], calcular_iof(v, d))
+            self.assertEqual(come_cotas[i], calcular_come_cotas_cotista(v, c, vc, Decimal('0.20')))
+
+    def test_paridade_com_funcoes_escalares(self):
+        self._assert_paridade(*self._posicoes(2000, 10_000_000_00))
+
+    def test_valores_que_estouram_int64(self):
+        self._assert_paridade(*self._posicoes(50, 10 ** 20))
+
+    def test_dias_negativos(self):
+        with self.assertRaises(ValueError):
+            calcular_iof_lote([100], [-1])
+
+
+class RecalculoCotasPeriodoTests(TestCase):
+
+    def setUp(self):
+        self.fundo = _criar_fundo(tipo_fundo='FII')
+        # Taxas de 6% + 6% a.a. → provisão de 1% no mês, pro rata pelo dia: a cota muda a cada dia
+        Fundo.objects.filter(id=self.fundo.id).update(taxa_administracao=Decimal('0.06'), taxa_gestao=Decimal('0.06'))
+        Ativo.objects.create(fundo=self.fundo, tipo_ativo='CRI', valor_mercado=Decimal('1000.00'))
+
+    def _cota(self, dia, valor, **extra):
+        return CotaHistorico.objects.create(
+            fundo=self.fundo, data_referencia=dia, valor_cota=Decimal(valor),
+            patrimonio_liquido=0, quantidade_cotas=Decimal('1000'), **extra
+        )
+
+    @staticmethod
+    def _rent(final, inicial):
+        return (final / inicial - 1).quantize(Decimal('0.000001'))
+
+    def test_recalcula_intervalo_e_vizinhos(self):
+        ano_anterior = self._cota(date(2025, 12, 30), '0.800000', rentabilidade_mes=Decimal('0.5'))
+        self._cota(date(2026, 1, 30), '0.900000')
+        self._cota(date(2026, 2, 27), '1.000000', rentabilidade_dia=Decimal('0.01'))
+        self._cota(date(2026, 3, 3), '5.000000')  # dentro do intervalo: sobrescrita
+        self._cota(date(2026, 3, 5), '1.100000')
+
+        resultado = recalcular_cotas_periodo(str(self.fundo.id), date(2026, 3, 2), date(2026, 3, 4))
+        self.assertEqual((resultado['dias_recalculados'], resultado['registros_gravados']), (3, 6))
+
+        cotas = {c.data_referencia: c for c in CotaHistorico.objects.filter(fundo=self.fundo)}
+        # PL = 1000 × (1 - 1% × dia/30) sobre 1000 cotas
+        valores = [cotas[date(2026, 3, d)].valor_cota for d in (2, 3, 4)]
+        self.assertEqual(valores, [Decimal('0.999333'), Decimal('0.999000'), Decimal('0.998667')])
+        self.assertEqual(cotas[date(2026, 3, 2)].patrimonio_liquido, Decimal('999.33'))
+
+        # Rentabilidade do dia: encadeada a partir da última cota anterior ao intervalo
+        self.assertEqual(cotas[date(2026, 3, 2)].rentabilidade_dia, self._rent(valores[0], Decimal('1')))
+        self.assertEqual(cotas[date(2026, 3, 3)].rentabilidade_dia, self._rent(valores[1], valores[0]))
+        self.assertEqual(cotas[date(2026, 3, 5)].rentabilidade_dia, self._rent(Decimal('1.1'), valores[2]))
+        self.assertEqual(cotas[date(2026, 2, 27)].rentabilidade_dia, Decimal('0.01'))
+
+        # Mês e ano: da primeira à última cota do período, inclusive vizinhos fora do intervalo
+        for d in (2, 3, 4, 5):
+            cota = cotas[date(2026, 3, d)]
+            self.assertEqual(cota.rentabilidade_mes, self._rent(Decimal('1.1'), valores[0]))
+            self.assertEqual(cota.rentabilidade_ano, self._rent(Decimal('1.1'), Decimal('0.9')))
+        self.assertEqual(cotas[date(2026, 2, 27)].rentabilidade_mes, Decimal('0'))
+        self.assertEqual(cotas[date(2026, 1, 30)].rentabilidade_ano, self._rent(Decimal('1.1'), Decimal('0.9')))
+
+        # Fora da janela (ano anterior): intocada
+        self.assertEqual(cotas[date(2025, 12, 30)].rentabilidade_mes, ano_anterior.rentabilidade_mes)
+        self.assertIsNone(cotas[date(2025, 12, 30)].rentabilidade_ano)
+
+    def test_intervalo_invertido(self):
+        with self.assertRaises(ValueError):
+            recalcular_cotas_periodo(str(self.fundo.id), date(2026, 3, 4), date(2026, 3, 2))
+
+
+class PosicaoCotistaTests(TestCase):
+
+    def setUp(self):
+        self.fundo = _criar_fundo()
+        self.cotista = Cotista.objects.create(cpf_cnpj='12345678901', tipo_pessoa='PF', nome_razao_social='Cotista')
+        CotaHistorico.objects.create(
+            fundo=self.fundo, data_referencia=date(2026, 3, 2),
+            valor_cota=Decimal('2.000000'), patrimonio_liquido=0, quantidade_cotas=0,
+        )
+
+    def _movimentar(self, tipo, data=date(2026, 3, 2), **valores):
+        mov = MovimentacaoCota.objects.create(
+            tipo_movimentacao=tipo, fundo=self.fundo, cotista=self.cotista,
+            data_cotizacao=data, data_liquidacao=data, **valores
+        )
+        return efetivar_movimentacao(str(mov.id))
+
+    def test_posicao_incremental_e_reconstrucao(self):
+        self._movimentar('APLICACAO', valor_financeiro=Decimal('1000.00'))
+        resgate = self._movimentar('RESGATE', quantidade_cotas=Decimal('100'))
+
+        # Lote FIFO real: mesmo dia, sem rendimento → só IOF de D+0 (96%)
+        self.assertEqual(resgate.ir_retido, Decimal('0.00'))
+        self.assertEqual(resgate.iof_retido, Decimal('1.92'))
+        self.assertEqual(LoteCotista.objects.get(cotista=self.cotista).quantidade_saldo, Decimal('400'))
+
+        posicao = PosicaoCotista.objects.get(fundo=self.fundo, cotista=self.cotista)
+        self.assertEqual(posicao.quantidade_cotas, Decimal('400'))
+        self.assertEqual(posicao.custo_total, Decimal('800.00'))
+        self.assertEqual(saldo_disponivel(str(self.fundo.id), str(self.cotista.id)), Decimal('400'))
+
+        reconstruir_posicoes(str(self.fundo.id))
+        reconstruida = PosicaoCotista.objects.get(fundo=self.fundo, cotista=self.cotista)
+        self.assertEqual(reconstruida.quantidade_cotas, posicao.quantidade_cotas)
+        self.assertEqual(reconstruida.custo_total, posicao.custo_total)
+
+    def test_resgate_consome_varios_lotes_fifo(self):
+        CotaHistorico.objects.create(
+            fundo=self.fundo, data_referencia=date(2026, 3, 3),
+            valor_cota=Decimal('2.500000'), patrimonio_liquido=0, quantidade_cotas=0,
+        )
+        self._movimentar('APLICACAO', valor_financeiro=Decimal('1000.00'))  # lote 1: 500 a 2,00
+        self._movimentar('APLICACAO', date(2026, 3, 3), valor_financeiro=Decimal('750.00'))  # lote 2: 300 a 2,50
+        self._movimentar('APLICACAO', date(2026, 3, 3), valor_financeiro=Decimal('250.00'))  # lote 3: 100 a 2,50
+
+        # 700 cotas: esgota o lote 1 e consome parte do lote 2; o imposto é calculado lote a lote
+        resgate = self._movimentar('RESGATE', date(2026, 3, 3), quantidade_cotas=Decimal('700'))
+        lote1 = calcular_impostos_resgate(Decimal('1250.00'), Decimal('1000.00'), date(2026, 3, 2), date(2026, 3, 3))
+        lote2 = calcular_impostos_resgate(Decimal('500.00'), Decimal('500.00'), date(2026, 3, 3), date(2026, 3, 3))
+        self.assertEqual(resgate.ir_retido, lote1['ir_retido'] + lote2['ir_retido'])
+        self.assertEqual(resgate.iof_retido, lote1['iof_retido'] + lote2['iof_retido'])
+
+        saldos = list(LoteCotista.objects.filter(cotista=self.cotista).order_by('sequencia').values_list('quantidade_saldo', flat=True))
+        self.assertEqual(saldos, [Decimal('0'), Decimal('100'), Decimal('100')])
+        posicao = PosicaoCotista.objects.get(fundo=self.fundo, cotista=self.cotista)
+        self.assertEqual((posicao.lote_cursor, posicao.ultimo_lote), (2, 3))
+
+        # Consumo parcial que termina exatamente no fim do lote 2: o cursor avança para o 3
+        self._movimentar('RESGATE', date(2026, 3, 3), quantidade_cotas=Decimal('100'))
+        posicao.refresh_from_db()
+        self.assertEqual((posicao.lote_cursor, posicao.quantidade_cotas), (3, Decimal('100')))
+
+        reconstruir_posicoes(str(self.fundo.id))
+        reconstruida = PosicaoCotista.objects.get(fundo=self.fundo, cotista=self.cotista)
+        self.assertEqual((reconstruida.lote_cursor, reconstruida.quantidade_cotas), (3, Decimal('100')))
+        saldos = list(LoteCotista.objects.filter(cotista=self.cotista).order_by('sequencia').values_list('quantidade_saldo', flat=True))
+        self.assertEqual(saldos, [Decimal('0'), Decimal('0'), Decimal('100')])
+
+    def test_efetivacao_em_lote(self):
+        self._movimentar('APLICACAO', valor_financeiro=Decimal('1000.00'))
+        pendentes = [
+            MovimentacaoCota.objects.create(
+                tipo_movimentacao=tipo, fundo=self.fundo, cotista=self.cotista,
+                data_cotizacao=data, data_liquidacao=data, **valores
+            )
+            for tipo, data, valores in [
+                ('APLICACAO', date(2026, 3, 2), {'valor_financeiro': Decimal('200.00')}),
+                ('RESGATE', date(2026, 3, 2), {'quantidade_cotas': Decimal('550')}),
+                ('APLICACAO', date(2026, 3, 3), {'valor_financeiro': Decimal('50.00')}),
+            ]
+        ]
+
+        resultado = efetivar_movimentacoes_em_lote([m.id for m in pendentes], tamanho_lote=2)
+
+        self.assertEqual(resultado['total'], 3)
+        self.assertEqual(resultado['sucesso'], 2)
+        self.assertEqual([e['id'] for e in resultado['erros']], [str(pendentes[2].id)])
+
+        resgate = MovimentacaoCota.objects.get(id=pendentes[1].id)
+        self.assertEqual(resgate.status, StatusMovimentacao.CONFIRMADO)
+        self.assertEqual(resgate.valor_financeiro, Decimal('1100.00'))
+        posicao = PosicaoCotista.objects.get(fundo=self.fundo, cotista=self.cotista)
+        self.assertEqual(posicao.quantidade_cotas, Decimal('50'))
+        self.assertEqual(posicao.lote_cursor, 2)
+
+    def test_resgates_em_lote_com_queries_constantes(self):
+        def _efetivar_resgates(n_cotistas):
+            pendentes = []
+            for i in range(n_cotistas):
+                cotista = Cotista.objects.create(
+                    cpf_cnpj=f'{n_cotistas}{i:010d}', tipo_pessoa='PF', nome_razao_social=f'Cotista {i}'
+                )
+                for valor in ('100.00', '100.00'):
+                    efetivar_movimentacao(str(MovimentacaoCota.objects.create(
+                        tipo_movimentacao='APLICACAO', fundo=self.fundo, cotista=cotista,
+                        data_cotizacao=date(2026, 3, 2), data_liquidacao=date(2026, 3, 2),
+                        valor_financeiro=Decimal(valor),
+                    ).id))
+                # 60 cotas: esgota o primeiro lote (50) e consome parte do segundo
+                pendentes.append(MovimentacaoCota.objects.create(
+                    tipo_movimentacao='RESGATE', fundo=self.fundo, cotista=cotista,
+                    data_cotizacao=date(2026, 3, 2), data_liquidacao=date(2026, 3, 2),
+                    quantidade_cotas=Decimal('60'),
+                ).id)
+
+            with CaptureQueriesContext(connection) as queries:
+                resultado = efetivar_movimentacoes_em_lote(pendentes)
+            self.assertEqual(resultado['sucesso'], n_cotistas)
+            return len(queries)
+
+        self.assertEqual(_efetivar_resgates(2), _efetivar_resgates(6))
+
+        posicoes = PosicaoCotista.objects.filter(fundo=self.fundo, quantidade_cotas__gt=0)
+        self.assertEqual({(p.quantidade_cotas, p.lote_cursor) for p in posicoes}, {(Decimal('40'), 2)})
+        saldos = LoteCotista.objects.filter(fundo=self.fundo).values_list('sequencia', 'quantidade_saldo')
+        self.assertEqual(set(saldos), {(1, Decimal('0')), (2, Decimal('40'))})
+
+    def test_come_cotas_por_cotista(self):
+        self._movimentar('APLICACAO', valor_financeiro=Decimal('1000.00'))
+        CotaHistorico.objects.create(
+            fundo=self.fundo, data_referencia=date(2026, 5, 29),
+            valor_cota=Decimal('2.500000'), patrimonio_liquido=0, quantidade_cotas=0,
+        )
+
+        resultado = executar_come_cotas_fundo(str(self.fundo.id), date(2026, 5, 29))
+        self.assertEqual((resultado['status'], resultado['ir_total']), ('executado', Decimal('37.50')))
+
+        # Rendimento 1250 - 1000 = 250 → IR 15% = 37,50 → 15 cotas a 2,50
+        mov = MovimentacaoCota.objects.get(tipo_movimentacao='COME_COTAS')
+        self.assertEqual(mov.quantidade_cotas, Decimal('15'))
+        self.assertEqual(PosicaoCotista.objects.get(fundo=self.fundo).quantidade_cotas, Decimal('485'))
+        self.assertEqual(LoteCotista.objects.get(cotista=self.cotista).quantidade_saldo, Decimal('485'))
+
+        # Idempotente por (fundo, semestre)
+        resultado = executar_come_cotas_fundo(str(self.fundo.id), date(2026, 5, 29))
+        self.assertEqual(resultado['status'], 'ja_executado')
+        self.assertEqual(MovimentacaoCota.objects.filter(tipo_movimentacao='COME_COTAS').count(), 1)
+
+        reconstruir_posicoes(str(self.fundo.id))
+        self.assertEqual(LoteCotista.objects.get(cotista=self.cotista).quantidade_saldo, Decimal('485'))
+
+    def test_come_cotas_atualiza_custo_e_nao_tributa_de_novo(self):
+        self._movimentar('APLICACAO', valor_financeiro=Decimal('1000.00'))
+        for dia in (date(2026, 5, 29), date(2026, 11, 30)):
+            CotaHistorico.objects.create(
+                fundo=self.fundo, data_referencia=dia,
+                valor_cota=Decimal('2.500000'), patrimonio_liquido=0, quantidade_cotas=0,
+            )
+
+        maio = executar_come_cotas_fundo(str(self.fundo.id), date(2026, 5, 29))
+        self.assertEqual(maio['ir_total'], Decimal('37.50'))
+
+        # Custo da posição e dos lotes restantes sobe para a cota do come-cotas: 485 × 2,50
+        posicao = PosicaoCotista.objects.get(fundo=self.fundo)
+        self.assertEqual(posicao.custo_total, Decimal('1212.50'))
+        self.assertEqual(LoteCotista.objects.get(cotista=self.cotista).valor_cota_aquisicao, Decimal('2.500000'))
+
+        # Cota parada no semestre seguinte: nada a tributar
+        novembro = executar_come_cotas_fundo(str(self.fundo.id), date(2026, 11, 30))
+        self.assertEqual((novembro['status'], novembro['cotistas'], novembro['ir_total']), ('executado', 0, Decimal('0.00')))
+        self.assertEqual(PosicaoCotista.objects.get(fundo=self.fundo).quantidade_cotas, Decimal('485'))
+
+        reconstruir_posicoes(str(self.fundo.id))
+        self.assertEqual(PosicaoCotista.objects.get(fundo=self.fundo).custo_total, Decimal('1212.50'))
+        self.assertEqual(LoteCotista.objects.get(cotista=self.cotista).valor_cota_aquisicao, Decimal('2.500000'))
+
+
+class FechamentoCotasTasksTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch.object(tasks, 'COTAS_MAX_PARALELO_POR_BANCO', 2)
+    def test_slots_adquiridos_e_liberados(self):
+        a = tasks._adquirir_slot_banco('default', 'task-a')
+        b = tasks._adquirir_slot_banco('default', 'task-b')
+        self.assertEqual({a, b}, {'cotas:slot:default:0', 'cotas:slot:default:1'})
+        self.assertIsNone(tasks._adquirir_slot_banco('default', 'task-c'))
+
+        # Só o detentor libera o slot
+        tasks._liberar_slot_banco(a, 'task-c')
+        self.assertEqual(cache.get(a), 'task-a')
+        tasks._liberar_slot_banco(a, 'task-a')
+        self.assertEqual(tasks._adquirir_slot_banco('default', 'task-c'), a)
+
+    def test_slot_expira_depois_do_time_limit_da_task(self):
+        task = tasks.calcular_cota_fundo_task
+        self.assertLess(task.soft_time_limit, task.time_limit)
+        self.assertLess(task.time_limit, tasks.COTAS_SLOT_TIMEOUT)
+
+    @mock.patch.object(tasks, 'COTAS_MAX_PARALELO_POR_BANCO', 1)
+    def test_banco_saturado_reenfileira_com_backoff_e_desiste(self):
+        tasks._adquirir_slot_banco('default', 'task-ocupante')
+
+        with mock.patch.object(tasks.calcular_cota_fundo_task, 'retry', side_effect=RuntimeError) as retry:
+            with self.assertRaises(RuntimeError):
+                tasks.calcular_cota_fundo_task.apply(args=['f1', '2026-03-02'], retries=3, throw=True)
+        self.assertEqual(retry.call_args.kwargs['countdown'], 40)
+
+        with mock.patch.object(tasks, 'COTAS_SLOT_MAX_TENTATIVAS', 3):
+            resultado = tasks.calcular_cota_fundo_task.apply(args=['f1', '2026-03-02'], retries=3).get()
+        self.assertEqual(resultado['status'], 'erro')
+        self.assertIn('saturado', resultado['mensagem'])
+
+    def test_fechamento_libera_slot_mesmo_com_erro(self):
+        with mock.patch('fundos.services.cota.calcular_cota_fechamento', side_effect=ValueError('sem carteira')):
+            resultado = tasks.calcular_cota_fundo_task.apply(args=['f1', '2026-03-02'], task_id='t1').get()
+
+        self.assertEqual(resultado, {'fundo_id': 'f1', 'status': 'erro', 'mensagem': 'sem carteira'})
+        self.assertIsNone(cache.get('cotas:slot:default:0'))
+
+    def test_consolidacao_do_chord(self):
+        resultados = [
+            {'fundo_id': 'f1', 'status': 'ok', 'valor_cota': Decimal('1.5')},
+            {'fundo_id': 'f2', 'status': 'erro', 'mensagem': 'sem carteira'},
+            {'fundo_id': 'f3', 'status': 'ok', 'valor_cota': Decimal('2.0')},
+        ]
+        with mock.patch.object(tasks.enviar_email_alerta_task, 'delay') as email:
+            resumo = tasks.consolidar_fechamento_cotas(resultados, '2026-03-02')
+
+        self.assertEqual(resumo, {'data': '2026-03-02', 'total_fundos': 3, 'sucesso': 2, 'erros': 1})
+        email.assert_called_once()
+        self.assertIn('Fundo f2: sem carteira', email.call_args.kwargs['mensagem'])
+
+        with mock.patch.object(tasks.enviar_email_alerta_task, 'delay') as email:
+            tasks.consolidar_fechamento_cotas(resultados[:1], '2026-03-02')
+        email.assert_not_called()
@@ -10,8 +10,14 @@ urlpatterns = [
     path('aplicacao/nova/', views.nova_aplicacao, name='nova_aplicacao'),
     path('resgate/novo/', views.novo_resgate, name='novo_resgate'),
     # Informes Mensais
+    path('informes/series/', views.series_informes, name='series_informes'),
+    path('informes/importar/', views.importar_informes_empresa, name='importar_informes_empresa'),
+    path('informes/importacoes/<uuid:importacao_id>/status/', views.status_importacao_informes_empresa, name='status_importacao_informes_empresa'),
     path('<uuid:fundo_id>/informes/', views.listar_informes, name='listar_informes'),
     path('<uuid:fundo_id>/informes/importar/', views.importar_informe, name='importar_informe'),
+    path('<uuid:fundo_id>/informes/importacoes/<uuid:importacao_id>/status/', views.status_importacao_informe, name='status_importacao_informe'),
     path('<uuid:fundo_id>/informes/<uuid:informe_id>/', views.detalhe_informe, name='detalhe_informe'),
+    path('<uuid:fundo_id>/informes/<uuid:informe_id>/xml/', views.baixar_xml_informe, name='baixar_xml_informe'),
+    path('<uuid:fundo_id>/informes/<uuid:informe_id>/dados-brutos/', views.baixar_dados_brutos_informe, name='baixar_dados_brutos_informe'),
     path('<uuid:fundo_id>/informes/<uuid:informe_id>/excluir/', views.excluir_informe, name='excluir_informe'),
 ]
\ No newline at end of file
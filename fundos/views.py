@@ -1,12 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
 from decimal import Decimal
 from datetime import date
 import uuid
 
-from .models import Fundo, Cotista, MovimentacaoCota, InformeMensal
+from .models import Fundo, Cotista, MovimentacaoCota, InformeMensal, ImportacaoInformeLote
 from .forms import FundoForm, InformeUploadForm, InformeLoteUploadForm
+from .services.listagem import listagem_fundos
+from .services.metricas_informe import series_metricas, series_para_grafico
 from .services.movimentacoes import processar_aplicacao, processar_resgate
 
 
@@ -97,25 +103,22 @@ def listar_fundos(request):
     """Lista todos os fundos da empresa ativa"""
     empresa = request.empresa_ativa
     if empresa:
-        fundos = Fundo.objects.filter(empresa=empresa).order_by('razao_social')
+        listagem = listagem_fundos(empresa)
     else:
-        fundos = Fundo.objects.none()
-
-    fundos_fidc = fundos.filter(tipo_fundo='FIDC')
-    fundos_fii  = fundos.filter(tipo_fundo='FII')
-    fundos_fip  = fundos.filter(tipo_fundo='FIP')
+        listagem = {'fundos': [], 'por_tipo': {}, 'totais': {}}
 
+    totais = listagem['totais']
     context = {
-        'fundos': fundos,
-        'fundos_fidc': fundos_fidc,
-        'fundos_fii': fundos_fii,
-        'fundos_fip': fundos_fip,
-        'total_fundos': fundos.count(),
-        'total_ativos': fundos.filter(ativo=True).count(),
-        'total_inativos': fundos.filter(ativo=False).count(),
-        'total_fidc': fundos_fidc.count(),
-        'total_fii': fundos_fii.count(),
-        'total_fip': fundos_fip.count(),
+        'fundos': listagem['fundos'],
+        'fundos_fidc': listagem['por_tipo'].get('FIDC', []),
+        'fundos_fii': listagem['por_tipo'].get('FII', []),
+        'fundos_fip': listagem['por_tipo'].get('FIP', []),
+        'total_fundos': totais.get('total', 0),
+        'total_ativos': totais.get('ativos', 0),
+        'total_inativos': totais.get('inativos', 0),
+        'total_fidc': totais.get('fidc', 0),
+        'total_fii': totais.get('fii', 0),
+        'total_fip': totais.get('fip', 0),
     }
     return render(request, 'fundos/listar_fundos.html', context)
 
@@ -191,14 +194,45 @@ def listar_informes(request, fundo_id):
 
     informes = InformeMensal.objects.filter(fundo=fundo).order_by('-competencia')
 
+    serie = series_metricas([fundo.id], ['vl_patrimonio_liquido', 'vl_dicred_inad'])
+
     context = {
         'fundo': fundo,
         'informes': informes,
         'pode_importar': _check_pode_importar_informes(request),
+        'serie_grafico': series_para_grafico(serie),
     }
     return render(request, 'fundos/listar_informes.html', context)
 
 
+@login_required
+def series_informes(request):
+    """
+    Séries mensais em JSON para gráficos e relatórios:
+    ?fundo=<uuid>&fundo=...&metrica=vl_patrimonio_liquido&metrica=...&inicio=AAAA-MM&fim=AAAA-MM
+    """
+    empresa = request.empresa_ativa
+
+    if not _check_pode_ver_informes(request):
+        return JsonResponse({'erro': 'Sem permissão.'}, status=403)
+
+    try:
+        fundo_ids = [uuid.UUID(f) for f in request.GET.getlist('fundo')]
+        inicio = date.fromisoformat(request.GET['inicio'] + '-01') if request.GET.get('inicio') else None
+        fim = date.fromisoformat(request.GET['fim'] + '-01') if request.GET.get('fim') else None
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetros inválidos.'}, status=400)
+
+    fundo_ids = list(Fundo.objects.filter(empresa=empresa, id__in=fundo_ids).values_list('id', flat=True))
+
+    try:
+        serie = series_metricas(fundo_ids, request.GET.getlist('metrica'), inicio, fim)
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+
+    return JsonResponse(series_para_grafico(serie))
+
+
 @login_required
 def importar_informe(request, fundo_id):
     empresa = request.empresa_ativa
@@ -210,9 +244,18 @@ def importar_informe(request, fundo_id):
 
     form = InformeUploadForm()
     form_lote = InformeLoteUploadForm()
-    resultados_lote = None
     aba_ativa = 'unico'
 
+    importacao = None
+    importacao_id = request.GET.get('importacao')
+    if importacao_id:
+        try:
+            importacao = ImportacaoInformeLote.objects.filter(id=importacao_id, fundo=fundo).first()
+        except ValidationError:
+            importacao = None
+        if importacao:
+            aba_ativa = 'lote'
+
     if request.method == 'POST':
         tipo_import = request.POST.get('tipo_import', 'unico')
 
@@ -220,44 +263,48 @@ def importar_informe(request, fundo_id):
             aba_ativa = 'lote'
             form_lote = InformeLoteUploadForm(request.POST, request.FILES)
             if form_lote.is_valid():
-                zip_file = request.FILES['zip_file']
-                try:
-                    from .services.informe_xml import parse_informe_mensal, InformeParseError
-                    from .services.importar_informe import importar_lote_zip
+                from .tasks import importar_lote_zip_task
 
-                    zip_bytes = zip_file.read()
-                    resultados_lote = importar_lote_zip(
-                        zip_bytes=zip_bytes,
-                        fundo=fundo,
-                        user=request.user,
-                    )
-                    ok_count = sum(1 for r in resultados_lote if r['status'] == 'ok')
-                    err_count = len(resultados_lote) - ok_count
-                    if ok_count:
-                        messages.success(
-                            request,
-                            f'{ok_count} informe(s) importado(s) com sucesso'
-                            + (f'; {err_count} com erro.' if err_count else '.'),
-                        )
-                    else:
-                        messages.error(request, 'Nenhum informe foi importado. Verifique os erros abaixo.')
-                except Exception as e:
-                    messages.error(request, f'Erro ao processar o ZIP: {e}')
+                zip_file = request.FILES['zip_file']
+                importacao = ImportacaoInformeLote.objects.create(
+                    empresa=empresa,
+                    fundo=fundo,
+                    arquivo=zip_file,
+                    arquivo_nome=zip_file.name,
+                    criado_por=request.user,
+                )
+                transaction.on_commit(lambda: importar_lote_zip_task.delay(str(importacao.id)))
+                messages.info(request, f'Importação de {zip_file.name} iniciada. Acompanhe o progresso abaixo.')
+                return redirect(
+                    f"{reverse('fundos:importar_informe', kwargs={'fundo_id': fundo_id})}?importacao={importacao.id}"
+                )
         else:
             form = InformeUploadForm(request.POST, request.FILES)
             if form.is_valid():
                 xml_file = request.FILES['xml_file']
                 try:
                     from .services.informe_xml import parse_informe_mensal, InformeParseError
-                    from .services.importar_informe import importar_informe_mensal
+                    from .services.importar_informe import (
+                        importar_informe_mensal, informe_inalterado, sha256_arquivo,
+                    )
 
                     xml_bytes = xml_file.read()
+                    sha256 = sha256_arquivo(xml_bytes)
+                    existente = informe_inalterado(fundo, sha256)
+                    if existente:
+                        messages.info(
+                            request,
+                            f'Arquivo idêntico ao informe de {existente.competencia_display} já importado — nada a atualizar.'
+                        )
+                        return redirect('fundos:detalhe_informe', fundo_id=fundo_id, informe_id=existente.id)
+
                     parsed = parse_informe_mensal(xml_bytes)
                     informe = importar_informe_mensal(
                         fundo_id=str(fundo.id),
                         parsed_dict=parsed,
                         user=request.user,
                         arquivo_nome=xml_file.name,
+                        xml_bytes=xml_bytes,
                     )
                     messages.success(
                         request,
@@ -271,12 +318,113 @@ def importar_informe(request, fundo_id):
         'fundo': fundo,
         'form': form,
         'form_lote': form_lote,
-        'resultados_lote': resultados_lote,
+        'importacao': importacao,
         'aba_ativa': aba_ativa,
     }
     return render(request, 'fundos/importar_informe.html', context)
 
 
+def _status_importacao_json(importacao):
+    """Payload do polling da tela de importação (por fundo ou por empresa)."""
+    nomes = dict(
+        Fundo.objects.filter(
+            id__in={r['fundo_id'] for r in importacao.resultados if r.get('fundo_id')},
+        ).values_list('id', 'razao_social')
+    ) if importacao.fundo_id is None else {importacao.fundo_id: importacao.fundo.razao_social}
+
+    resultados = [
+        {
+            **r,
+            'fundo': nomes.get(uuid.UUID(r['fundo_id']), '') if r.get('fundo_id') else '',
+            'url': reverse('fundos:detalhe_informe', kwargs={'fundo_id': r['fundo_id'], 'informe_id': r['informe_id']})
+            if r['informe_id'] else '',
+        }
+        for r in importacao.resultados
+    ]
+    return JsonResponse({
+        'id': str(importacao.id),
+        'status': importacao.status,
+        'status_display': importacao.get_status_display(),
+        'finalizada': importacao.finalizada,
+        'total': importacao.total,
+        'processados': importacao.processados,
+        'mensagem': importacao.mensagem,
+        'resultados': resultados,
+    })
+
+
+@login_required
+def status_importacao_informe(request, fundo_id, importacao_id):
+    """Endpoint JSON consultado pela tela de importação enquanto o lote é processado."""
+    empresa = request.empresa_ativa
+    fundo = get_object_or_404(Fundo, id=fundo_id, empresa=empresa)
+
+    if not _check_pode_importar_informes(request):
+        return JsonResponse({'erro': 'Sem permissão.'}, status=403)
+
+    importacao = get_object_or_404(ImportacaoInformeLote.objects.select_related('fundo'), id=importacao_id, fundo=fundo)
+    return _status_importacao_json(importacao)
+
+
+@login_required
+def importar_informes_empresa(request):
+    """
+    Importação de um ZIP com informes de vários fundos da empresa ativa:
+    cada XML é roteado ao fundo pelo CNPJ (importar_lote_zip_empresa).
+    """
+    empresa = request.empresa_ativa
+
+    if not _check_pode_importar_informes(request) or empresa is None:
+        messages.error(request, 'Você não tem permissão para importar informes mensais.')
+        return redirect('fundos:listar_fundos')
+
+    form_lote = InformeLoteUploadForm()
+
+    importacao = None
+    importacao_id = request.GET.get('importacao')
+    if importacao_id:
+        try:
+            importacao = ImportacaoInformeLote.objects.filter(
+                id=importacao_id, empresa=empresa, fundo__isnull=True,
+            ).first()
+        except ValidationError:
+            importacao = None
+
+    if request.method == 'POST':
+        form_lote = InformeLoteUploadForm(request.POST, request.FILES)
+        if form_lote.is_valid():
+            from .tasks import importar_lote_zip_task
+
+            zip_file = request.FILES['zip_file']
+            importacao = ImportacaoInformeLote.objects.create(
+                empresa=empresa,
+                arquivo=zip_file,
+                arquivo_nome=zip_file.name,
+                criado_por=request.user,
+            )
+            transaction.on_commit(lambda: importar_lote_zip_task.delay(str(importacao.id)))
+            messages.info(request, f'Importação de {zip_file.name} iniciada. Acompanhe o progresso abaixo.')
+            return redirect(f"{reverse('fundos:importar_informes_empresa')}?importacao={importacao.id}")
+
+    context = {
+        'empresa': empresa,
+        'form_lote': form_lote,
+        'importacao': importacao,
+    }
+    return render(request, 'fundos/importar_informes_empresa.html', context)
+
+
+@login_required
+def status_importacao_informes_empresa(request, importacao_id):
+    empresa = request.empresa_ativa
+
+    if not _check_pode_importar_informes(request):
+        return JsonResponse({'erro': 'Sem permissão.'}, status=403)
+
+    importacao = get_object_or_404(ImportacaoInformeLote, id=importacao_id, empresa=empresa, fundo__isnull=True)
+    return _status_importacao_json(importacao)
+
+
 @login_required
 def detalhe_informe(request, fundo_id, informe_id):
     empresa = request.empresa_ativa
@@ -325,6 +473,53 @@ def detalhe_informe(request, fundo_id, informe_id):
     return render(request, 'fundos/detalhe_informe.html', context)
 
 
+@login_required
+def baixar_dados_brutos_informe(request, fundo_id, informe_id):
+    """Download dos dados brutos do informe (re-parse do XML original) em JSON."""
+    from .services.importar_informe import dados_brutos_informe
+
+    empresa = request.empresa_ativa
+    fundo = get_object_or_404(Fundo, id=fundo_id, empresa=empresa)
+
+    if not _check_pode_ver_informes(request):
+        messages.error(request, 'Você não tem permissão para visualizar informes mensais.')
+        return redirect('fundos:listar_fundos')
+
+    informe = get_object_or_404(InformeMensal, id=informe_id, fundo=fundo)
+    dados = dados_brutos_informe(informe)
+    if dados is None:
+        raise Http404('Dados brutos indisponíveis para este informe.')
+
+    response = JsonResponse(dados, json_dumps_params={'ensure_ascii': False, 'indent': 2})
+    nome = f"informe_{fundo.cnpj}_{informe.competencia:%Y-%m}.json"
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return response
+
+
+@login_required
+def baixar_xml_informe(request, fundo_id, informe_id):
+    """Download (em streaming) do XML original arquivado na importação."""
+    from .services.arquivo_xml import abrir_xml, existe_xml
+
+    empresa = request.empresa_ativa
+    fundo = get_object_or_404(Fundo, id=fundo_id, empresa=empresa)
+
+    if not _check_pode_ver_informes(request):
+        messages.error(request, 'Você não tem permissão para visualizar informes mensais.')
+        return redirect('fundos:listar_fundos')
+
+    informe = get_object_or_404(InformeMensal, id=informe_id, fundo=fundo)
+    if not existe_xml(informe.arquivo_sha256):
+        raise Http404('XML original não arquivado para este informe.')
+
+    return FileResponse(
+        abrir_xml(informe.arquivo_sha256),
+        as_attachment=True,
+        filename=informe.arquivo_xml_nome or f"informe_{fundo.cnpj}_{informe.competencia:%Y-%m}.xml",
+        content_type='application/xml',
+    )
+
+
 @login_required
 def excluir_informe(request, fundo_id, informe_id):
     empresa = request.empresa_ativa